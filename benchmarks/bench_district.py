@@ -0,0 +1,27 @@
+"""
+Benchmark: DistrictRunner wall time against the number of worker processes.
+
+Run from the repository root:
+    python -m benchmarks.bench_district
+"""
+
+import os
+
+from src.district import DistrictRunner
+
+
+def main(classrooms: int = 128, days: float = 1.0) -> None:
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, cores} - {c for c in (2, 4, 8) if c > cores})
+    print(f"{classrooms} classrooms x {days:g} day(s), {cores} CPU core(s)")
+    base = None
+    for workers in counts:
+        report = DistrictRunner(classrooms, workers=workers).run(days)
+        wall = report["wall_seconds"]
+        base = base or wall
+        print(f"  {workers:2d} worker(s): {wall:7.3f}s  speedup {base / wall:5.2f}x  "
+              f"(ideal {workers}x, {report['delivered']} delivered)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: deliveries per second with synchronous console output against
+the buffered event bus, on a terminal that takes a fixed time per write.
+
+Run from the repository root:
+    python -m benchmarks.bench_event_bus
+"""
+
+import io
+import time
+
+from src.events import ConsoleSink, EventBus
+from src.robot_controller import RobotController
+
+
+class SlowTerminal(io.StringIO):
+    """Text stream that blocks for ``latency`` seconds on every write, like a slow terminal."""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        time.sleep(self.latency)
+        return super().write(text)
+
+
+class SyncRobot(RobotController):
+    """The controller as it was: every message is printed before the robot carries on."""
+
+    def __init__(self, terminal: SlowTerminal):
+        super().__init__("BENCH", verbose=False)
+        self.terminal = terminal
+
+    def _emit(self, kind, message, level=None, data=None) -> None:
+        if kind in ("message", "dispatched"):
+            self.terminal.write(self.interaction.display_message(message) + "\n")
+
+
+def _deliveries_per_second(robot: RobotController, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        robot.deliver_material("book", "teacher", "student")
+    return count / (time.perf_counter() - start)
+
+
+def main(count: int = 2000, latency: float = 0.0005) -> None:
+    print(f"{count} deliveries, {latency * 1e3:g} ms per terminal write")
+
+    silent = _deliveries_per_second(RobotController("BENCH", verbose=False), count)
+    print(f"  no output:       {silent:10.0f} deliveries/s")
+
+    terminal = SlowTerminal(latency)
+    sync = _deliveries_per_second(SyncRobot(terminal), count)
+    print(f"  synchronous:     {sync:10.0f} deliveries/s  ({terminal.writes} writes)")
+
+    terminal = SlowTerminal(latency)
+    bus = EventBus()
+    subscription = bus.subscribe(ConsoleSink(terminal), kinds=("message", "dispatched"))
+    bus.start()
+    buffered = _deliveries_per_second(RobotController("BENCH", verbose=False, events=bus), count)
+    bus.close()
+    print(f"  event bus:       {buffered:10.0f} deliveries/s  ({terminal.writes} writes, "
+          f"{subscription.delivered} events, {subscription.dropped} dropped)")
+    print(f"  speedup over synchronous: {buffered / sync:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
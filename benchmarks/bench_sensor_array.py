@@ -0,0 +1,48 @@
+"""
+Benchmark: SensorArray.read_batch + anomalies() against looping
+TemperatureSensor.read_data() + detect_anomaly() per sensor.
+
+Run from the repository root:
+    python -m benchmarks.bench_sensor_array
+"""
+
+import random
+import time
+
+from src.sensor_array import ChannelSpec, SensorArray
+from src.sensors import TemperatureSensor
+
+
+def bench_loop(sensors: int, steps: int) -> float:
+    random.seed(0)
+    fleet = [TemperatureSensor(f"S{i}") for i in range(sensors)]
+    start = time.perf_counter()
+    for _ in range(steps):
+        for s in fleet:
+            s.read_data()
+            s.detect_anomaly()
+    return time.perf_counter() - start
+
+
+def bench_array(sensors: int, steps: int) -> float:
+    arr = SensorArray("A", [f"room{i}" for i in range(sensors)],
+                      channels=[ChannelSpec("temperature", 22.0, 1.0, 18.0, 28.0)], seed=0)
+    start = time.perf_counter()
+    for _ in range(steps):
+        arr.read_batch(1)
+        arr.anomalies()
+    return time.perf_counter() - start
+
+
+def main(sensors: int = 64, steps: int = 2000) -> None:
+    loop = bench_loop(sensors, steps)
+    vec = bench_array(sensors, steps)
+    readings = sensors * steps
+    print(f"{sensors} sensors x {steps} steps ({readings} readings)")
+    print(f"  TemperatureSensor loop: {loop:.3f}s ({readings / loop:,.0f} readings/s)")
+    print(f"  SensorArray batch:      {vec:.3f}s ({readings / vec:,.0f} readings/s)")
+    print(f"  speedup: {loop / vec:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Minimal benchmark harness: seeded runs, ops/sec, latency percentiles,
+peak memory (tracemalloc) and comparison against a saved JSON baseline.
+"""
+
+import gc
+import json
+import random
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+# A case builds its state for a given size and returns the operation to time.
+Setup = Callable[[int], Callable[[], object]]
+
+
+@dataclass
+class Result:
+    name: str
+    size: int
+    ops: int
+    ops_per_sec: float
+    p50_us: float
+    p95_us: float
+    p99_us: float
+    peak_kib: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.size}]"
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Setup
+    sizes: List[int]
+    ops: Optional[int] = None  # defaults to the size
+
+
+def _percentile(sorted_values: List[int], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx] / 1000.0
+
+
+def run_case(case: Case, size: int, seed: int = 1234) -> Result:
+    """Time ``case`` at ``size``; memory is measured in a second, traced run."""
+    ops = case.ops or size
+
+    random.seed(seed)
+    op = case.setup(size)
+    timings = [0] * ops
+    clock = time.perf_counter_ns
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = clock()
+        for i in range(ops):
+            t0 = clock()
+            op()
+            timings[i] = clock() - t0
+        total = clock() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    timings.sort()
+
+    random.seed(seed)
+    tracemalloc.start()
+    try:
+        op = case.setup(size)
+        for _ in range(ops):
+            op()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return Result(case.name, size, ops, ops / (total / 1e9) if total else 0.0,
+                  _percentile(timings, 50), _percentile(timings, 95), _percentile(timings, 99),
+                  peak / 1024.0)
+
+
+def save_baseline(results: List[Result], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({r.key: asdict(r) for r in results}, fh, indent=2, sort_keys=True)
+
+
+def compare(results: List[Result], path: str, threshold: float) -> List[str]:
+    """Return a message for every result slower than baseline by more than ``threshold``."""
+    with open(path, encoding="utf-8") as fh:
+        baseline: Dict[str, Dict] = json.load(fh)
+    regressions = []
+    for r in results:
+        base = baseline.get(r.key)
+        if not base or not base["ops_per_sec"]:
+            continue
+        change = r.ops_per_sec / base["ops_per_sec"] - 1.0
+        if change < -threshold:
+            regressions.append(f"{r.key}: {r.ops_per_sec:,.0f} ops/s vs baseline "
+                               f"{base['ops_per_sec']:,.0f} ({change:+.0%})")
+    return regressions
+
+
+def format_table(results: List[Result]) -> str:
+    header = f"{'benchmark':44} {'ops/s':>12} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9} {'peak KiB':>10}"
+    rows = [header, "-" * len(header)]
+    for r in results:
+        rows.append(f"{r.key:44} {r.ops_per_sec:12,.0f} {r.p50_us:9.2f} {r.p95_us:9.2f} "
+                    f"{r.p99_us:9.2f} {r.peak_kib:10,.1f}")
+    return "\n".join(rows)
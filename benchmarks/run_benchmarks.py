@@ -0,0 +1,240 @@
+"""
+Benchmarks for the robot's hot paths.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks                     # print results
+    python -m benchmarks.run_benchmarks --save base.json    # record a baseline
+    python -m benchmarks.run_benchmarks --baseline base.json --threshold 0.2
+
+With ``--baseline`` the exit status is 1 if any benchmark's ops/sec dropped
+by more than the threshold. ``--full`` adds the 10^6-task queue sizes.
+"""
+
+import argparse
+import sys
+from typing import Callable, List
+
+from src.events import EventBus
+from src.interaction import InteractionModule
+from src.robot_controller import RobotController
+from src.sampler import SensorSampler
+from src.sensors import TemperatureSensor
+from src.task_manager import TaskManager
+from src.tasks import DeliveryTask, TaskStore
+
+from .harness import Case, compare, format_table, run_case, save_baseline
+
+LOCATIONS = ["teacher", "student", "cupboard", "library", "office", "desk 3"]
+QUEUE_SIZES = [10 ** 3, 10 ** 4, 10 ** 5]
+
+
+def _tasks(n: int) -> List[DeliveryTask]:
+    return [DeliveryTask.create(f"item{i}", LOCATIONS[i % 6], LOCATIONS[(i + 1) % 6], priority=i % 3)
+            for i in range(n)]
+
+
+def _robot() -> RobotController:
+    return RobotController("BENCH", verbose=False)
+
+
+def deliver_material(size: int) -> Callable[[], object]:
+    robot = _robot()
+    return lambda: robot.deliver_material("book", "teacher", "student")
+
+
+def execute_task(size: int) -> Callable[[], object]:
+    robot = _robot()
+    for t in _tasks(size):
+        robot.task_manager.enqueue_task(t)
+    return robot.execute_task
+
+
+def monitor_environment(size: int) -> Callable[[], object]:
+    return _robot().monitor_environment
+
+
+def monitor_environment_sampled(size: int) -> Callable[[], object]:
+    # Cached path; the sampler is ticked once by hand so no thread skews later cases.
+    robot = _robot()
+    robot.sampler = SensorSampler([robot.sensor])
+    robot.sampler.sample_once()
+    return robot.monitor_environment
+
+
+def _busy_robot(size: int) -> RobotController:
+    robot = _robot()
+    for i in range(size):
+        robot.greet_student(f"s{i}")
+        robot.monitor_environment()
+    return robot
+
+
+def get_status_full(size: int) -> Callable[[], object]:
+    return _busy_robot(size).get_status
+
+
+def get_status_summary(size: int) -> Callable[[], object]:
+    robot = _busy_robot(size)
+    return lambda: robot.get_status(summary=True)
+
+
+def get_status_delta(size: int) -> Callable[[], object]:
+    robot = _busy_robot(size)
+    version = robot.get_status(summary=True)["version"]
+
+    def op():
+        nonlocal version
+        robot.greet_student("x")
+        version = robot.get_status(since_version=version)["version"]
+    return op
+
+
+def get_status_delta_queue(size: int) -> Callable[[], object]:
+    robot = _robot()
+    tm = robot.task_manager
+    tm.enqueue_many(_tasks(size))
+    version = robot.get_status(summary=True)["version"]
+    it = iter(_tasks(10 ** 5))
+
+    def op():
+        nonlocal version
+        tm.enqueue_task(next(it))
+        version = robot.get_status(since_version=version)["version"]
+    return op
+
+
+def tm_enqueue(size: int) -> Callable[[], object]:
+    tm = TaskManager("B")
+    it = iter(_tasks(size))
+    return lambda: tm.enqueue_task(next(it))
+
+
+def tm_dequeue(size: int) -> Callable[[], object]:
+    tm = TaskManager("B")
+    for t in _tasks(size):
+        tm.enqueue_task(t)
+    return tm.dequeue_task
+
+
+def tm_list(size: int) -> Callable[[], object]:
+    tm = TaskManager("B")
+    for t in _tasks(size):
+        tm.enqueue_task(t)
+    return tm.list_tasks
+
+
+def tm_list_page(size: int) -> Callable[[], object]:
+    tm = tm_list(size).__self__
+    return lambda: tm.list_tasks(limit=100)
+
+
+def tm_list_unordered(size: int) -> Callable[[], object]:
+    tm = tm_list(size).__self__
+    return lambda: tm.list_tasks(ordered=False)
+
+
+def task_create(size: int) -> Callable[[], object]:
+    return lambda: DeliveryTask.create("book", "teacher", "student")
+
+
+def store_append(size: int) -> Callable[[], object]:
+    store = TaskStore()
+    task = DeliveryTask.create("book", "teacher", "student")
+    return lambda: store.append(task)
+
+
+def sensor_read(size: int) -> Callable[[], object]:
+    sensor = TemperatureSensor("B")
+    for _ in range(size):
+        sensor.read_data()
+    return sensor.read_data
+
+
+def log_interaction(size: int) -> Callable[[], object]:
+    im = InteractionModule("B")
+    return lambda: im.log_interaction("greet", "student")
+
+
+def undo_last(size: int) -> Callable[[], object]:
+    im = InteractionModule("B")
+    for i in range(size):
+        im.log_interaction("greet", f"s{i}")
+    return im.undo_last
+
+
+def undo_last_actor(size: int) -> Callable[[], object]:
+    # One actor's entries are spread thinly through a full history.
+    im = InteractionModule("B")
+    for i in range(size):
+        im.log_interaction("greet", f"s{i % 50}")
+    return lambda: (im.log_interaction("greet", "s7"), im.undo_last("s7"))
+
+
+def events_publish(size: int) -> Callable[[], object]:
+    # Not started: the bounded queue fills and publish takes its drop path, never blocking.
+    bus = EventBus()
+    bus.subscribe(lambda events: None, capacity=size)
+    return lambda: bus.publish("completed", "Delivered book to student", source="BENCH")
+
+
+def build_cases(full: bool = False) -> List[Case]:
+    queue_sizes = QUEUE_SIZES + ([10 ** 6] if full else [])
+    return [
+        Case("controller.deliver_material", deliver_material, [10 ** 4]),
+        Case("controller.execute_task", execute_task, [10 ** 4]),
+        Case("controller.monitor_environment", monitor_environment, [10 ** 4]),
+        Case("controller.monitor_environment.sampled", monitor_environment_sampled, [10 ** 4]),
+        Case("controller.get_status", get_status_full, [10 ** 3, 10 ** 4], ops=200),
+        Case("controller.get_status.summary", get_status_summary, [10 ** 3, 10 ** 4], ops=10 ** 4),
+        Case("controller.get_status.delta", get_status_delta, [10 ** 3, 10 ** 4], ops=10 ** 4),
+        Case("controller.get_status.delta.queue", get_status_delta_queue, [10 ** 3, 10 ** 4], ops=10 ** 4),
+        Case("task_manager.enqueue", tm_enqueue, queue_sizes),
+        Case("task_manager.dequeue", tm_dequeue, queue_sizes),
+        Case("task_manager.list_tasks", tm_list, queue_sizes, ops=20),
+        Case("task_manager.list_tasks.page", tm_list_page, queue_sizes, ops=200),
+        Case("task_manager.list_tasks.unordered", tm_list_unordered, queue_sizes, ops=200),
+        Case("tasks.create", task_create, [10 ** 5]),
+        Case("tasks.store_append", store_append, [10 ** 5]),
+        Case("sensor.read_data", sensor_read, [10 ** 5], ops=10 ** 5),
+        Case("interaction.log_interaction", log_interaction, [10 ** 5]),
+        Case("interaction.undo_last", undo_last, [10 ** 5]),
+        Case("interaction.undo_last.actor", undo_last_actor, [10 ** 5]),
+        Case("events.publish", events_publish, [10 ** 4]),
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--save", metavar="FILE", help="write results as a JSON baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed ops/sec drop before failing (default 0.2 = 20%%)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--full", action="store_true", help="include 10^6-task queue sizes")
+    parser.add_argument("--only", metavar="PREFIX", help="only run benchmarks whose name starts with PREFIX")
+    options = parser.parse_args(argv)
+
+    results = []
+    for case in build_cases(options.full):
+        if options.only and not case.name.startswith(options.only):
+            continue
+        for size in case.sizes:
+            results.append(run_case(case, size, options.seed))
+            print(f"  done {results[-1].key}", file=sys.stderr)
+    print(format_table(results))
+
+    if options.save:
+        save_baseline(results, options.save)
+    if options.baseline:
+        regressions = compare(results, options.baseline, options.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions beyond the threshold.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
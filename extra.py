@@ -19,11 +19,13 @@ Key Features:
 """
 
 import json
-from .robot_controller import RobotController
+from src.robot_controller import RobotController
+from src.commands import CommandDispatcher, CommandError, parse_command
 
 def main():
     robot = RobotController("R-001")
     robot.start()
+    robot.flush_events()
     print("\nWelcome to the Humanoid Classroom Robot System!\n")
     input("Press ENTER to continue...")
 
@@ -55,36 +57,28 @@ def main():
     print("\nWelldone, now you know the commands, type one of the commands shown to start:")
 
 
+    dispatcher = CommandDispatcher(robot)
     while True:
         try:
             cmd = input("> ").strip()
         except (EOFError, KeyboardInterrupt):
             print("\nExiting CLI.")
             break
-        if not cmd:
+        try:
+            command = parse_command(cmd)
+        except CommandError:
+            print("Unknown or malformed command.")
+            continue
+        if command is None:
             continue
-        parts = cmd.split()
-        verb = parts[0].lower()
-        if verb == "exit":
+        if command.verb == "exit":
             break
-        if verb == "deliver" and len(parts) >= 4:
-            item = parts[1]
-            from_loc = parts[2]
-            to_loc = " ".join(parts[3:])
-            print(robot.deliver_material(item, from_loc, to_loc))
-        elif verb == "monitor":
-            res = robot.monitor_environment()
-            print(res)
-        elif verb == "greet" and len(parts) >= 2:
-            name = " ".join(parts[1:])
-            print(robot.greet_student(name))
-        elif verb == "status":
-            print(json.dumps(robot.get_status(), indent=2))
-        elif verb == "undo":
-            undone = robot.interaction.undo_last()
-            print("Undid:", undone)
-        else:
-            print("Unknown or malformed command.")
+        if command.verb == "help":
+            print("Commands: deliver, monitor, greet, status, undo, exit")
+            continue
+        result = dispatcher.dispatch(command)
+        robot.flush_events()
+        print(json.dumps(result))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,98 @@
+"""
+Humanoid Classroom Robot System - asyncio command line
+-------------------------------------------------------
+Same commands as ``src/cli.py``, but deliveries run in the background so
+``monitor``, ``greet`` and ``status`` answer immediately while the robot is
+still travelling.
+
+Run with:
+    python -m src.async_cli
+"""
+
+import asyncio
+import sys
+
+from .async_controller import AsyncRobotController
+from .cli import COMMANDS_GUIDE
+from .commands import CommandDispatcher, CommandError, parse_command
+
+
+async def _deliver(robot: AsyncRobotController, item: str, source: str, destination: str,
+                   priority: int = 0) -> None:
+    result = await robot.deliver_material(item, source, destination, priority)
+    if "Delivered" in result:
+        print(f"\nAll done! I successfully delivered {item} from {source} to {destination}. 📦✅")
+    else:
+        print(f"\nOops! I couldn’t deliver {item}. Please check the locations and try again.")
+
+
+async def run(time_scale: float = 1.0) -> None:
+    robot = AsyncRobotController(time_scale=time_scale)
+    robot.robot.start()
+    dispatcher = CommandDispatcher(robot.robot)
+    print(COMMANDS_GUIDE)
+    loop = asyncio.get_running_loop()
+    background = set()
+
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        try:
+            command = parse_command(line)
+        except CommandError:
+            print("\nOops! I didn’t understand that command. Type 'help' to see what I can do.")
+            continue
+        if command is None:
+            continue
+        verb, args = command
+
+        if verb == "exit":
+            break
+        elif verb == "help":
+            print(COMMANDS_GUIDE)
+        elif verb == "deliver":
+            item = args["item"]
+            job = asyncio.create_task(_deliver(robot, item, args["source"], args["destination"],
+                                               args["priority"]))
+            background.add(job)
+            job.add_done_callback(background.discard)
+            print(f"\nOn my way with {item}! I’ll let you know when it’s delivered.")
+        elif verb == "monitor":
+            res = await robot.monitor_environment()
+            if res["issue"]:
+                print(f"\n⚠️ Alert! The classroom temperature is {res['temperature']}°C — outside my safe range.")
+            else:
+                print(f"\nThe classroom temperature is {res['temperature']}°C. Everything is optimal for learning!")
+        elif verb == "greet":
+            print(f"\nAffirmative: {await robot.greet_student(args['name'])}")
+        elif verb == "status":
+            status = robot.get_status(summary=True)
+            print(f"\nCurrent Status: {status['state']}")
+            print(f"Pending tasks: {status['pending_tasks']}")
+        elif verb == "undo":
+            result = dispatcher.dispatch(command)
+            if result["count"] > 1:
+                actions = ", ".join(f"{action} for {who or 'robot'}" for action, who in result["all"])
+                print(f"\nI undid my last {result['count']} actions: {actions}.")
+            elif result["undone"]:
+                action, who = result["undone"]
+                print(f"\nI undid my last action: {action} for {who or 'robot'}.")
+            else:
+                print("\nNothing to undo right now.")
+            for outcome in result["outcomes"]:
+                if outcome:
+                    print(f"  {outcome}")
+
+    if background:
+        print("\nFinishing the deliveries I already started...")
+        await asyncio.gather(*background)
+    print("\nGoodbye 👋")
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
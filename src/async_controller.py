@@ -0,0 +1,166 @@
+# src/async_controller.py
+"""
+Asyncio front end for the Humanoid Classroom Robot
+---------------------------------------------------
+Wraps a RobotController so deliveries, monitoring and greetings can run
+concurrently on one event loop.
+
+Classes:
+    - AsyncRobotController: Awaitable versions of the robot's operations with
+      simulated travel and actuation delays.
+
+Key Features:
+    - Deliveries are queued and driven one at a time in priority order while
+      other commands keep being served; a delivery's caller gets its final
+      outcome, after any retries, even if the queue merged it with others
+    - Simulated minutes are converted to real delays with ``time_scale``
+    - RobotState stays EXECUTING while any operation is in flight
+    - Unreachable destinations fail without waiting, and if the driver
+      itself fails every waiting delivery is told
+"""
+
+import asyncio
+import math
+from typing import Dict, Optional
+
+from .robot_controller import RobotController, RobotState
+from .tasks import DeliveryTask, TaskStatus
+
+
+class AsyncRobotController:
+    """
+    Asynchronous wrapper around a RobotController.
+
+    Attributes:
+        robot (RobotController): The wrapped controller.
+        time_scale (float): Real seconds per simulated minute.
+        greet_minutes (float): Simulated duration of a greeting.
+        monitor_minutes (float): Simulated duration of a sensor reading.
+    """
+
+    def __init__(self, robot: Optional[RobotController] = None, time_scale: float = 1.0,
+                 greet_minutes: float = 0.05, monitor_minutes: float = 0.01):
+        self.robot = robot if robot is not None else RobotController("R-001", verbose=False)
+        self.time_scale = time_scale
+        self.greet_minutes = greet_minutes
+        self.monitor_minutes = monitor_minutes
+        self._active = 0
+        self._waiters: Dict[int, asyncio.Future] = {}
+        self._driver: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    @property
+    def state(self) -> RobotState:
+        return self.robot.state
+
+    def _begin(self) -> None:
+        self._active += 1
+        self.robot.change_state(RobotState.EXECUTING)
+
+    def _end(self) -> None:
+        # Synchronous robot calls finish in IDLE; while other operations are
+        # still in flight the robot is, as a whole, still executing.
+        self._active -= 1
+        if self._active:
+            self.robot.change_state(RobotState.EXECUTING)
+
+    async def _wait_minutes(self, minutes: float) -> None:
+        await asyncio.sleep(max(0.0, minutes) * self.time_scale)
+
+    async def deliver_material(self, item: str, from_location: str, to_location: str, priority: int = 0,
+                               deadline: Optional[float] = None, requester: Optional[str] = None) -> str:
+        """Queue a delivery and wait until it has been delivered or has failed for good."""
+        task = DeliveryTask.create(item, from_location, to_location, priority, deadline, requester)
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[task.id] = future
+        self.robot.task_manager.enqueue_task(task)
+        self._wakeup.set()
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.create_task(self._drive())
+        return await future
+
+    async def _drive(self) -> None:
+        """
+        Run queued deliveries one after another in dispatch order, including
+        due retries. If the driver dies, every delivery still waiting gets
+        its exception (or is cancelled with it).
+        """
+        try:
+            await self._drive_queue()
+        except BaseException as exc:
+            waiters, self._waiters = self._waiters, {}
+            for future in waiters.values():
+                if future.done():
+                    continue
+                if isinstance(exc, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(exc)
+            raise
+
+    async def _drive_queue(self) -> None:
+        robot = self.robot
+        tm = robot.task_manager
+        while True:
+            tm.advance(robot.sim_minutes)
+            task = tm.dequeue_task()
+            if task is None:
+                due = tm.next_retry_at()
+                if due is None:
+                    return
+                # Sleep until the retry is due, or until a new delivery arrives.
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(),
+                                           max(0.0, due - robot.sim_minutes) * self.time_scale)
+                except asyncio.TimeoutError:
+                    robot.sim_minutes = max(robot.sim_minutes, due)
+                continue
+            self._begin()
+            try:
+                minutes = robot.estimate_task_minutes(task)
+                if math.isfinite(minutes):
+                    await self._wait_minutes(minutes)
+                # An unreachable destination fails at once in run_task.
+                result = robot.run_task(task)
+            finally:
+                self._end()
+            if task.status is not TaskStatus.RETRYING:
+                self._resolve(task, result)
+
+    def _resolve(self, task: DeliveryTask, result: str) -> None:
+        """Give every request carried by ``task`` its own final outcome."""
+        delivered = task.status is TaskStatus.COMPLETED
+        for t in task.deliveries():
+            future = self._waiters.pop(t.id, None)
+            if future is None or future.done():
+                continue
+            if t is task and not task.merged:
+                future.set_result(result)
+            elif delivered:
+                future.set_result(f"Delivered {t.item} to {t.to_location}")
+            else:
+                future.set_result(f"Delivery {t.item} to {t.to_location} failed")
+
+    async def monitor_environment(self) -> Dict:
+        """Take a temperature reading."""
+        await self._wait_minutes(self.monitor_minutes)
+        return self.robot.monitor_environment()
+
+    async def greet_student(self, name: str) -> str:
+        """Greet a student by name."""
+        self._begin()
+        try:
+            await self._wait_minutes(self.greet_minutes)
+            return self.robot.greet_student(name)
+        finally:
+            self._end()
+
+    def get_status(self, since_version: Optional[Dict[str, int]] = None, summary: bool = False) -> Dict:
+        """Get current robot status (see ``RobotController.get_status``)."""
+        return self.robot.get_status(since_version, summary)
+
+    async def wait_idle(self) -> None:
+        """Wait until every queued delivery has been carried out."""
+        if self._driver is not None:
+            await asyncio.shield(self._driver)
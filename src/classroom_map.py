@@ -0,0 +1,226 @@
+# src/classroom_map.py
+"""
+Classroom Map for Humanoid Classroom Robot
+-------------------------------------------
+Graph model of the building with shortest-path routing between named
+locations.
+
+Classes:
+    - ClassroomMap: Weighted, undirected graph of locations with A*/Dijkstra
+      routing and an LRU path cache.
+
+Key Features:
+    - Optional (x, y) coordinates used as an A* heuristic; when some
+      locations have none, or a corridor is shorter than the straight line
+      between its ends, the heuristic could overestimate and plain Dijkstra
+      is used instead
+    - Blocking and unblocking corridors (edges) when obstacles are reported
+    - Incremental cache invalidation: blocking an edge only evicts the
+      cached paths that use it
+"""
+
+import heapq
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+Path = Tuple[float, List[str]]
+_UNREACHABLE: Path = (math.inf, [])
+
+
+def _edge(a: str, b: str) -> Tuple[str, str]:
+    return (a, b) if a <= b else (b, a)
+
+
+class ClassroomMap:
+    """
+    Graph of named classroom locations connected by walkable corridors.
+
+    Attributes:
+        default (float): Distance assumed to or from locations not on the map.
+        cache_size (int): Maximum number of cached shortest paths.
+    """
+
+    def __init__(self, default: float = 20.0, cache_size: int = 4096):
+        self.default = default
+        self.cache_size = cache_size
+        self._adj: Dict[str, Dict[str, float]] = {}
+        self._coords: Dict[str, Tuple[float, float]] = {}
+        self._blocked: Set[Tuple[str, str]] = set()
+        self._cache: "OrderedDict[Tuple[str, str], Path]" = OrderedDict()
+        self._users: Dict[Tuple[str, str], Set[Tuple[str, str]]] = {}
+        # Whether straight-line distances never overestimate; None until checked.
+        self._admissible: Optional[bool] = None
+        self._lock = threading.RLock()
+
+    def add_location(self, name: str, x: Optional[float] = None, y: Optional[float] = None) -> None:
+        """Add a location, optionally with coordinates in metres."""
+        self._adj.setdefault(name, {})
+        if x is not None and y is not None:
+            self._coords[name] = (x, y)
+        self._admissible = None
+        self.clear_cache()
+
+    def add_corridor(self, a: str, b: str, length: Optional[float] = None) -> None:
+        """
+        Connect two locations. Without ``length`` the straight-line distance
+        between their coordinates is used.
+        """
+        for name in (a, b):
+            self._adj.setdefault(name, {})
+        if length is None:
+            length = self._straight_line(a, b)
+            if length is None:
+                raise ValueError(f"Corridor {a!r}-{b!r} needs a length or coordinates")
+        self._adj[a][b] = length
+        self._adj[b][a] = length
+        self._admissible = None
+        self.clear_cache()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._adj
+
+    def locations(self) -> List[str]:
+        """Return the names of all locations on the map."""
+        return list(self._adj)
+
+    def block_corridor(self, a: str, b: str) -> None:
+        """Mark a corridor as impassable and evict the cached paths using it."""
+        edge = _edge(a, b)
+        with self._lock:
+            if edge in self._blocked:
+                return
+            self._blocked.add(edge)
+            for key in self._users.pop(edge, ()):
+                self._cache.pop(key, None)
+
+    def unblock_corridor(self, a: str, b: str) -> None:
+        """Reopen a corridor. Any cached path may now be improvable, so the cache is cleared."""
+        edge = _edge(a, b)
+        with self._lock:
+            if edge in self._blocked:
+                self._blocked.discard(edge)
+                self.clear_cache()
+
+    def blocked_corridors(self) -> List[Tuple[str, str]]:
+        """Return all currently blocked corridors."""
+        return sorted(self._blocked)
+
+    def clear_cache(self) -> None:
+        """Drop every cached path."""
+        with self._lock:
+            self._cache.clear()
+            self._users.clear()
+
+    def _straight_line(self, a: str, b: str) -> Optional[float]:
+        pa, pb = self._coords.get(a), self._coords.get(b)
+        if pa is None or pb is None:
+            return None
+        return math.hypot(pa[0] - pb[0], pa[1] - pb[1])
+
+    def _coords_admissible(self) -> bool:
+        """
+        Whether every location has coordinates and no corridor is shorter
+        than the straight line between its ends, so the straight-line
+        distance is a consistent A* heuristic.
+        """
+        if self._admissible is None:
+            coords = self._coords
+            self._admissible = all(name in coords for name in self._adj) and all(
+                length >= self._straight_line(a, b) - 1e-9
+                for a, nbrs in self._adj.items() for b, length in nbrs.items())
+        return self._admissible
+
+    def shortest_path(self, a: str, b: str) -> Path:
+        """
+        Find the shortest open path between two locations.
+
+        Locations that are not on the map are assumed to be ``default`` metres
+        from everywhere.
+
+        Returns:
+            Tuple[float, List[str]]: (distance, path including both ends);
+            distance is ``inf`` and the path empty if ``b`` cannot be reached.
+        """
+        if a == b:
+            return 0.0, [a]
+        if a not in self._adj or b not in self._adj:
+            return self.default, [a, b]
+
+        key = (a, b) if a <= b else (b, a)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is None:
+                cached = self._search(key[0], key[1])
+                self._remember(key, cached)
+            else:
+                self._cache.move_to_end(key)
+        dist, path = cached
+        return (dist, list(path)) if key[0] == a else (dist, path[::-1])
+
+    def distance(self, a: str, b: str) -> float:
+        """Return the shortest open distance between two locations."""
+        return self.shortest_path(a, b)[0]
+
+    def _remember(self, key: Tuple[str, str], result: Path) -> None:
+        self._cache[key] = result
+        path = result[1]
+        for i in range(len(path) - 1):
+            self._users.setdefault(_edge(path[i], path[i + 1]), set()).add(key)
+        if len(self._cache) > self.cache_size:
+            old_key, (_, old_path) = self._cache.popitem(last=False)
+            for i in range(len(old_path) - 1):
+                users = self._users.get(_edge(old_path[i], old_path[i + 1]))
+                if users is not None:
+                    users.discard(old_key)
+
+    def _search(self, start: str, goal: str) -> Path:
+        """A* search; Dijkstra when the coordinates could overestimate a distance."""
+        coords = self._coords if self._coords_admissible() else {}
+        goal_xy = coords.get(goal)
+
+        def h(node: str) -> float:
+            if goal_xy is None:
+                return 0.0
+            xy = coords[node]
+            return math.hypot(xy[0] - goal_xy[0], xy[1] - goal_xy[1])
+
+        best = {start: 0.0}
+        parent: Dict[str, str] = {}
+        frontier = [(h(start), 0.0, start)]
+        blocked = self._blocked
+        while frontier:
+            _, g, node = heapq.heappop(frontier)
+            if node == goal:
+                path = [goal]
+                while path[-1] != start:
+                    path.append(parent[path[-1]])
+                return g, path[::-1]
+            if g > best[node]:
+                continue
+            for nxt, w in self._adj[node].items():
+                if blocked and _edge(node, nxt) in blocked:
+                    continue
+                ng = g + w
+                if ng < best.get(nxt, math.inf):
+                    best[nxt] = ng
+                    parent[nxt] = node
+                    heapq.heappush(frontier, (ng + h(nxt), ng, nxt))
+        return _UNREACHABLE
+
+
+def default_classroom_map() -> ClassroomMap:
+    """Build a small example classroom layout (coordinates in metres)."""
+    cmap = ClassroomMap()
+    layout = {
+        "base": (0, 0), "teacher": (2, 8), "student": (10, 8),
+        "cupboard": (0, 12), "library": (20, 0), "office": (20, 12),
+    }
+    for name, (x, y) in layout.items():
+        cmap.add_location(name, x, y)
+    for a, b in [("base", "teacher"), ("base", "library"), ("teacher", "student"),
+                 ("teacher", "cupboard"), ("student", "office"), ("library", "office"),
+                 ("student", "library")]:
+        cmap.add_corridor(a, b)
+    return cmap
@@ -18,8 +18,11 @@ Key Features:
     - State transitions for the RobotController
 """
 
-import json
+import argparse
+import sys
 from .robot_controller import RobotController
+from .commands import CommandDispatcher, CommandError, parse_command, run_script
+from .metrics import MetricsRegistry
 
 COMMANDS_GUIDE = """
 Commands Guide:
@@ -38,6 +41,7 @@ Commands Guide:
 
 5. Undo the last task the robot did
    Command: undo
+   Command: undo 3 for <name>   (the last 3 things done for one person)
 
 6. Quit the program
    Command: exit
@@ -45,9 +49,81 @@ Commands Guide:
 Type 'help' anytime to see this guide again.
 """
 
-def main():
+def _say_deliver(dispatcher, command, teacher_name):
+    result = dispatcher.dispatch(command._replace(args={**command.args, "requester": teacher_name}))
+    dispatcher.robot.flush_events()
+    args = command.args
+    item, from_loc, to_loc = args["item"], args["source"], args["destination"]
+    if result["delivered"]:
+        print(f"\nAll done, {teacher_name}! I successfully delivered {item} from {from_loc} to {to_loc}. 📦✅")
+    else:
+        print(f"\nOops, {teacher_name}! I couldn’t deliver {item}. Please check the locations and try again.")
+
+
+def _say_monitor(dispatcher, command, teacher_name):
+    res = dispatcher.dispatch(command)
+    temp = res.get('temperature')
+    issue = res.get('issue')
+    if issue:
+        print(f"\n⚠️ Alert, {teacher_name}! The classroom temperature is {temp}°C — outside my safe range.")
+    else:
+        print(f"\nThe classroom temperature is {temp}°C. Everything is optimal for learning, {teacher_name}!")
+
+
+def _say_greet(dispatcher, command, teacher_name):
+    greeting = dispatcher.dispatch(command)["greeting"]
+    print(f"\nAffirmative, {teacher_name}: {greeting}")
+
+
+def _say_status(dispatcher, command, teacher_name):
+    status = dispatcher.dispatch(command)
+    state = status.get('state', 'unknown')
+    tasks = dispatcher.robot.task_manager.list_tasks(limit=10) if status.get('pending_tasks') else []
+    print(f"\nCurrent Status, {teacher_name}: {state}")
+    if tasks:
+        print("Here are my pending tasks:")
+        for t in tasks:
+            print(f"  - {t}")
+    else:
+        print("No pending tasks. I’m all clear and ready for the next instruction!")
+
+
+def _say_undo(dispatcher, command, teacher_name):
+    result = dispatcher.dispatch(command)
+    last = result["undone"]
+    if result["count"] > 1:
+        actions = ", ".join(f"{action} for {who or 'robot'}" for action, who in result["all"])
+        print(f"\n{teacher_name}, I undid my last {result['count']} actions: {actions}.")
+    elif last:
+        action, who = last
+        print(f"\n{teacher_name}, I undid my last action: {action} for {who or 'robot'}.")
+    else:
+        print(f"\nNothing to undo right now, {teacher_name}. Everything’s up to date!")
+    for outcome in result["outcomes"]:
+        if outcome:
+            print(f"  {outcome}")
+
+
+def _say_help(dispatcher, command, teacher_name):
+    print(f"\nHere’s what I can do for you, {teacher_name}:")
+    print(COMMANDS_GUIDE)
+
+
+INTERACTIVE_HANDLERS = {
+    "deliver": _say_deliver,
+    "monitor": _say_monitor,
+    "greet": _say_greet,
+    "status": _say_status,
+    "undo": _say_undo,
+    "help": _say_help,
+}
+
+
+def interactive():
     robot = RobotController("R-001")
+    dispatcher = CommandDispatcher(robot)
     robot.start()
+    robot.flush_events()
 
     print("\n🤖 Hello, Teacher! I am your Humanoid Classroom Robot, ready to assist you today.")
     
@@ -69,13 +145,15 @@ def main():
             print(f"\nIt seems you are leaving, {teacher_name}. I hope I was able to help you! Goodbye 👋")
             break
 
-        if not cmd:
+        try:
+            command = parse_command(cmd)
+        except CommandError:
+            print(f"\nOops! I didn’t understand that command. Type 'help' to see what I can do.")
+            continue
+        if command is None:
             continue
 
-        parts = cmd.split()
-        verb = parts[0].lower()
-
-        if verb == "exit":
+        if command.verb == "exit":
             confirm = input(f"\n{teacher_name}, are you sure you want me to power down? (y/n): ").strip().lower()
             if confirm in ["y", "yes"]:
                 print(f"\nMission complete, {teacher_name}! I’m going to recharge. See you next time! 🤖⚡")
@@ -84,56 +162,29 @@ def main():
                 print(f"\nPhew! I’m still here. Ready for your next command!")
                 continue
 
-        elif verb == "help":
-            print(f"\nHere’s what I can do for you, {teacher_name}:")
-            print(COMMANDS_GUIDE)
-
-        elif verb == "deliver" and len(parts) >= 4:
-            item = parts[1]
-            from_loc = parts[2]
-            to_loc = " ".join(parts[3:])
-            result = robot.deliver_material(item, from_loc, to_loc)
-            if "Delivered" in result:
-                print(f"\nAll done, {teacher_name}! I successfully delivered {item} from {from_loc} to {to_loc}. 📦✅")
-            else:
-                print(f"\nOops, {teacher_name}! I couldn’t deliver {item}. Please check the locations and try again.")
-
-        elif verb == "monitor":
-            res = robot.monitor_environment()
-            temp = res.get('temperature')
-            issue = res.get('issue')
-            if issue:
-                print(f"\n⚠️ Alert, {teacher_name}! The classroom temperature is {temp}°C — outside my safe range.")
-            else:
-                print(f"\nThe classroom temperature is {temp}°C. Everything is optimal for learning, {teacher_name}!")
-
-        elif verb == "greet" and len(parts) >= 2:
-            name = " ".join(parts[1:])
-            greeting = robot.greet_student(name)
-            print(f"\nAffirmative, {teacher_name}: {greeting}")
-
-        elif verb == "status":
-            status = robot.get_status()
-            state = status.get('state', 'unknown')
-            tasks = status.get('task_queue', [])
-            print(f"\nCurrent Status, {teacher_name}: {state}")
-            if tasks:
-                print("Here are my pending tasks:")
-                for t in tasks:
-                    print(f"  - {t}")
-            else:
-                print("No pending tasks. I’m all clear and ready for the next instruction!")
-
-        elif verb == "undo":
-            last = robot.interaction.undo_last()
-            if last:
-                action, who = last
-                print(f"\n{teacher_name}, I undid my last action: {action} for {who or 'robot'}.")
-            else:
-                print(f"\nNothing to undo right now, {teacher_name}. Everything’s up to date!")
-
-        else:
-            print(f"\nOops! I didn’t understand that command. Type 'help' to see what I can do.")
+        INTERACTIVE_HANDLERS[command.verb](dispatcher, command, teacher_name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Humanoid Classroom Robot command line")
+    parser.add_argument("--script", metavar="FILE",
+                        help="run commands from FILE ('-' for stdin) without prompts, "
+                             "printing one JSON result per line")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="with --script, write Prometheus-format metrics to FILE at the end")
+    options = parser.parse_args(argv)
+    if options.script is None:
+        interactive()
+        return
+    metrics = MetricsRegistry() if options.metrics else None
+    robot = RobotController("R-001", verbose=False, metrics=metrics)
+    if options.script == "-":
+        run_script(sys.stdin, robot, sys.stdout)
+    else:
+        with open(options.script, encoding="utf-8") as fh:
+            run_script(fh, robot, sys.stdout)
+    if metrics is not None:
+        metrics.write_textfile(options.metrics)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,200 @@
+# src/commands.py
+"""
+Command Parsing and Dispatch for Humanoid Classroom Robot
+----------------------------------------------------------
+Turns command lines into structured commands and runs them against a
+RobotController through a dispatch table.
+
+Grammar (keywords are case-insensitive):
+    deliver <item> from <source> to <destination> [priority <n>]
+    deliver <item> <source> <destination>        (older positional form)
+    monitor
+    greet <name>
+    status
+    undo [<n>] [for <who>]
+    help
+    exit
+
+Classes:
+    - Command: A parsed command (verb and arguments).
+    - CommandError: Raised for unknown or malformed commands.
+    - CommandDispatcher: Executes commands and returns JSON-friendly results.
+
+Functions:
+    - parse_command: Parse one command line.
+    - run_script: Stream command lines through a robot, writing one JSON
+      result per line.
+"""
+
+import json
+import re
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, TextIO
+
+from .robot_controller import RobotController
+
+_DELIVER = re.compile(
+    r"(?P<item>.+?)\s+from\s+(?P<source>.+?)\s+to\s+(?P<destination>.+?)"
+    r"(?:\s+priority\s+(?P<priority>-?\d+))?",
+    re.IGNORECASE,
+)
+_UNDO = re.compile(r"(?:(?P<count>\d+)\s*)?(?:for\s+(?P<who>.+))?", re.IGNORECASE)
+
+
+class CommandError(ValueError):
+    """Raised when a command line cannot be parsed."""
+
+
+class Command(NamedTuple):
+    verb: str
+    args: Dict
+
+
+def _parse_deliver(rest: str) -> Dict:
+    m = _DELIVER.fullmatch(rest)
+    if m:
+        priority = m.group("priority")
+        return {"item": m.group("item"), "source": m.group("source"),
+                "destination": m.group("destination"),
+                "priority": int(priority) if priority else 0}
+    parts = rest.split()
+    if len(parts) >= 3 and not any(p.lower() in ("from", "to") for p in parts):
+        return {"item": parts[0], "source": parts[1], "destination": " ".join(parts[2:]), "priority": 0}
+    raise CommandError("Usage: deliver <item> from <source> to <destination>")
+
+
+def _parse_greet(rest: str) -> Dict:
+    if not rest:
+        raise CommandError("Usage: greet <name>")
+    return {"name": rest}
+
+
+def _parse_undo(rest: str) -> Dict:
+    m = _UNDO.fullmatch(rest)
+    if not m:
+        raise CommandError("Usage: undo [<n>] [for <who>]")
+    count = m.group("count")
+    return {"count": int(count) if count else 1, "who": m.group("who")}
+
+
+def _no_args(verb: str) -> Callable[[str], Dict]:
+    def parse(rest: str) -> Dict:
+        if rest:
+            raise CommandError(f"'{verb}' takes no arguments")
+        return {}
+    return parse
+
+
+_PARSERS: Dict[str, Callable[[str], Dict]] = {
+    "deliver": _parse_deliver,
+    "greet": _parse_greet,
+    "monitor": _no_args("monitor"),
+    "status": _no_args("status"),
+    "undo": _parse_undo,
+    "help": _no_args("help"),
+    "exit": _no_args("exit"),
+}
+
+
+def parse_command(line: str) -> Optional[Command]:
+    """
+    Parse a single command line.
+
+    Returns:
+        Optional[Command]: The parsed command, or None for a blank line.
+
+    Raises:
+        CommandError: If the verb is unknown or its arguments are malformed.
+    """
+    verb, _, rest = line.strip().partition(" ")
+    if not verb:
+        return None
+    verb = verb.lower()
+    parser = _PARSERS.get(verb)
+    if parser is None:
+        raise CommandError(f"Unknown command: {verb}")
+    return Command(verb, parser(rest.strip()))
+
+
+class CommandDispatcher:
+    """
+    Runs parsed commands against a robot using a verb -> handler table.
+
+    Attributes:
+        robot (RobotController): The robot commands are sent to.
+    """
+
+    def __init__(self, robot: RobotController):
+        self.robot = robot
+        self._handlers: Dict[str, Callable[[Dict], Dict]] = {
+            "deliver": self._deliver,
+            "monitor": self._monitor,
+            "greet": self._greet,
+            "status": self._status,
+            "undo": self._undo,
+        }
+
+    def dispatch(self, command: Command) -> Dict:
+        """Execute a command and return its result."""
+        handler = self._handlers.get(command.verb)
+        if handler is None:
+            raise CommandError(f"'{command.verb}' cannot be dispatched")
+        return handler(command.args)
+
+    def _deliver(self, args: Dict) -> Dict:
+        result = self.robot.deliver_material(args["item"], args["source"], args["destination"],
+                                             args["priority"], requester=args.get("requester"))
+        return {"delivered": result.startswith("Delivered"), "message": result}
+
+    def _monitor(self, args: Dict) -> Dict:
+        return self.robot.monitor_environment()
+
+    def _greet(self, args: Dict) -> Dict:
+        return {"greeting": self.robot.greet_student(args["name"])}
+
+    def _status(self, args: Dict) -> Dict:
+        return self.robot.get_status(summary=True)
+
+    def _undo(self, args: Dict) -> Dict:
+        undone = self.robot.interaction.undo_many(int(args.get("count", 1)), args.get("who"))
+        return {"undone": list(undone[0][:2]) if undone else None,
+                "outcome": undone[0][2] if undone else None, "count": len(undone),
+                "all": [list(u[:2]) for u in undone], "outcomes": [u[2] for u in undone]}
+
+
+def run_script(lines: Iterable[str], robot: RobotController, out: TextIO) -> Dict[str, int]:
+    """
+    Stream commands through a robot without prompts.
+
+    Each non-blank line produces one JSON object on ``out``:
+    ``{"line": n, "command": verb, "ok": true, "result": {...}}`` or
+    ``{"line": n, "ok": false, "error": "..."}``, also when a command
+    raises unexpectedly. ``exit`` stops the script.
+
+    Returns:
+        Dict[str, int]: Counts of processed and failed lines.
+    """
+    dispatcher = CommandDispatcher(robot)
+    dumps = json.dumps
+    write = out.write
+    processed = errors = 0
+    for n, line in enumerate(lines, 1):
+        try:
+            command = parse_command(line)
+            if command is None:
+                continue
+            if command.verb == "exit":
+                break
+            if command.verb == "help":
+                record = {"line": n, "command": "help", "ok": True, "result": {"verbs": sorted(_PARSERS)}}
+            else:
+                record = {"line": n, "command": command.verb, "ok": True, "result": dispatcher.dispatch(command)}
+        except CommandError as exc:
+            record = {"line": n, "ok": False, "error": str(exc)}
+            errors += 1
+        except Exception as exc:
+            # One failing command must not abort the rest of the script.
+            record = {"line": n, "ok": False, "error": f"Internal error: {exc}"}
+            errors += 1
+        processed += 1
+        write(dumps(record) + "\n")
+    return {"processed": processed, "errors": errors}
@@ -0,0 +1,235 @@
+# src/district.py
+"""
+District Simulation for Humanoid Classroom Robots
+--------------------------------------------------
+Runs many independent classroom simulations across a pool of worker
+processes and merges their results into one district report.
+
+Classes:
+    - DistrictRunner: Splits classrooms into batches, runs each batch in a
+      worker process and merges the per-classroom reports.
+
+Functions:
+    - run_batch: Simulate a contiguous range of classrooms (runs in a worker).
+    - main: Command-line entry point printing a JSON report.
+
+Key Features:
+    - Workers receive a small tuple of parameters per batch, not pickled
+      robots or tasks, and each classroom derives its own seed from it
+    - A batch is returned as three packed ``array`` buffers: summed
+      counters plus the wait and latency histograms, merged bucket by bucket
+    - Reports are identical for any number of workers and the same seed
+"""
+
+import argparse
+import json
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .metrics import Histogram
+from .retry import RetryPolicy
+from .simulation import MINUTES_PER_DAY, SchoolSimulation, default_workloads
+
+# Per-batch counters, summed across classrooms (queue_max takes the maximum).
+FIELDS = ("classrooms", "arrived", "delivered", "failed", "pending", "events",
+          "temperature_anomalies", "busy_minutes", "queue_area", "queue_max",
+          "completed_tasks", "history_count", "interaction_count", "temperature_sum",
+          "attempts", "retries", "dead_lettered", "cpu_seconds")
+_QUEUE_MAX = FIELDS.index("queue_max")
+
+# (first classroom, stop, robots per classroom, days, rate per hour, seed, retries)
+BatchSpec = Tuple[int, int, int, float, float, int, int]
+BatchResult = Tuple[bytes, bytes, bytes]
+
+
+def _pack_histogram(hist: Histogram) -> bytes:
+    head = array("d", [hist.count, hist.sum, hist.max])
+    body = array("q")
+    for idx, n in hist.counts.items():
+        body.append(idx)
+        body.append(n)
+    return head.tobytes() + body.tobytes()
+
+
+def _unpack_histogram(data: bytes) -> Histogram:
+    head = array("d")
+    head.frombytes(data[:24])
+    body = array("q")
+    body.frombytes(data[24:])
+    hist = Histogram()
+    hist.count, hist.sum, hist.max = int(head[0]), head[1], head[2]
+    hist.counts = dict(zip(body[::2], body[1::2]))
+    return hist
+
+
+def run_batch(spec: BatchSpec) -> BatchResult:
+    """
+    Simulate classrooms ``start`` to ``stop - 1`` and pack their totals.
+
+    Args:
+        spec (BatchSpec): Classroom range and simulation parameters.
+
+    Returns:
+        BatchResult: Packed counters (in ``FIELDS`` order), wait histogram
+        and latency histogram.
+    """
+    start, stop, robots, days, rate, seed, retries = spec
+    totals = [0.0] * len(FIELDS)
+    wait, latency = Histogram(), Histogram()
+    for classroom in range(start, stop):
+        cpu = time.process_time()
+        policy = RetryPolicy(max_attempts=retries + 1) if retries else None
+        sim = SchoolSimulation(robots, default_workloads(rate), seed=seed * 1_000_003 + classroom,
+                               retry_policy=policy)
+        report = sim.run(days)
+        statuses = [robot.get_status(summary=True) for robot in sim.robots]
+        retry = report.get("retry", {})
+        values = (1, report["arrived"], report["delivered"], report["failed"], report["pending"],
+                  report["events"], report["temperature_anomalies"],
+                  report["busy_minutes"], report["queue_area"], report["queue_max"],
+                  sim.task_manager.retry_stats()["succeeded"],
+                  sum(s["history_count"] for s in statuses),
+                  sum(s["interaction_count"] for s in statuses),
+                  sum(s["temperature"] for s in statuses),
+                  retry.get("attempts", 0), retry.get("retries", 0), retry.get("dead_lettered", 0),
+                  time.process_time() - cpu)
+        for i, v in enumerate(values):
+            totals[i] = max(totals[i], v) if i == _QUEUE_MAX else totals[i] + v
+        wait.merge(sim.wait_seconds)
+        latency.merge(sim.latency_seconds)
+    return array("d", totals).tobytes(), _pack_histogram(wait), _pack_histogram(latency)
+
+
+class DistrictRunner:
+    """
+    Simulates a district of independent classrooms on several CPU cores.
+
+    Attributes:
+        classrooms (int): Number of classrooms, each with its own robots,
+            task stream and sensors.
+        robots_per_classroom (int): Robots in each classroom.
+        workers (int): Worker processes; 1 runs everything in this process.
+        batch_size (int): Classrooms per message sent to a worker.
+    """
+
+    def __init__(self, classrooms: int = 100, robots_per_classroom: int = 1,
+                 workers: Optional[int] = None, batch_size: int = 8):
+        if classrooms < 1:
+            raise ValueError("A district needs at least one classroom")
+        self.classrooms = classrooms
+        self.robots_per_classroom = robots_per_classroom
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = max(1, batch_size)
+
+    def _batches(self, days: float, rate: float, seed: int, retries: int) -> Iterator[BatchSpec]:
+        for start in range(0, self.classrooms, self.batch_size):
+            stop = min(start + self.batch_size, self.classrooms)
+            yield (start, stop, self.robots_per_classroom, days, rate, seed, retries)
+
+    def run(self, days: float = 1.0, rate_per_hour: float = 30.0, seed: int = 0, retries: int = 0) -> Dict:
+        """
+        Simulate every classroom and merge the results.
+
+        Args:
+            days (float): Simulated days per classroom.
+            rate_per_hour (float): Requests per school hour in each classroom.
+            seed (int): District seed; classroom ``i`` uses its own derived seed.
+            retries (int): Retries per failed delivery (0 disables retrying).
+
+        Returns:
+            Dict: District totals, merged wait/latency percentiles, summed
+            robot status counts, the wall-clock and CPU time taken and their
+            ratio, ``parallelism``.
+        """
+        wall_start = time.perf_counter()
+        specs = list(self._batches(days, rate_per_hour, seed, retries))
+        if self.workers == 1:
+            results: List[BatchResult] = [run_batch(spec) for spec in specs]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(run_batch, specs))
+        wall_seconds = time.perf_counter() - wall_start
+
+        totals = [0.0] * len(FIELDS)
+        wait, latency = Histogram(), Histogram()
+        for counters, wait_data, latency_data in results:
+            values = array("d")
+            values.frombytes(counters)
+            for i, v in enumerate(values):
+                totals[i] = max(totals[i], v) if i == _QUEUE_MAX else totals[i] + v
+            wait.merge(_unpack_histogram(wait_data))
+            latency.merge(_unpack_histogram(latency_data))
+        t = dict(zip(FIELDS, totals))
+        return self._report(t, wait, latency, days, retries, len(specs), wall_seconds)
+
+    def _report(self, t: Dict[str, float], wait: Histogram, latency: Histogram, days: float,
+                retries: int, batches: int, wall_seconds: float) -> Dict:
+        until = days * MINUTES_PER_DAY
+        robots = self.classrooms * self.robots_per_classroom
+        finished = t["delivered"] + t["failed"]
+
+        def minutes(hist: Histogram) -> Dict[str, float]:
+            return {f"p{int(q * 100)}": round(hist.quantile(q) / 60.0, 2) for q in (0.5, 0.9, 0.99)}
+
+        report = {
+            "classrooms": self.classrooms,
+            "robots": robots,
+            "days": days,
+            "arrived": int(t["arrived"]),
+            "delivered": int(t["delivered"]),
+            "failed": int(t["failed"]),
+            "pending": int(t["pending"]),
+            "throughput_per_hour": round(finished / (until / 60.0), 3) if until else 0.0,
+            "utilisation": round(t["busy_minutes"] / (robots * until), 4) if until else 0.0,
+            "queue_mean": round(t["queue_area"] / (self.classrooms * until), 3) if until else 0.0,
+            "queue_max": int(t["queue_max"]),
+            "wait_minutes": minutes(wait),
+            "latency_minutes": minutes(latency),
+            "temperature_anomalies": int(t["temperature_anomalies"]),
+            "status": {
+                "completed_tasks": int(t["completed_tasks"]),
+                "history_count": int(t["history_count"]),
+                "interaction_count": int(t["interaction_count"]),
+                "mean_temperature": round(t["temperature_sum"] / robots, 2),
+            },
+            "events": int(t["events"]),
+            "workers": self.workers,
+            "batches": batches,
+            "wall_seconds": round(wall_seconds, 3),
+            "cpu_seconds": round(t["cpu_seconds"], 3),
+            # Average number of cores kept busy, not a speedup: that needs a
+            # one-worker run to compare with (see benchmarks.bench_district).
+            "parallelism": round(t["cpu_seconds"] / wall_seconds, 2) if wall_seconds else 0.0,
+        }
+        if retries:
+            attempts = t["attempts"]
+            report["retry"] = {
+                "attempts": int(attempts),
+                "retries": int(t["retries"]),
+                "dead_lettered": int(t["dead_lettered"]),
+                "goodput": round(t["delivered"] / attempts, 4) if attempts else 0.0,
+                "retry_amplification": round(attempts / finished, 4) if finished else 0.0,
+            }
+        return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Simulate a district of classrooms on several cores.")
+    parser.add_argument("--classrooms", type=int, default=100)
+    parser.add_argument("--robots", type=int, default=1, help="robots per classroom")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=8, help="classrooms per worker message")
+    parser.add_argument("--days", type=float, default=1.0)
+    parser.add_argument("--rate", type=float, default=30.0, help="requests per school hour per classroom")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--retries", type=int, default=0)
+    options = parser.parse_args(argv)
+    runner = DistrictRunner(options.classrooms, options.robots, options.workers, options.batch_size)
+    print(json.dumps(runner.run(options.days, options.rate, options.seed, options.retries), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+# src/events.py
+"""
+Event Bus for Humanoid Classroom Robot
+---------------------------------------
+Publish/subscribe delivery of robot events (state changes, dispatched,
+completed and failed tasks, anomalies, messages) to pluggable sinks, so
+slow output such as a terminal never blocks the robot.
+
+Classes:
+    - Level: Event severity.
+    - Event: One published event.
+    - Subscription: A sink's bounded queue, level filter and drop policy.
+    - EventBus: Queues events per subscriber and writes them to the sinks in
+      batches from a background thread.
+    - ConsoleSink: Writes events to a text stream, one write per batch.
+    - FileSink: Appends events to a JSON-lines file.
+    - MetricsSink: Counts events in a MetricsRegistry.
+
+Functions:
+    - console_bus: The process-wide bus that verbose robots print through.
+
+Key Features:
+    - ``publish`` never blocks: it appends to bounded in-memory queues and
+      returns; events below every subscriber's level cost one comparison
+    - When a queue is full the oldest (``drop_oldest``) or the new
+      (``drop_newest``) event is dropped and counted
+    - ``flush`` delivers everything queued so far from the calling thread
+    - However many verbose robots there are, they share one console bus and
+      so one delivery thread
+"""
+
+import atexit
+import itertools
+import json
+import sys
+import threading
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Callable, Collection, Deque, List, NamedTuple, Optional, TextIO, Union
+
+from .metrics import MetricsRegistry
+
+
+class Level(IntEnum):
+    """Severity of an event."""
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+    ERROR = 40
+
+
+class Event(NamedTuple):
+    """A robot event."""
+    seq: int
+    timestamp: float
+    level: Level
+    kind: str
+    source: str
+    message: str
+    data: Optional[dict]
+
+
+BatchHandler = Callable[[List[Event]], None]
+
+
+class ConsoleSink:
+    """
+    Writes events to a text stream (stdout by default) with one write and
+    one flush per batch. Messages appear as ``Robot: <message>``; other
+    kinds are prefixed with their level and source.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+
+    @staticmethod
+    def format(event: Event) -> str:
+        if event.kind in ("message", "dispatched"):
+            return f"Robot: {event.message}"
+        return f"[{event.level.name}] {event.source} {event.kind}: {event.message}"
+
+    def write_batch(self, events: List[Event]) -> None:
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write("".join(self.format(e) + "\n" for e in events))
+        stream.flush()
+
+
+class FileSink:
+    """Appends events to a JSON-lines file, one write per batch."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write_batch(self, events: List[Event]) -> None:
+        dumps = json.dumps
+        self._file.write("".join(
+            dumps({"seq": e.seq, "ts": e.timestamp, "level": e.level.name, "kind": e.kind,
+                   "source": e.source, "message": e.message, "data": e.data}) + "\n"
+            for e in events))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class MetricsSink:
+    """Counts events as ``robot_events_total{kind,level}``."""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+
+    def write_batch(self, events: List[Event]) -> None:
+        counts = {}
+        for e in events:
+            key = (e.kind, e.level.name)
+            counts[key] = counts.get(key, 0) + 1
+        for (kind, level), n in counts.items():
+            self.registry.counter("robot_events_total", "Events published on the event bus",
+                                  kind=kind, level=level).inc(n)
+
+
+class Subscription:
+    """
+    A subscriber's queue.
+
+    Attributes:
+        level (Level): Lowest level delivered.
+        kinds (Optional[Collection[str]]): Kinds delivered (all if None).
+        capacity (int): Maximum queued events.
+        policy (str): "drop_oldest" or "drop_newest" when the queue is full.
+        dropped (int): Events dropped because the queue was full.
+        delivered (int): Events handed to the sink.
+    """
+
+    def __init__(self, handler: BatchHandler, level: Level, kinds: Optional[Collection[str]],
+                 capacity: int, policy: str, close: Optional[Callable[[], None]] = None):
+        if policy not in ("drop_oldest", "drop_newest"):
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.handler = handler
+        self.level = level
+        self.kinds = frozenset(kinds) if kinds is not None else None
+        self.capacity = capacity
+        self.policy = policy
+        self.dropped = 0
+        self.delivered = 0
+        self._close = close
+        self._queue: Deque[Event] = deque(maxlen=capacity if policy == "drop_oldest" else None)
+
+    def offer(self, event: Event) -> bool:
+        """Queue an event; False if the queue was full (the event or the oldest one was dropped)."""
+        queue = self._queue
+        if len(queue) >= self.capacity:
+            self.dropped += 1
+            if self.policy == "drop_newest":
+                return False
+            queue.append(event)
+            return False
+        queue.append(event)
+        return True
+
+    def drain(self, batch_size: int) -> int:
+        """Hand queued events to the sink in batches; returns the number delivered."""
+        queue = self._queue
+        total = 0
+        while queue:
+            batch = []
+            try:
+                for _ in range(batch_size):
+                    batch.append(queue.popleft())
+            except IndexError:
+                pass
+            self.handler(batch)
+            total += len(batch)
+        self.delivered += total
+        return total
+
+
+class EventBus:
+    """
+    Non-blocking publish/subscribe bus with batched background delivery.
+
+    Attributes:
+        batch_size (int): Maximum events per sink write.
+        flush_interval (float): Seconds the delivery thread waits between
+            drains when no queue has filled a batch.
+        errors (int): Sink exceptions swallowed by the delivery thread.
+    """
+
+    def __init__(self, batch_size: int = 256, flush_interval: float = 0.05,
+                 clock: Callable[[], float] = time.time):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.errors = 0
+        self._subscriptions: List[Subscription] = []
+        self._min_level = Level.ERROR + 1
+        self._seq = itertools.count(1)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._drain_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, sink: Union[BatchHandler, object], level: Level = Level.INFO,
+                  kinds: Optional[Collection[str]] = None, capacity: int = 10000,
+                  policy: str = "drop_oldest") -> Subscription:
+        """
+        Register a sink.
+
+        Args:
+            sink: An object with ``write_batch(events)`` (and optionally
+                ``close()``), or a function taking a list of events.
+            level (Level): Lowest level delivered to this sink.
+            kinds (Optional[Collection[str]]): Only these kinds (all if None).
+            capacity (int): Bound on the sink's queue.
+            policy (str): "drop_oldest" or "drop_newest" when the queue is full.
+
+        Returns:
+            Subscription: Handle for ``unsubscribe`` and drop statistics.
+        """
+        handler = getattr(sink, "write_batch", sink)
+        subscription = Subscription(handler, Level(level), kinds, capacity, policy,
+                                    getattr(sink, "close", None))
+        self._subscriptions = self._subscriptions + [subscription]
+        self._min_level = min(s.level for s in self._subscriptions)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+        self._min_level = min((s.level for s in self._subscriptions), default=Level.ERROR + 1)
+
+    def enabled(self, level: Level) -> bool:
+        """Whether any subscriber would receive an event at ``level``."""
+        return level >= self._min_level
+
+    def publish(self, kind: str, message: str, level: Level = Level.INFO, source: str = "",
+                data: Optional[dict] = None) -> None:
+        """
+        Queue an event for every interested subscriber without blocking.
+
+        Args:
+            kind (str): Event kind, e.g. "state", "dispatched", "completed",
+                "failed", "anomaly" or "message".
+            message (str): Human-readable text.
+            level (Level): Severity.
+            source (str): Who published it, e.g. a robot ID.
+            data (Optional[dict]): Structured details.
+        """
+        if level < self._min_level:
+            return
+        event = None
+        for sub in self._subscriptions:
+            if level < sub.level or (sub.kinds is not None and kind not in sub.kinds):
+                continue
+            if event is None:
+                event = Event(next(self._seq), self.clock(), level, kind, source, message, data)
+            sub.offer(event)
+            if len(sub._queue) >= self.batch_size:
+                self._wake.set()
+
+    def flush(self) -> int:
+        """Deliver every queued event now, from the calling thread."""
+        total = 0
+        with self._drain_lock:
+            for sub in self._subscriptions:
+                try:
+                    total += sub.drain(self.batch_size)
+                except Exception:
+                    self.errors += 1
+        return total
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self) -> "EventBus":
+        """Start the background delivery thread."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="event-bus", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def close(self) -> None:
+        """Stop the delivery thread, deliver what is left and close the sinks."""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+            atexit.unregister(self.close)
+        self.flush()
+        for sub in self._subscriptions:
+            if sub._close is not None:
+                sub._close()
+
+
+_console_bus: Optional[EventBus] = None
+_console_lock = threading.Lock()
+
+
+def console_bus() -> EventBus:
+    """
+    The bus verbose robots without a bus of their own publish on: messages
+    and dispatched tasks go to stdout. It is created and started on first
+    use and closed at interpreter exit.
+    """
+    global _console_bus
+    with _console_lock:
+        if _console_bus is None:
+            bus = EventBus()
+            bus.subscribe(ConsoleSink(), kinds=("message", "dispatched"))
+            _console_bus = bus.start()
+        return _console_bus
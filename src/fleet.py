@@ -0,0 +1,166 @@
+# src/fleet.py
+"""
+Fleet Dispatcher for Humanoid Classroom Robots
+-----------------------------------------------
+Runs several RobotController workers against one shared TaskManager.
+
+Classes:
+    - FleetDispatcher: Runs each robot in its own worker thread; workers
+      take deliveries from the shared queue in order of their projected
+      simulated finish time, so the least-loaded robot goes next.
+
+Key Features:
+    - One thread-safe task queue shared by the whole fleet
+    - Least-loaded turn-taking using each robot's travel estimates
+    - Tasks that raise go back on the queue and the first error is re-raised
+    - Aggregate throughput and queue wait times in simulated minutes
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .robot_controller import RobotController
+from .task_manager import TaskManager
+from .tasks import DeliveryTask, TaskStatus
+
+
+class FleetDispatcher:
+    """
+    Dispatches deliveries from a shared TaskManager to a fleet of robots.
+
+    Attributes:
+        task_manager (TaskManager): Queue shared by all robots.
+        robots (List[RobotController]): Robots in the fleet.
+    """
+
+    def __init__(self, robot_count: int, task_manager: Optional[TaskManager] = None,
+                 robot_factory: Optional[Callable[[str, TaskManager], RobotController]] = None):
+        """
+        Create a fleet of ``robot_count`` robots sharing one task queue.
+
+        Args:
+            robot_count (int): Number of robots (worker threads).
+            task_manager (Optional[TaskManager]): Shared queue; a new one is created if omitted.
+            robot_factory (Optional[Callable]): Builds a robot from an id and the shared queue.
+        """
+        if robot_count < 1:
+            raise ValueError("A fleet needs at least one robot")
+        self.task_manager = task_manager if task_manager is not None else TaskManager("FLEET")
+        if robot_factory is None:
+            def robot_factory(id_: str, tm: TaskManager) -> RobotController:
+                return RobotController(id_, task_manager=tm, verbose=False)
+        self.robots: List[RobotController] = [
+            robot_factory(f"R-{i + 1:03d}", self.task_manager) for i in range(robot_count)
+        ]
+        # Task ID -> simulated minute it was submitted, for queue wait times.
+        self._submitted: Dict[int, float] = {}
+
+    def now(self) -> float:
+        """The fleet's simulated minute: that of the robot furthest behind."""
+        return min(r.sim_minutes for r in self.robots)
+
+    def submit(self, item: str, from_location: str, to_location: str,
+               priority: int = 0, deadline: Optional[float] = None) -> DeliveryTask:
+        """Queue a delivery for whichever robot becomes available."""
+        task = DeliveryTask.create(item, from_location, to_location, priority, deadline)
+        self._submitted[task.id] = self.now()
+        self.task_manager.enqueue_task(task)
+        return task
+
+    def run(self) -> Dict:
+        """
+        Drain the shared queue across the fleet and wait for every robot to finish.
+
+        Every robot's worker thread takes its next task from the shared queue
+        itself, but only when that robot has the earliest projected finish
+        time, so work goes to the least-loaded robot in simulated time. Tasks
+        queued while the fleet runs are picked up too. If running a task
+        raises, the robot recovers and carries on; once the queue is drained
+        the tasks that raised are put back on the queue and the first
+        exception is re-raised. A request's queue wait runs from the
+        simulated minute it was submitted (the fleet's start for tasks
+        queued on the TaskManager directly) to the start of its trip.
+
+        Returns:
+            Dict: Completed/failed counts, per-robot task counts, makespan and
+            throughput (tasks per simulated minute) and queue wait statistics.
+        """
+        robots = self.robots
+        starts = [r.sim_minutes for r in robots]
+        fleet_start = min(starts)
+        submitted = self._submitted
+        waits: List[List[float]] = [[] for _ in robots]
+        results: List[Dict[str, int]] = [{"delivered": 0, "failed": 0} for _ in robots]
+        # Projected finish time and location of every robot still working.
+        free_at = list(starts)
+        where = [r.location for r in robots]
+        active = set(range(len(robots)))
+        errors: List[Tuple[DeliveryTask, Exception]] = []
+        turn = threading.Condition()
+
+        def claim(i: int) -> Optional[DeliveryTask]:
+            with turn:
+                while min(active, key=lambda j: (free_at[j], j)) != i:
+                    turn.wait()
+                task = self.task_manager.dequeue_task()
+                if task is not None:
+                    free_at[i] += robots[i].estimate_task_minutes(task, start=where[i])
+                    where[i] = task.to_location
+                turn.notify_all()
+                return task
+
+        def worker(i: int) -> None:
+            robot = robots[i]
+            try:
+                while True:
+                    task = claim(i)
+                    if task is None:
+                        return
+                    for t in task.deliveries():
+                        waits[i].append(max(0.0, robot.sim_minutes - submitted.get(t.id, fleet_start)))
+                    try:
+                        outcome = robot.run_task(task)
+                    except Exception as exc:
+                        errors.append((task, exc))
+                        robot.recover_from_error()
+                        continue
+                    if task.status is not TaskStatus.RETRYING:
+                        for t in task.deliveries():
+                            submitted.pop(t.id, None)
+                    results[i]["delivered" if outcome.startswith("Delivered") else "failed"] += 1
+            finally:
+                # However the worker ends, the others must stop waiting for its turn.
+                with turn:
+                    active.discard(i)
+                    turn.notify_all()
+
+        wall_start = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(len(robots))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall_seconds = time.perf_counter() - wall_start
+        if errors:
+            for task, _ in errors:
+                if self.task_manager.get_task(task.id) is None:
+                    self.task_manager.enqueue_task(task)
+            raise errors[0][1]
+
+        busy = [r.sim_minutes - s for r, s in zip(robots, starts)]
+        makespan = max(busy)
+        all_waits = [w for ws in waits for w in ws]
+        total = sum(r["delivered"] + r["failed"] for r in results)
+        return {
+            "robots": len(robots),
+            "tasks": total,
+            "delivered": sum(r["delivered"] for r in results),
+            "failed": sum(r["failed"] for r in results),
+            "per_robot": {r.id: res["delivered"] + res["failed"] for r, res in zip(robots, results)},
+            "makespan_minutes": round(makespan, 3),
+            "throughput": total / makespan if makespan else 0.0,
+            "mean_wait_minutes": sum(all_waits) / len(all_waits) if all_waits else 0.0,
+            "max_wait_minutes": max(all_waits, default=0.0),
+            "wall_seconds": wall_seconds,
+        }
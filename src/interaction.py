@@ -4,18 +4,24 @@ Interaction Module for Humanoid Classroom Robot
 Handles user and robot interactions, logging, and undo functionality.
 
 Classes:
-    - InteractionModule: Manages interaction logs, displays messages, 
+    - InteractionModule: Manages interaction logs, displays messages,
       records actions, and allows undoing the last interaction.
 
 Key Features:
     - Logging actions performed by or for the robot
     - Returning messages to display to users
-    - Undoing the most recent interaction
-    - Retrieving full interaction history
-    - Optional verbose/debug mode for developers
+    - Undoing the most recent interactions, overall or of one person, by
+      running their compensating actions; only a bounded number are kept
+    - Paginated and filtered access to the interaction history, bounded in
+      memory or persisted to a segmented on-disk log
+    - Optional verbose/debug mode for developers, published on an EventBus
+      when one is given
 """
 
 from typing import List, Tuple, Optional
+from .interaction_log import InteractionLog, LogEntry
+from .events import EventBus, Level
+from .undo import Compensation, UndoEntry, UndoHistory
 
 
 class InteractionModule:
@@ -24,16 +30,21 @@ class InteractionModule:
 
     Attributes:
         id (str): Identifier for this interaction module instance.
-        interaction_log (List[Tuple[str, Optional[str]]]): History of all actions.
-        undo_stack (List[Tuple[str, Optional[str]]]): Stack for undoable actions.
+        interaction_log (InteractionLog): History of all actions.
+        undo_history (UndoHistory): The most recent undoable actions.
         verbose (bool): If True, prints debug messages for developers.
+        events (Optional[EventBus]): Receives the verbose messages as DEBUG
+            events instead of printing them.
     """
 
-    def __init__(self, id_: str, verbose: bool = False):
+    def __init__(self, id_: str, verbose: bool = False, log_dir: Optional[str] = None,
+                 events: Optional[EventBus] = None, undo_capacity: int = 1000,
+                 log_capacity: Optional[int] = 100000):
         self.id = id_
         self.verbose = verbose
-        self.interaction_log: List[Tuple[str, Optional[str]]] = []
-        self.undo_stack: List[Tuple[str, Optional[str]]] = []
+        self.events = events
+        self.interaction_log = InteractionLog(log_dir, max_entries=log_capacity)
+        self.undo_history = UndoHistory(undo_capacity)
 
     def display_message(self, message: str) -> str:
         """
@@ -47,39 +58,109 @@ class InteractionModule:
         """
         return f"Robot: {message}"
 
-    def log_interaction(self, action: str, who: Optional[str] = None) -> None:
+    def _debug(self, message: str) -> None:
+        if self.events is not None:
+            self.events.publish("interaction", message, Level.DEBUG, self.id)
+        else:
+            print(f"[InteractionModule] {message}")
+
+    def log_interaction(self, action: str, who: Optional[str] = None,
+                        compensate: Optional[Compensation] = None, undoable: bool = True) -> None:
         """
-        Record an action in the logs and undo stack.
+        Record an action in the logs and undo history.
 
         Args:
             action (str): Description of the action.
             who (Optional[str]): Who performed or received the action.
+            compensate (Optional[Compensation]): Called when the action is
+                undone to reverse its effect.
+            undoable (bool): If False the action is only logged, e.g. the
+                trip an undo itself made.
         """
-        self.interaction_log.append((action, who))
-        self.undo_stack.append((action, who))
+        entry = self.interaction_log.append(action, who)
+        if undoable:
+            self.undo_history.push(UndoEntry(entry.seq, action, who, compensate))
         if self.verbose:
-            print(f"[InteractionModule] logged: {action} {who or 'robot'}")
+            self._debug(f"logged: {action} {who or 'robot'}")
 
-    def undo_last(self) -> tuple | None:
+    def undo_last(self, who: Optional[str] = None) -> tuple | None:
         """
-        Undo the most recent logged action.
+        Undo the most recent logged action, or the most recent one of ``who``.
+
+        The action's compensation runs first, then an "undo" entry retracting
+        it is logged.
+
+        Args:
+            who (Optional[str]): Only undo this person's actions.
 
         Returns:
-        tuple | None: (action, who) of the undone action, or None if nothing to undo.
+        tuple | None: (action, who, outcome) of the undone action, where
+        outcome is what its compensation returned (e.g. the result of a
+        return trip), or None if nothing to undo.
         """
-        if not self.undo_stack:
+        entry = self.undo_history.pop(who)
+        if entry is None:
             return None
-        action, who = self.undo_stack.pop()
-        self.interaction_log.append(("undo", who))
+        return self._undo(entry)
+
+    def undo_many(self, count: int, who: Optional[str] = None) -> List[Tuple[str, Optional[str], object]]:
+        """
+        Undo up to ``count`` of the most recent actions (of ``who`` if given), newest first.
+
+        Returns:
+            List[Tuple[str, Optional[str], object]]: (action, who, outcome) of every undone action.
+        """
+        return [self._undo(entry) for entry in self.undo_history.pop_many(count, who)]
+
+    def _undo(self, entry: UndoEntry) -> Tuple[str, Optional[str], object]:
+        outcome = entry.compensate() if entry.compensate is not None else None
+        self.interaction_log.append("undo", entry.who)
         if self.verbose:
-            print(f"[InteractionModule] undo: {action} {who or 'robot'}")
-        return (action, who)
+            self._debug(f"undo: {entry.action} {entry.who or 'robot'}")
+        return (entry.action, entry.who, outcome)
+
+    @property
+    def version(self) -> int:
+        """Number of entries ever logged; grows by one per logged interaction."""
+        return len(self.interaction_log)
+
+    def get_log(self, since: Optional[int] = None, limit: Optional[int] = None) -> List[Tuple[str, Optional[str]]]:
+        """
+        Retrieve the interaction log, one page at a time.
+
+        Args:
+            since (Optional[int]): Cursor; only entries with a larger ``seq``.
+            limit (Optional[int]): Maximum number of entries to return.
+
+        Returns:
+            List[Tuple[str, Optional[str]]]: (action, who) of the logged
+            interactions, oldest first; ``get_entries`` has the sequence
+            numbers and timestamps too.
+        """
+        return [(e.action, e.who) for e in self.interaction_log.get_log(since=since, limit=limit)]
+
+    def get_entries(self, since: Optional[int] = None, limit: Optional[int] = None) -> List[LogEntry]:
+        """
+        Like ``get_log``, but with every field of the logged interactions.
+
+        Returns:
+            List[LogEntry]: Logged interactions, oldest first.
+        """
+        return self.interaction_log.get_log(since=since, limit=limit)
+
+    def recent_log(self, count: int) -> List[LogEntry]:
+        """The newest ``count`` logged interactions, oldest first."""
+        return self.interaction_log.recent(count)
 
-    def get_log(self) -> List[Tuple[str, Optional[str]]]:
+    def query_log(self, who: Optional[str] = None, action: Optional[str] = None,
+                  start: Optional[float] = None, end: Optional[float] = None,
+                  since: Optional[int] = None, limit: Optional[int] = None) -> List[LogEntry]:
         """
-        Retrieve the interaction log.
+        Retrieve logged interactions matching the given filters, e.g. all
+        greetings for one student since a given time.
 
         Returns:
-            List[Tuple[str, Optional[str]]]: Copy of all logged interactions.
+            List[LogEntry]: Matching interactions, oldest first.
         """
-        return self.interaction_log.copy()
+        return self.interaction_log.query(who=who, action=action, start=start, end=end,
+                                          since=since, limit=limit)
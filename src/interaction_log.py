@@ -0,0 +1,340 @@
+# src/interaction_log.py
+"""
+Interaction Log Store for Humanoid Classroom Robot
+---------------------------------------------------
+Append-only store for interaction records with secondary indexes and
+cursor-based queries.
+
+Classes:
+    - LogEntry: One logged interaction (seq, timestamp, action, who).
+    - InteractionLog: Bounded in-memory store, or a segmented JSONL store on
+      disk when a directory is given.
+
+Key Features:
+    - Indexes by ``who`` and by action, so filtered queries cost O(k) in
+      the matched entries (plus one lookup per segment)
+    - Cursor pagination: ``get_log(since=seq, limit=n)``
+    - In memory, entries are kept in segments too and the oldest segment is
+      dropped, index and all, once ``max_entries`` newer entries exist
+    - On disk, only a small write tail, the open segment's index and a few
+      cached segment indexes stay in memory, regardless of uptime
+    - Reopening a directory continues the existing log
+"""
+
+import bisect
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+_SEGMENT_PREFIX = "segment-"
+
+
+class LogEntry(NamedTuple):
+    """A single logged interaction."""
+    seq: int
+    timestamp: float
+    action: str
+    who: Optional[str]
+
+
+class _SegmentIndex:
+    """Offsets of a segment's entries, overall and by who/action."""
+
+    def __init__(self, first_seq: int):
+        self.first_seq = first_seq
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self.offsets: List[int] = []
+        self.by_who: Dict[str, List[int]] = {}
+        self.by_action: Dict[str, List[int]] = {}
+
+    @property
+    def last_seq(self) -> int:
+        return self.first_seq + len(self.offsets) - 1
+
+    def add(self, entry: LogEntry, offset: int) -> None:
+        pos = len(self.offsets)
+        self.offsets.append(offset)
+        if self.first_ts is None:
+            self.first_ts = entry.timestamp
+        self.last_ts = entry.timestamp
+        self.by_who.setdefault(entry.who or "", []).append(pos)
+        self.by_action.setdefault(entry.action, []).append(pos)
+
+    def to_json(self) -> Dict:
+        return {"first_seq": self.first_seq, "first_ts": self.first_ts, "last_ts": self.last_ts,
+                "offsets": self.offsets, "by_who": self.by_who, "by_action": self.by_action}
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "_SegmentIndex":
+        idx = cls(data["first_seq"])
+        idx.first_ts, idx.last_ts = data["first_ts"], data["last_ts"]
+        idx.offsets = data["offsets"]
+        idx.by_who, idx.by_action = data["by_who"], data["by_action"]
+        return idx
+
+
+class InteractionLog:
+    """
+    Append-only log of interactions.
+
+    Without ``directory`` entries are kept in memory, in segments of
+    ``segment_size`` entries; once the newest ``max_entries`` entries fill the
+    later segments, the oldest segment is forgotten (None keeps everything).
+    With ``directory`` entries go to JSONL segment files of ``segment_size``
+    entries, written in batches of ``flush_every``; each sealed segment gets a
+    JSON index sidecar.
+
+    Attributes:
+        directory (Optional[str]): Where segments are stored, or None.
+        trimmed (int): Entries forgotten by the in-memory store.
+    """
+
+    def __init__(self, directory: Optional[str] = None, segment_size: int = 10000,
+                 flush_every: int = 64, cached_segments: int = 4,
+                 max_entries: Optional[int] = 100000):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.flush_every = flush_every
+        self.cached_segments = cached_segments
+        self.max_entries = max_entries
+        self.trimmed = 0
+        self._next_seq = 0
+        # In-memory mode: (index, entries) per segment, oldest first
+        self._mem_segments: Deque[Tuple[_SegmentIndex, List[LogEntry]]] = deque()
+        # Disk mode
+        self._tail: List[LogEntry] = []
+        self._sealed: List[Dict] = []          # {"first_seq", "last_seq", "first_ts", "last_ts", "name"}
+        self._sealed_starts: List[int] = []
+        self._index_cache: "OrderedDict[str, _SegmentIndex]" = OrderedDict()
+        self._open: Optional[_SegmentIndex] = None
+        self._open_name = ""
+        self._file = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    # -- writing -----------------------------------------------------------
+
+    def append(self, action: str, who: Optional[str] = None) -> LogEntry:
+        """Record an interaction and return the stored entry."""
+        entry = LogEntry(self._next_seq, time.time(), action, who)
+        self._next_seq += 1
+        if self.directory is None:
+            self._append_memory(entry)
+        else:
+            self._tail.append(entry)
+            if len(self._tail) >= self.flush_every:
+                self.flush()
+        return entry
+
+    def _append_memory(self, entry: LogEntry) -> None:
+        segments = self._mem_segments
+        if not segments or len(segments[-1][1]) >= self.segment_size:
+            segments.append((_SegmentIndex(entry.seq), []))
+        idx, entries = segments[-1]
+        idx.add(entry, len(entries))
+        entries.append(entry)
+        if self.max_entries is not None:
+            while self._next_seq - (segments[0][0].last_seq + 1) >= self.max_entries:
+                self.trimmed += len(segments.popleft()[1])
+
+    def flush(self) -> None:
+        """Write buffered entries to the open segment (disk mode only)."""
+        if self.directory is None:
+            return
+        for entry in self._tail:
+            if self._open is None or len(self._open.offsets) >= self.segment_size:
+                self._roll_segment(entry.seq)
+            offset = self._file.tell()
+            self._file.write(json.dumps(list(entry), separators=(",", ":")).encode("utf-8") + b"\n")
+            self._open.add(entry, offset)
+        self._tail.clear()
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        """Flush and close the open segment file."""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __len__(self) -> int:
+        return self._next_seq
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest entry, or -1 if the log is empty."""
+        return self._next_seq - 1
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _roll_segment(self, first_seq: int) -> None:
+        if self._open is not None:
+            self._seal()
+        self._open_name = f"{_SEGMENT_PREFIX}{first_seq:012d}.jsonl"
+        self._open = _SegmentIndex(first_seq)
+        self._file = open(self._segment_path(self._open_name), "ab")
+
+    def _seal(self) -> None:
+        self._file.close()
+        self._file = None
+        idx = self._open
+        # A sidecar is trusted on load, so it must never be seen half written.
+        path = self._segment_path(self._open_name + ".idx")
+        with open(path + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump(idx.to_json(), fh, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+        self._sealed.append({"first_seq": idx.first_seq, "last_seq": idx.last_seq,
+                             "first_ts": idx.first_ts, "last_ts": idx.last_ts, "name": self._open_name})
+        self._sealed_starts.append(idx.first_seq)
+        self._open = None
+
+    def _load(self) -> None:
+        names = sorted(n for n in os.listdir(self.directory)
+                       if n.startswith(_SEGMENT_PREFIX) and n.endswith(".jsonl"))
+        for name in names:
+            idx_path = self._segment_path(name + ".idx")
+            if os.path.exists(idx_path):
+                with open(idx_path, encoding="utf-8") as fh:
+                    idx = _SegmentIndex.from_json(json.load(fh))
+                self._sealed.append({"first_seq": idx.first_seq, "last_seq": idx.last_seq,
+                                     "first_ts": idx.first_ts, "last_ts": idx.last_ts, "name": name})
+                self._sealed_starts.append(idx.first_seq)
+                self._next_seq = idx.last_seq + 1
+                continue
+            # The unsealed (last) segment: rebuild its index by scanning it.
+            idx = _SegmentIndex(int(name[len(_SEGMENT_PREFIX):-len(".jsonl")]))
+            with open(self._segment_path(name), "rb") as fh:
+                offset = 0
+                for line in fh:
+                    try:
+                        entry = LogEntry(*json.loads(line))
+                    except ValueError:
+                        break  # torn final write
+                    idx.add(entry, offset)
+                    offset += len(line)
+            with open(self._segment_path(name), "r+b") as fh:
+                fh.truncate(offset)
+            self._open, self._open_name = idx, name
+            self._file = open(self._segment_path(name), "ab")
+            self._next_seq = idx.first_seq + len(idx.offsets)
+
+    # -- reading -----------------------------------------------------------
+
+    def _segment_index(self, meta: Dict) -> _SegmentIndex:
+        name = meta["name"]
+        idx = self._index_cache.get(name)
+        if idx is None:
+            with open(self._segment_path(name + ".idx"), encoding="utf-8") as fh:
+                idx = _SegmentIndex.from_json(json.load(fh))
+            self._index_cache[name] = idx
+            if len(self._index_cache) > self.cached_segments:
+                self._index_cache.popitem(last=False)
+        else:
+            self._index_cache.move_to_end(name)
+        return idx
+
+    def _segments(self, since: int, start: Optional[float], end: Optional[float]
+                  ) -> Iterator[tuple]:
+        """Yield (index, path) for on-disk segments that may hold matches."""
+        first = max(0, bisect.bisect_right(self._sealed_starts, since) - 1)
+        for meta in self._sealed[first:]:
+            if meta["last_seq"] <= since:
+                continue
+            if start is not None and meta["last_ts"] is not None and meta["last_ts"] < start:
+                continue
+            if end is not None and meta["first_ts"] is not None and meta["first_ts"] > end:
+                break
+            yield self._segment_index(meta), self._segment_path(meta["name"])
+        if self._open is not None and self._open.offsets:
+            self._file.flush()
+            yield self._open, self._segment_path(self._open_name)
+
+    def query(self, who: Optional[str] = None, action: Optional[str] = None,
+              start: Optional[float] = None, end: Optional[float] = None,
+              since: Optional[int] = None, limit: Optional[int] = None) -> List[LogEntry]:
+        """
+        Return entries matching every given filter, oldest first.
+
+        Args:
+            who (Optional[str]): Only entries for this person.
+            action (Optional[str]): Only entries with this action.
+            start (Optional[float]): Only entries at or after this UNIX time.
+            end (Optional[float]): Only entries at or before this UNIX time.
+            since (Optional[int]): Cursor; only entries with a larger ``seq``.
+            limit (Optional[int]): Maximum number of entries to return.
+
+        Returns:
+            List[LogEntry]: Matching entries; pass the last ``seq`` as
+            ``since`` to fetch the next page.
+        """
+        since = -1 if since is None else since
+        out: List[LogEntry] = []
+
+        def keep(e: LogEntry) -> bool:
+            return (e.seq > since and (who is None or (e.who or "") == who)
+                    and (action is None or e.action == action)
+                    and (start is None or e.timestamp >= start)
+                    and (end is None or e.timestamp <= end))
+
+        def full() -> bool:
+            return limit is not None and len(out) >= limit
+
+        if self.directory is None:
+            for idx, entries in self._mem_segments:
+                if idx.last_seq <= since:
+                    continue
+                for pos in self._positions(idx, who, action, since):
+                    e = entries[pos]
+                    if keep(e):
+                        out.append(e)
+                        if full():
+                            return out
+            return out
+
+        for idx, path in self._segments(since, start, end):
+            positions = self._positions(idx, who, action, since)
+            if not positions:
+                continue
+            with open(path, "rb") as fh:
+                for pos in positions:
+                    fh.seek(idx.offsets[pos])
+                    e = LogEntry(*json.loads(fh.readline()))
+                    if keep(e):
+                        out.append(e)
+                        if full():
+                            return out
+        for e in self._tail:
+            if keep(e):
+                out.append(e)
+                if full():
+                    break
+        return out
+
+    @staticmethod
+    def _positions(idx: _SegmentIndex, who: Optional[str], action: Optional[str],
+                   since: int) -> List[int]:
+        """Candidate positions in a segment, from the most selective index."""
+        candidates = []
+        if who is not None:
+            candidates.append(idx.by_who.get(who, []))
+        if action is not None:
+            candidates.append(idx.by_action.get(action, []))
+        lo = max(0, since - idx.first_seq + 1)
+        if not candidates:
+            return list(range(lo, len(idx.offsets)))
+        best = min(candidates, key=len)
+        return best[bisect.bisect_left(best, lo):]
+
+    def get_log(self, since: Optional[int] = None, limit: Optional[int] = None) -> List[LogEntry]:
+        """Page through the log: entries with ``seq`` > ``since``, oldest first."""
+        return self.query(since=since, limit=limit)
+
+    def recent(self, count: int) -> List[LogEntry]:
+        """The newest ``count`` entries, oldest first."""
+        return self.get_log(since=self.last_seq - count, limit=count)
@@ -0,0 +1,162 @@
+# src/loadgen.py
+"""
+Load Generator for the Robot Network Service
+---------------------------------------------
+Drives a RobotServer with pipelined requests over several persistent
+connections and reports throughput and latency.
+
+Functions:
+    - run_load: Send a seeded request mix and return a report.
+    - main: Command-line entry point; starts a loopback server unless
+      ``--port`` points at a running one.
+
+Run with:
+    python -m src.loadgen --requests 20000 --connections 4 --depth 32
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List, Optional
+
+from .metrics import Histogram
+from .server import RobotClient, RobotServer
+
+LOCATIONS = ["teacher", "student", "cupboard", "library", "office"]
+# (verb, share of requests)
+DEFAULT_MIX = (("enqueue", 0.7), ("greet", 0.1), ("monitor", 0.1), ("status", 0.1))
+
+
+def _request(rng: random.Random, verbs: List[str], weights: List[float], bulk: int) -> tuple:
+    verb = rng.choices(verbs, weights)[0]
+    if verb == "enqueue":
+        source, destination = rng.sample(LOCATIONS, 2)
+        task = {"item": "book", "source": source, "destination": destination, "priority": rng.randrange(3)}
+        if bulk > 1:
+            tasks = []
+            for _ in range(bulk):
+                source, destination = rng.sample(LOCATIONS, 2)
+                tasks.append({"item": "book", "source": source, "destination": destination})
+            return "enqueue_many", {"tasks": tasks}
+        return verb, task
+    if verb == "greet":
+        return verb, {"name": f"student{rng.randrange(30)}"}
+    if verb == "status":
+        return verb, {"summary": True}
+    return verb, {}
+
+
+async def _connection(host: str, port: int, count: int, depth: int, seed: int, bulk: int,
+                      latency: Histogram, outcome: Dict[str, int]) -> None:
+    rng = random.Random(seed)
+    verbs = [v for v, _ in DEFAULT_MIX]
+    weights = [w for _, w in DEFAULT_MIX]
+    client = await RobotClient.connect(host, port)
+    window = asyncio.Semaphore(depth)
+    clock = time.perf_counter
+
+    def done(future: asyncio.Future, started: float) -> None:
+        window.release()
+        latency.observe(clock() - started)
+        if future.exception() is not None:
+            outcome["errors"] += 1
+            return
+        response = future.result()
+        if response["ok"]:
+            outcome["ok"] += 1
+        elif response.get("retry"):
+            outcome["rejected"] += 1
+        else:
+            outcome["errors"] += 1
+
+    futures = []
+    for i in range(count):
+        await window.acquire()
+        verb, args = _request(rng, verbs, weights, bulk)
+        started = clock()
+        future = client.send(verb, **args)
+        future.add_done_callback(lambda f, s=started: done(f, s))
+        futures.append(future)
+        if i % depth == depth - 1:
+            await client.drain()
+    await client.drain()
+    await asyncio.gather(*futures, return_exceptions=True)
+    await client.close()
+
+
+async def run_load(host: str, port: int, requests: int = 10000, connections: int = 4,
+                   depth: int = 16, bulk: int = 1, seed: int = 0) -> Dict:
+    """
+    Send ``requests`` requests spread over ``connections`` connections.
+
+    Args:
+        host (str): Server address.
+        port (int): Server port.
+        requests (int): Total requests to send.
+        connections (int): Persistent connections used in parallel.
+        depth (int): Requests kept in flight per connection (pipelining depth).
+        bulk (int): Tasks per enqueue request; above 1, ``enqueue_many`` is used.
+        seed (int): Seed for the request mix.
+
+    Returns:
+        Dict: Requests per second, latency percentiles in milliseconds and
+        counts of successful, rejected (backpressure) and failed requests.
+    """
+    latency = Histogram()
+    outcome = {"ok": 0, "rejected": 0, "errors": 0}
+    share, extra = divmod(requests, connections)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _connection(host, port, share + (i < extra), depth, seed * 1000 + i, bulk, latency, outcome)
+        for i in range(connections)
+    ))
+    seconds = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "connections": connections,
+        "depth": depth,
+        "bulk": bulk,
+        **outcome,
+        "seconds": round(seconds, 3),
+        "rps": round(requests / seconds, 1) if seconds else 0.0,
+        "latency_ms": {f"p{int(q * 100)}": round(latency.quantile(q) * 1000, 3) for q in (0.5, 0.9, 0.99)},
+    }
+
+
+async def _self_hosted(options: argparse.Namespace) -> Dict:
+    server = RobotServer(max_pending=options.max_pending)
+    await server.start()
+    try:
+        report = await run_load(server.host, server.port, options.requests, options.connections,
+                                options.depth, options.bulk, options.seed)
+    finally:
+        await server.close()
+    report["server"] = {"requests": server.requests, "rejected": server.rejected,
+                        "completed_tasks": len(server.robot.task_manager.completed)}
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test the robot network service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None,
+                        help="port of a running server (default: start one on loopback)")
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--depth", type=int, default=16, help="pipelined requests per connection")
+    parser.add_argument("--bulk", type=int, default=1, help="tasks per enqueue request")
+    parser.add_argument("--max-pending", type=int, default=10000, help="queue limit of the loopback server")
+    parser.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args(argv)
+    if options.port is None:
+        report = asyncio.run(_self_hosted(options))
+    else:
+        report = asyncio.run(run_load(options.host, options.port, options.requests, options.connections,
+                                      options.depth, options.bulk, options.seed))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# src/metrics.py
+"""
+Metrics for Humanoid Classroom Robot
+-------------------------------------
+Low-overhead counters and latency histograms with Prometheus text export.
+
+Classes:
+    - Counter: Monotonically increasing count.
+    - Gauge: Current level of something, such as a queue length.
+    - Histogram: Log-linear (HDR-style) histogram with ~3% relative
+      precision, constant memory per magnitude and quantile estimates.
+    - MetricsRegistry: Creates labelled metrics, renders the Prometheus
+      text format, writes it to a file or serves it over HTTP.
+
+Instrumented components take an optional registry; when it is None the
+only cost is a single ``is not None`` check.
+"""
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_SUB_BITS = 6                    # 32 linear sub-buckets per power of two
+_HALF = 1 << (_SUB_BITS - 1)
+_RESOLUTION = 1e-6               # histograms record integer microseconds
+
+
+class Counter:
+    """Monotonically increasing count."""
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """A value that is set to its current level (e.g. a queue length)."""
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Histogram:
+    """
+    Log-linear histogram of durations in seconds.
+
+    Values are recorded as integer microseconds. Values below 64 us get exact
+    buckets; above that each power of two is split into 32 buckets.
+    """
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _index(units: int) -> int:
+        bits = units.bit_length()
+        if bits <= _SUB_BITS:
+            return units
+        shift = bits - _SUB_BITS
+        return (1 << _SUB_BITS) + (shift - 1) * _HALF + ((units >> shift) - _HALF)
+
+    @staticmethod
+    def _upper(index: int) -> int:
+        """Largest integer value falling into ``index``."""
+        if index < (1 << _SUB_BITS):
+            return index
+        shift, sub = divmod(index - (1 << _SUB_BITS), _HALF)
+        shift += 1
+        return ((sub + _HALF + 1) << shift) - 1
+
+    def observe(self, seconds: float) -> None:
+        units = int(seconds / _RESOLUTION) if seconds > 0 else 0
+        idx = self._index(units)
+        with self._lock:
+            self.counts[idx] = self.counts.get(idx, 0) + 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def merge(self, other: "Histogram") -> None:
+        """Add the observations recorded by ``other`` (e.g. from another process)."""
+        with self._lock:
+            for idx, n in other.counts.items():
+                self.counts[idx] = self.counts.get(idx, 0) + n
+            self.count += other.count
+            self.sum += other.sum
+            if other.max > self.max:
+                self.max = other.max
+
+    def quantile(self, q: float) -> float:
+        """Estimated ``q``-quantile in seconds (upper edge of its bucket)."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            for idx in sorted(self.counts):
+                seen += self.counts[idx]
+                if seen >= rank:
+                    return min(self._upper(idx) * _RESOLUTION, self.max)
+            return self.max
+
+
+def _labels(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = key + extra
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in items)
+    return "{" + body + "}"
+
+
+class MetricsRegistry:
+    """
+    Holds named, optionally labelled metrics.
+
+    Attributes:
+        clock (Callable[[], float]): Time source in seconds used by
+            instrumented components (defaults to ``time.perf_counter``).
+        quantiles (Tuple[float, ...]): Quantiles exported for histograms.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter,
+                 quantiles: Tuple[float, ...] = (0.5, 0.9, 0.99)):
+        self.clock = clock
+        self.quantiles = quantiles
+        self._metrics: Dict[str, Tuple[str, str, Dict[LabelKey, object]]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, factory, name: str, help_: str, labels: Dict[str, str]):
+        key = _labels(labels)
+        family = self._metrics.get(name)
+        if family is None:
+            with self._lock:
+                family = self._metrics.setdefault(name, (kind, help_, {}))
+        if family[0] != kind:
+            raise ValueError(f"Metric {name} is already registered as a {family[0]}")
+        children = family[2]
+        metric = children.get(key)
+        if metric is None:
+            with self._lock:
+                metric = children.setdefault(key, factory())
+        return metric
+
+    def counter(self, name: str, help_: str = "", **labels: str) -> Counter:
+        return self._get("counter", Counter, name, help_, labels)
+
+    def gauge(self, name: str, help_: str = "", **labels: str) -> Gauge:
+        return self._get("gauge", Gauge, name, help_, labels)
+
+    def histogram(self, name: str, help_: str = "", **labels: str) -> Histogram:
+        return self._get("summary", Histogram, name, help_, labels)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            kind, help_, children = self._metrics[name]
+            if help_:
+                lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key in sorted(children):
+                metric = children[key]
+                if isinstance(metric, Histogram):
+                    for q in self.quantiles:
+                        lines.append(f"{name}{_format_labels(key, (('quantile', str(q)),))} "
+                                     f"{metric.quantile(q):.6g}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {metric.sum:.6g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {metric.count}")
+                else:
+                    lines.append(f"{name}{_format_labels(key)} {metric.value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Atomically write the metrics to ``path`` (e.g. for a node_exporter textfile collector)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, port: int = 9108, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve ``/metrics`` over HTTP from a daemon thread.
+
+        Returns:
+            ThreadingHTTPServer: The running server; call ``shutdown()`` to stop it.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
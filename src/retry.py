@@ -0,0 +1,150 @@
+# src/retry.py
+"""
+Retry Scheduling for Humanoid Classroom Robot
+----------------------------------------------
+Decides when a failed delivery is tried again and holds it until then.
+
+Classes:
+    - RetryPolicy: Attempt limit and exponential backoff with jitter.
+    - TimerWheel: Hashed timing wheel holding items until their due time.
+
+Times are simulated minutes, like ``RobotController.sim_minutes``; nothing
+here sleeps. The wheel is advanced by whoever owns the clock.
+"""
+
+import random
+from typing import Any, List, Optional, Tuple
+
+
+class RetryPolicy:
+    """
+    How often and how soon failed deliveries are retried.
+
+    The n-th retry waits ``base_delay * multiplier ** (n - 1)`` minutes,
+    capped at ``max_delay``; ``jitter`` then removes a random fraction of up
+    to that share, so robots that failed together do not retry together.
+
+    Attributes:
+        max_attempts (int): Attempts per task, including the first one.
+        base_delay (float): Minutes before the first retry.
+        multiplier (float): Growth factor between retries.
+        max_delay (float): Upper bound on a single wait in minutes.
+        jitter (float): Fraction of the delay that is randomised (0 to 1).
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 1.0, multiplier: float = 2.0,
+                 max_delay: float = 30.0, jitter: float = 0.5, rng: Optional[random.Random] = None):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if not 0.0 <= jitter <= 1.0:
+            raise ValueError("jitter must be between 0 and 1")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.rng = rng if rng is not None else random
+
+    def should_retry(self, attempts: int) -> bool:
+        """Whether a task that has failed ``attempts`` times gets another try."""
+        return attempts < self.max_attempts
+
+    def delay(self, attempts: int) -> float:
+        """
+        Minutes to wait after the ``attempts``-th failed attempt.
+
+        Args:
+            attempts (int): Attempts made so far (1 after the first failure).
+
+        Returns:
+            float: Backoff delay in simulated minutes.
+        """
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempts - 1))
+        if self.jitter:
+            delay *= 1.0 - self.jitter * self.rng.random()
+        return delay
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel: O(1) schedule, and advancing costs one slot per tick.
+
+    Items due within ``slots * tick`` minutes sit in the slot of their tick;
+    later ones share slots and are skipped until their tick comes round.
+    An item is never released before its due time: when its tick is reached
+    early it waits with the items of the current tick, and those are checked
+    against the exact time on every ``advance``.
+
+    Attributes:
+        tick (float): Resolution in minutes.
+        slots (int): Number of slots in the wheel.
+    """
+
+    def __init__(self, tick: float = 0.1, slots: int = 512):
+        if tick <= 0 or slots < 1:
+            raise ValueError("tick must be positive and slots at least 1")
+        self.tick = tick
+        self.slots = slots
+        self._wheel: List[List[Tuple[float, int, int, Any]]] = [[] for _ in range(slots)]
+        self._ready: List[Tuple[float, int, int, Any]] = []
+        self._current = -1   # last tick processed
+        self._count = 0
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def schedule(self, when: float, item: Any) -> None:
+        """Hold ``item`` until the wheel is advanced to ``when``."""
+        tick = int(when // self.tick)
+        entry = (when, self._seq, tick, item)
+        self._seq += 1
+        self._count += 1
+        if tick <= self._current:
+            self._ready.append(entry)
+        else:
+            self._wheel[tick % self.slots].append(entry)
+
+    def advance(self, now: float) -> List[Any]:
+        """
+        Move the wheel to ``now`` and release every item due by then.
+
+        Returns:
+            List[Any]: Released items, earliest due first.
+        """
+        target = int(now // self.tick)
+        due = self._ready
+        self._ready = []
+        if target > self._current and self._count > len(due):
+            if target - self._current >= self.slots:
+                ticks = range(self.slots)
+            else:
+                ticks = range(self._current + 1, target + 1)
+            for t in ticks:
+                slot = self._wheel[t % self.slots]
+                if not slot:
+                    continue
+                keep = [e for e in slot if e[2] > target]
+                if len(keep) != len(slot):
+                    due.extend(e for e in slot if e[2] <= target)
+                    self._wheel[t % self.slots] = keep
+        if target > self._current:
+            self._current = target
+        if any(e[0] > now for e in due):
+            self._ready = [e for e in due if e[0] > now]
+            due = [e for e in due if e[0] <= now]
+        self._count -= len(due)
+        due.sort()
+        return [e[3] for e in due]
+
+    def next_due(self) -> Optional[float]:
+        """Due time of the earliest held item, or None if the wheel is empty."""
+        if not self._count:
+            return None
+        if self._ready:
+            return min(e[0] for e in self._ready)
+        for t in range(self._current + 1, self._current + self.slots + 1):
+            soon = [e[0] for e in self._wheel[t % self.slots] if e[2] == t]
+            if soon:
+                return min(soon)
+        return min(e[0] for slot in self._wheel for e in slot)
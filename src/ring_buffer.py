@@ -0,0 +1,173 @@
+# src/ring_buffer.py
+"""
+Fixed-capacity ring buffer of floats with O(1) rolling statistics.
+
+Classes:
+    - RingBuffer: array('d')-backed circular buffer with zero-copy views.
+    - RollingStats: Mean, variance, min and max over the last ``window``
+      values, updated in O(1) (amortised for min/max) per append.
+"""
+
+import math
+from array import array
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Tuple
+
+
+class RollingStats:
+    """
+    Sliding-window statistics maintained incrementally.
+
+    Attributes:
+        window (int): Number of most recent values covered.
+    """
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        # Monotonic deques of (sequence number, value) for min and max.
+        self._min: Deque[Tuple[int, float]] = deque()
+        self._max: Deque[Tuple[int, float]] = deque()
+
+    def push(self, seq: int, value: float, evicted: float) -> None:
+        """
+        Add ``value`` (the ``seq``-th value ever appended). Once the window is
+        full, ``evicted`` must be the value leaving the window.
+        """
+        if self.count < self.window:
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self._m2 += delta * (value - self.mean)
+        else:
+            old_mean = self.mean
+            self.mean += (value - evicted) / self.count
+            self._m2 += (value - evicted) * (value - self.mean + evicted - old_mean)
+            if self._m2 < 0.0:
+                self._m2 = 0.0
+
+        oldest = seq - self.window
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((seq, value))
+        while self._min[0][0] <= oldest:
+            self._min.popleft()
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((seq, value))
+        while self._max[0][0] <= oldest:
+            self._max.popleft()
+
+    @property
+    def variance(self) -> float:
+        """Population variance of the values in the window."""
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def min(self) -> float:
+        return self._min[0][1] if self._min else math.nan
+
+    @property
+    def max(self) -> float:
+        return self._max[0][1] if self._max else math.nan
+
+    def as_dict(self) -> Dict[str, float]:
+        return {"count": self.count, "mean": self.mean, "variance": self.variance,
+                "std": self.std, "min": self.min, "max": self.max}
+
+
+class RingBuffer:
+    """
+    Circular buffer of floats backed by ``array('d')``.
+
+    Only the most recent ``capacity`` values are kept; memory use is fixed.
+    Rolling statistics can be registered for any window up to ``capacity``.
+    """
+
+    def __init__(self, capacity: int, windows: Iterable[int] = ()):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._data = array("d", bytes(8 * capacity))
+        self._total = 0
+        self._stats: Dict[int, RollingStats] = {}
+        for w in windows:
+            self.add_window(w)
+
+    def add_window(self, window: int) -> RollingStats:
+        """Start tracking rolling statistics over the last ``window`` values."""
+        if window > self.capacity:
+            raise ValueError("window cannot exceed the buffer capacity")
+        if window not in self._stats:
+            stats = RollingStats(window)
+            start = max(0, self._total - window)
+            for seq in range(start, self._total):
+                stats.push(seq, self._data[seq % self.capacity], 0.0)
+            self._stats[window] = stats
+        return self._stats[window]
+
+    def stats(self, window: int) -> RollingStats:
+        """Return the rolling statistics for a registered window."""
+        return self._stats[window]
+
+    @property
+    def windows(self) -> List[int]:
+        return list(self._stats)
+
+    @property
+    def total(self) -> int:
+        """Number of values appended since creation (including overwritten ones)."""
+        return self._total
+
+    def append(self, value: float) -> None:
+        seq = self._total
+        data, cap = self._data, self.capacity
+        for w, stats in self._stats.items():
+            evicted = data[(seq - w) % cap] if seq >= w else 0.0
+            stats.push(seq, value, evicted)
+        data[seq % cap] = value
+        self._total = seq + 1
+
+    def __len__(self) -> int:
+        return min(self._total, self.capacity)
+
+    def __getitem__(self, index: int) -> float:
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("ring buffer index out of range")
+        return self._data[(self._total - n + index) % self.capacity]
+
+    def latest(self) -> float:
+        return self[-1]
+
+    def view(self, window: int = 0) -> Tuple[memoryview, ...]:
+        """
+        Zero-copy view of the last ``window`` values (all buffered values if 0),
+        oldest first, as one or two memoryview segments.
+        """
+        n = len(self)
+        if window <= 0 or window > n:
+            window = n
+        end = self._total % self.capacity or (self.capacity if self._total else 0)
+        start = end - window
+        mv = memoryview(self._data)
+        if start >= 0:
+            return (mv[start:end],)
+        return (mv[self.capacity + start:], mv[:end])
+
+    def to_list(self, window: int = 0) -> List[float]:
+        """Copy of the last ``window`` values (all buffered values if 0)."""
+        out: List[float] = []
+        for segment in self.view(window):
+            out.extend(segment.tolist())
+        return out
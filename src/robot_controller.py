@@ -1,11 +1,21 @@
 # src/robot_controller.py
 from enum import Enum, auto
 from .task_manager import TaskManager
-from .sensors import TemperatureSensor
+from .sensors import ObstacleSensor, TemperatureSensor
 from .interaction import InteractionModule
-from .tasks import DeliveryTask
+from .tasks import DeliveryTask, TaskStatus
+from .routing import DistanceTable, nearest_neighbour_route, two_opt
+from .classroom_map import ClassroomMap, default_classroom_map
+from .metrics import MetricsRegistry
+from .retry import RetryPolicy
+from .sampler import AnomalyCallback, SensorSampler
+from .events import EventBus, Level, console_bus
+import itertools
 import random
-from typing import Dict, List, Tuple
+from functools import partial
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple, Union
 
 
 class RobotState(Enum):
@@ -20,68 +30,425 @@ class RobotState(Enum):
 class RobotController:
     """Controller for managing humanoid robot operations."""
 
-    def __init__(self, id_: str):
-        """Initialize the robot controller."""
+    def __init__(self, id_: str, distances: Union[ClassroomMap, DistanceTable, None] = None,
+                 speed: float = 30.0, handling_time: float = 0.5, home: str = "base",
+                 task_manager: Optional[TaskManager] = None, verbose: bool = True,
+                 history_size: int = 1000, metrics: Optional[MetricsRegistry] = None,
+                 rng: Optional[random.Random] = None, retry_policy: Optional[RetryPolicy] = None,
+                 events: Optional[EventBus] = None):
+        """
+        Initialize the robot controller.
+
+        Travel is simulated: ``distances`` is the classroom map (or a plain
+        distance table) in metres, the robot moves at ``speed`` metres per
+        simulated minute and spends ``handling_time`` minutes at every pickup
+        or drop-off. Several robots may share one ``task_manager``; ``verbose``
+        controls the console messages. Only the last ``history_size`` history
+        entries are kept. With ``metrics`` the time spent in each state and the
+        failure/recovery counts are recorded. ``rng`` decides delivery outcomes
+        (the global ``random`` module if omitted); pass a seeded
+        ``random.Random`` for reproducible runs. ``retry_policy`` is given to
+        the task manager created when none is passed in. State changes,
+        dispatched/completed/failed tasks, anomalies and messages are published
+        on ``events``; verbose robots without one share the process-wide
+        console bus, which writes their messages from one background thread.
+        ``close`` (or using the robot as a context manager) stops its sampler
+        and delivers its queued events.
+        """
         self.id = id_
         self.state = RobotState.IDLE
-        self.task_manager = TaskManager("TM1")      # Removed verbose
+        self.verbose = verbose
+        if events is None and verbose:
+            events = console_bus()
+        self.events = events
+        self._state_lock = threading.Lock()
+        self.metrics = metrics
+        self.rng = rng if rng is not None else random
+        if metrics is not None:
+            self._state_since = metrics.clock()
+        self.task_manager = task_manager if task_manager is not None else TaskManager(
+            "TM1", metrics=metrics, retry_policy=retry_policy)
         self.sensor = TemperatureSensor("S1")
-        self.interaction = InteractionModule("I1")  # Removed verbose
-        self.history: List[Tuple] = []
+        self.interaction = InteractionModule("I1", events=events)  # Removed verbose
+        self.obstacles = ObstacleSensor("O1")
+        self.history: Deque[Tuple] = deque(maxlen=history_size)
+        self._history_total = 0
+        self._compensations: Set[int] = set()  # IDs of the trips undo makes
+        self._state_version = 0
+        self.distances = distances if distances is not None else default_classroom_map()
+        self.speed = speed
+        self.handling_time = handling_time
+        self.location = home
+        self.sim_minutes = 0.0
+        self.sampler: Optional[SensorSampler] = None
 
     def change_state(self, new_state: RobotState) -> None:
         """Change the robot's state."""
-        self.state = new_state
+        with self._state_lock:
+            if self.metrics is not None:
+                self._observe_state(new_state)
+            old_state, self.state = self.state, new_state
+            self._state_version += 1
+        if self.events is not None and self.events.enabled(Level.DEBUG):
+            self._emit("state", f"{old_state.name} -> {new_state.name}", Level.DEBUG,
+                       {"from": old_state.name, "to": new_state.name})
+
+    def _observe_state(self, new_state: RobotState) -> None:
+        m = self.metrics
+        now = m.clock()
+        m.histogram("robot_state_seconds", "Time spent in each state per visit",
+                    robot=self.id, state=self.state.name).observe(now - self._state_since)
+        self._state_since = now
+        m.counter("robot_state_transitions_total", "State transitions by target state",
+                  robot=self.id, state=new_state.name).inc()
+        if new_state is RobotState.ERROR:
+            m.counter("robot_failures_total", "Transitions into ERROR", robot=self.id).inc()
+        elif new_state is RobotState.IDLE and self.state is RobotState.RECOVERING:
+            m.counter("robot_recoveries_total", "Recoveries from ERROR back to IDLE", robot=self.id).inc()
+
+    def _attempt(self) -> bool:
+        """Simulate whether a delivery attempt succeeds."""
+        return self.rng.choices([True, False], weights=[0.85, 0.15])[0]
+
+    def _record(self, entry: Tuple) -> None:
+        self.history.append(entry)
+        self._history_total += 1
+
+    def _emit(self, kind: str, message: str, level: Level = Level.INFO, data: Optional[Dict] = None) -> None:
+        if self.events is not None:
+            self.events.publish(kind, message, level, self.id, data)
+
+    def _say(self, message: str) -> None:
+        self._emit("message", message)
+
+    def flush_events(self) -> None:
+        """Deliver queued events now, e.g. before printing something that must follow them."""
+        if self.events is not None:
+            self.events.flush()
+
+    def close(self) -> None:
+        """Stop the background sampler and deliver queued events; the bus itself is left running."""
+        self.stop_sampler()
+        self.flush_events()
+
+    def __enter__(self) -> "RobotController":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     def start(self) -> None:
         """Initialize the robot and display ready message."""
         self.change_state(RobotState.IDLE)
-        print(self.interaction.display_message("Robot ready."))
+        self._say("Robot ready.")
+
+    def enqueue_requests(self, tasks: List[DeliveryTask], requester: Optional[str] = None) -> None:
+        """
+        Queue delivery requests without running them.
+
+        Each request is logged as "request" for ``requester`` (the task's own
+        requester, or its destination, if omitted); undoing it cancels the
+        task if it is still queued.
+        """
+        if requester is not None:
+            for task in tasks:
+                task.requester = requester
+        self.task_manager.enqueue_many(tasks)
+        for task in tasks:
+            self.interaction.log_interaction("request", task.requester or task.to_location,
+                                             partial(self._cancel_request, task.id))
 
-    def deliver_material(self, item: str, from_location: str, to_location: str) -> str:
-        """Enqueue a delivery task and execute it."""
-        task = DeliveryTask.create(item, from_location, to_location)
+    def _cancel_request(self, task_id: int) -> Optional[str]:
+        task = self.task_manager.cancel_task(task_id)
+        return f"Cancelled {task.item} to {task.to_location}" if task else None
+
+    def deliver_material(self, item: str, from_location: str, to_location: str, priority: int = 0,
+                         deadline: Optional[float] = None, requester: Optional[str] = None) -> str:
+        """
+        Enqueue a delivery task and execute it, ahead of anything already
+        queued. Its outcome is logged for ``requester`` (default: the
+        destination), who can undo it.
+        """
+        task = DeliveryTask.create(item, from_location, to_location, priority, deadline, requester)
         self.task_manager.enqueue_task(task)
-        return self.execute_task()
+        return self.execute_task(task.id)
+
+    def travel_minutes(self, from_location: str, to_location: str) -> float:
+        """Simulated minutes needed to travel between two locations."""
+        return self.distances.distance(from_location, to_location) / self.speed
+
+    def estimate_task_minutes(self, task: DeliveryTask, start: Optional[str] = None) -> float:
+        """Estimated simulated minutes to run ``task`` starting from ``start`` (default: here)."""
+        here = self.location if start is None else start
+        return (self.travel_minutes(here, task.from_location)
+                + self.travel_minutes(task.from_location, task.to_location)
+                + 2 * self.handling_time)
+
+    def _travel(self, to_location: str) -> bool:
+        """Move along the shortest open route; False if the destination is unreachable."""
+        dist, path = self.distances.shortest_path(self.location, to_location)
+        if not path:
+            return False
+        self.sim_minutes += dist / self.speed
+        self.location = to_location
+        return True
+
+    def _set_blocked(self, a: str, b: str, blocked: bool) -> None:
+        if blocked:
+            self.obstacles.report(a, b)
+            if isinstance(self.distances, ClassroomMap):
+                self.distances.block_corridor(a, b)
+        else:
+            self.obstacles.clear(a, b)
+            if isinstance(self.distances, ClassroomMap):
+                self.distances.unblock_corridor(a, b)
 
-    def execute_task(self) -> str:
-        """Execute the next task in the queue."""
-        task = self.task_manager.dequeue_task()
+    def report_obstacle(self, a: str, b: str) -> None:
+        """Block the corridor between two locations so routes avoid it."""
+        self._set_blocked(a, b, True)
+        self.interaction.log_interaction("obstacle", f"{a}-{b}", lambda: self._set_blocked(a, b, False))
+
+    def clear_obstacle(self, a: str, b: str) -> None:
+        """Reopen a previously blocked corridor."""
+        self._set_blocked(a, b, False)
+        self.interaction.log_interaction("obstacle_cleared", f"{a}-{b}", lambda: self._set_blocked(a, b, True))
+
+    def execute_task(self, task_id: Optional[int] = None) -> str:
+        """
+        Execute the next task in the queue, waiting for a pending retry if nothing else is queued.
+
+        Args:
+            task_id (Optional[int]): Execute this queued task (or the task it
+                was merged into) instead of the next one.
+        """
+        tm = self.task_manager
+        tm.advance(self.sim_minutes)
+        task = tm.dequeue_task(task_id)
+        if task_id is not None:
+            return self.run_task(task) if task else f"Task {task_id} is not queued."
         if not task:
-            return "No tasks to execute."
+            due = tm.next_retry_at()
+            if due is None:
+                return "No tasks to execute."
+            self.sim_minutes = max(self.sim_minutes, due)
+            tm.advance(self.sim_minutes)
+            task = tm.dequeue_task()
+            if not task:
+                return "No tasks to execute."
+        return self.run_task(task)
+
+    def _log_outcome(self, task: DeliveryTask, action: str) -> None:
+        """
+        Record the outcome once per request, so each merged request can be
+        undone on its own: undoing a delivery makes the item's return trip,
+        undoing a final failure makes the delivery again. Either trip runs
+        at once and its result is what the undo reports; the trip itself is
+        logged but cannot be undone in turn.
+        """
+        for t in task.deliveries():
+            self._record((action, t.id))
+            who = t.requester or t.to_location
+            if t.id in self._compensations:
+                if t.status is not TaskStatus.RETRYING:
+                    self._compensations.discard(t.id)
+                self.interaction.log_interaction(action, who, undoable=False)
+                continue
+            if action == "deliver":
+                compensate = partial(self._return_trip, t)
+            elif t.status is TaskStatus.FAILED:
+                compensate = partial(self._redeliver, t)
+            else:
+                compensate = None  # a retry is already scheduled
+            self.interaction.log_interaction(action, who, compensate)
+
+    def _compensation_trip(self, task: DeliveryTask, from_location: str, to_location: str,
+                           deadline: Optional[float] = None) -> str:
+        trip = DeliveryTask.create(task.item, from_location, to_location, task.priority, deadline, task.requester)
+        self._compensations.add(trip.id)
+        self.task_manager.enqueue_task(trip)
+        return self.execute_task(trip.id)
+
+    def _return_trip(self, task: DeliveryTask) -> str:
+        return self._compensation_trip(task, task.to_location, task.from_location)
 
+    def _redeliver(self, task: DeliveryTask) -> str:
+        return self._compensation_trip(task, task.from_location, task.to_location, task.deadline)
+
+    def run_task(self, task: DeliveryTask) -> str:
+        """Execute a task that has already been taken off the queue."""
         self.change_state(RobotState.EXECUTING)
-        print(self.interaction.display_message(f"Executing delivery {task.item} -> {task.to_location}"))
+        self._emit("dispatched", f"Executing delivery {task.describe()} -> {task.to_location}",
+                   data={"task": task.id})
+        reachable = self._travel(task.from_location) and self._travel(task.to_location)
+        self.sim_minutes += 2 * self.handling_time
 
         # Simulate success/failure
-        success = random.choices([True, False], weights=[0.85, 0.15])[0]
+        success = reachable and self._attempt()
         if success:
             self.task_manager.mark_completed(task)
-            self.history.append(("deliver", task.id))
-            self.interaction.log_interaction("deliver", task.to_location)
+            self._log_outcome(task, "deliver")
+            self._emit("completed", f"Delivered {task.describe()} to {task.to_location}", data={"task": task.id})
             self.change_state(RobotState.COMPLETED)
             self.change_state(RobotState.IDLE)
-            return f"Delivered {task.item} to {task.to_location}"
+            return f"Delivered {task.describe()} to {task.to_location}"
         else:
-            task.mark_failed()
-            self.history.append(("deliver_failed", task.id))
-            self.interaction.log_interaction("deliver_failed", task.to_location)
+            retry_at = self.task_manager.mark_failed(task, now=self.sim_minutes)
+            self._log_outcome(task, "deliver_failed")
+            self._emit("failed", f"Delivery {task.describe()} to {task.to_location} failed", Level.WARNING,
+                       {"task": task.id, "retry_at": retry_at})
+            self.change_state(RobotState.ERROR)
+            self.recover_from_error()
+            if retry_at is not None:
+                return (f"Delivery {task.describe()} to {task.to_location} failed, "
+                        f"retrying in {retry_at - self.sim_minutes:.1f} min")
+            return f"Delivery {task.describe()} to {task.to_location} failed"
+
+    def execute_batch(self, max_tasks: int = 10, window: Optional[float] = None) -> Dict:
+        """
+        Drain up to ``max_tasks`` queued tasks and run them as one multi-drop trip.
+
+        Tasks are grouped by pickup location (groups run in dispatch order) and
+        each group's drop-offs are ordered with a nearest-neighbour route refined
+        by 2-opt. If ``window`` is given, groups that would push the estimated
+        trip beyond ``window`` simulated minutes are put back in the queue
+        where they were. Like ``execute_task`` it waits for a pending retry
+        if nothing is queued, and retries that come due during the trip are
+        queued when it ends.
+
+        Returns:
+            Dict: Batch report with delivered/failed counts, the stops visited,
+            simulated minutes and throughput in tasks per simulated minute.
+        """
+        tm = self.task_manager
+        tm.advance(self.sim_minutes)
+        if not len(tm):
+            due = tm.next_retry_at()
+            if due is not None:
+                self.sim_minutes = max(self.sim_minutes, due)
+                tm.advance(self.sim_minutes)
+        taken: List[DeliveryTask] = []
+        groups: Dict[str, List[DeliveryTask]] = {}
+        for _ in range(max_tasks):
+            task = tm.dequeue_task()
+            if task is None:
+                break
+            taken.append(task)
+            groups.setdefault(task.from_location, []).append(task)
+        if not groups:
+            return {"tasks": 0, "delivered": 0, "failed": 0, "route": [],
+                    "minutes": 0.0, "throughput": 0.0}
+
+        # Plan every group's drop-off order and cut the trip at the window.
+        plans = []
+        cut = set()
+        here, estimate = self.location, 0.0
+        for pickup, tasks in groups.items():
+            drops = nearest_neighbour_route(pickup, (t.to_location for t in tasks), self.distances.distance)
+            drops = two_opt(pickup, drops, self.distances.distance)
+            leg = self.travel_minutes(here, pickup) + self.handling_time
+            prev = pickup
+            for stop in drops:
+                leg += self.travel_minutes(prev, stop) + self.handling_time
+                prev = stop
+            if window is not None and plans and estimate + leg > window:
+                cut.update(t.id for t in tasks)
+                continue
+            plans.append((pickup, drops, tasks))
+            here, estimate = prev, estimate + leg
+        if cut:
+            tm.requeue_tasks(t for t in taken if t.id in cut)
+
+        self.change_state(RobotState.EXECUTING)
+        start_minutes = self.sim_minutes
+        route: List[str] = []
+        delivered = failed = 0
+        for pickup, drops, tasks in plans:
+            quantity = sum(t.quantity for t in tasks)
+            self._emit("dispatched", f"Executing batch of {quantity} from {pickup} -> {', '.join(drops)}",
+                       data={"tasks": [t.id for t in tasks]})
+            at_pickup = self._travel(pickup)
+            self.sim_minutes += self.handling_time
+            route.append(pickup)
+            by_stop: Dict[str, List[DeliveryTask]] = {}
+            for t in tasks:
+                by_stop.setdefault(t.to_location, []).append(t)
+            for stop in drops:
+                reachable = at_pickup and self._travel(stop)
+                if reachable:
+                    self.sim_minutes += self.handling_time
+                    route.append(stop)
+                for task in by_stop[stop]:
+                    if reachable and self._attempt():
+                        tm.mark_completed(task)
+                        self._log_outcome(task, "deliver")
+                        self._emit("completed", f"Delivered {task.describe()} to {task.to_location}",
+                                   data={"task": task.id})
+                        delivered += task.quantity
+                    else:
+                        retry_at = tm.mark_failed(task, now=self.sim_minutes)
+                        self._log_outcome(task, "deliver_failed")
+                        self._emit("failed", f"Delivery {task.describe()} to {task.to_location} failed",
+                                   Level.WARNING, {"task": task.id, "retry_at": retry_at})
+                        failed += task.quantity
+        tm.advance(self.sim_minutes)
+
+        minutes = self.sim_minutes - start_minutes
+        count = delivered + failed
+        if failed:
             self.change_state(RobotState.ERROR)
             self.recover_from_error()
-            return f"Delivery {task.item} to {task.to_location} failed"
+        else:
+            self.change_state(RobotState.COMPLETED)
+            self.change_state(RobotState.IDLE)
+        return {
+            "tasks": count,
+            "delivered": delivered,
+            "failed": failed,
+            "route": route,
+            "minutes": round(minutes, 3),
+            "throughput": count / minutes if minutes else float(count),
+        }
 
     def recover_from_error(self) -> None:
         """Recover from an error state."""
         self.change_state(RobotState.RECOVERING)
         self.change_state(RobotState.IDLE)
 
+    def start_sampler(self, interval: float = 1.0,
+                      on_anomaly: Iterable[AnomalyCallback] = ()) -> SensorSampler:
+        """
+        Sample the temperature sensor in the background every ``interval`` seconds.
+
+        While the sampler runs, ``monitor_environment`` returns its latest
+        reading instead of reading the sensor itself. ``on_anomaly``
+        callbacks run on the sampler thread when an anomaly starts.
+        """
+        if self.sampler is None:
+            self.sampler = SensorSampler([self.sensor], interval, on_anomaly)
+        else:
+            for callback in on_anomaly:
+                self.sampler.add_callback(callback)
+        return self.sampler.start()
+
+    def stop_sampler(self) -> None:
+        """Stop background sampling; ``monitor_environment`` reads the sensor again."""
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler = None
+
     def monitor_environment(self) -> Dict:
-        """Monitor environmental conditions."""
-        temp = self.sensor.read_data()
-        anomaly = self.sensor.detect_anomaly()
-        self.history.append(("monitor", temp))
+        """Monitor environmental conditions (the sampler's latest reading while it runs)."""
+        if self.sampler is not None:
+            reading = self.sampler.latest()
+            temp, anomaly = reading.value, reading.anomaly
+        else:
+            temp = self.sensor.read_data()
+            anomaly = self.sensor.detect_anomaly()
+        self._record(("monitor", temp))
         if anomaly:
             self.interaction.log_interaction("temperature_anomaly", str(temp))
+            self._emit("anomaly", f"Temperature {temp}°C outside the safe range", Level.WARNING,
+                       {"sensor": self.sensor.id, "temperature": temp})
             return {"temperature": temp, "issue": True}
         self.interaction.log_interaction("temperature_ok", str(temp))
         return {"temperature": temp, "issue": False}
@@ -92,18 +459,88 @@ class RobotController:
         msg = f"Hello, {name}!"
         # print(self.interaction.display_message(msg))  # REMOVE this
         self.interaction.log_interaction("greet", name)
-        self.history.append(("greet", name))
+        self._record(("greet", name))
         self.change_state(RobotState.COMPLETED)
         self.change_state(RobotState.IDLE)
         return msg
 
-    def get_status(self) -> Dict:
-        """Get current robot status."""
+    def versions(self) -> Dict[str, int]:
+        """Version counter of every component reported by ``get_status``."""
         return {
-            "id": self.id,
-            "state": self.state.name,
-            "history": list(self.history),
-            "task_queue": self.task_manager.list_tasks(),
-            "interaction_log": self.interaction.get_log(),
-            "temperature_history": self.sensor.get_history()
+            "state": self._state_version,
+            "history": self._history_total,
+            "task_queue": self.task_manager.version,
+            "interaction_log": self.interaction.version,
+            "temperature_history": self.sensor.history.total,
         }
+
+    def get_status(self, since_version: Optional[Dict[str, int]] = None, summary: bool = False,
+                   page: int = 100) -> Dict:
+        """
+        Get current robot status.
+
+        Args:
+            since_version (Optional[Dict[str, int]]): The ``version`` of an
+                earlier status. Only components that changed since then are
+                included, and append-only ones only with their new entries.
+                The queue is reported as ``task_queue_changes`` (see
+                ``TaskManager.changes_since``), or as a fresh first page if
+                the changes are too old to be kept.
+            summary (bool): Return counts and latest values instead of histories.
+            page (int): The full status lists only the first ``page`` queued
+                tasks in dispatch order and the newest ``page`` logged
+                interactions; ``pending_tasks`` and ``interaction_count``
+                give the totals.
+
+        Returns:
+            Dict: Status including ``version``, to pass back as ``since_version``.
+        """
+        versions = self.versions()
+        if summary:
+            nxt = self.task_manager.peek_task()
+            return {
+                "id": self.id,
+                "state": self.state.name,
+                "version": versions,
+                "pending_tasks": len(self.task_manager),
+                "next_task": nxt.id if nxt else None,
+                "completed_tasks": len(self.task_manager.completed),
+                "history_count": versions["history"],
+                "interaction_count": versions["interaction_log"],
+                "temperature": self.sensor.history.latest(),
+            }
+        if since_version is None:
+            return {
+                "id": self.id,
+                "state": self.state.name,
+                "version": versions,
+                "history": list(self.history),
+                "pending_tasks": len(self.task_manager),
+                "task_queue": self.task_manager.list_tasks(limit=page),
+                "interaction_count": versions["interaction_log"],
+                "interaction_log": self.interaction.recent_log(page),
+                "temperature_history": self.sensor.get_history()
+            }
+
+        status: Dict = {"id": self.id, "state": self.state.name, "version": versions}
+        changed = {k for k, v in versions.items() if since_version.get(k, -1) != v}
+        if "history" in changed:
+            new = versions["history"] - since_version.get("history", 0)
+            if 0 < new < len(self.history):
+                status["history"] = list(itertools.islice(reversed(self.history), new))[::-1]
+            else:
+                status["history"] = list(self.history)
+        if "task_queue" in changed:
+            changes = self.task_manager.changes_since(since_version.get("task_queue", 0))
+            status["pending_tasks"] = len(self.task_manager)
+            if changes is None:
+                status["task_queue"] = self.task_manager.list_tasks(limit=page)
+            else:
+                status["task_queue_changes"] = changes
+        if "interaction_log" in changed:
+            status["interaction_log"] = self.interaction.get_entries(
+                since=since_version.get("interaction_log", 0) - 1)
+        if "temperature_history" in changed:
+            new = versions["temperature_history"] - since_version.get("temperature_history", 0)
+            status["temperature_history"] = self.sensor.get_history(max(new, 0))
+        return status
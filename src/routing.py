@@ -0,0 +1,123 @@
+# src/routing.py
+"""
+Route planning helpers for multi-drop delivery trips.
+
+Classes:
+    - DistanceTable: Symmetric table of distances between named locations.
+
+Functions:
+    - route_length: Total length of a path through a sequence of stops.
+    - nearest_neighbour_route: Greedy ordering of drop-off stops.
+    - two_opt: Local improvement of a route by reversing segments.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DistanceFn = Callable[[str, str], float]
+
+
+class DistanceTable:
+    """
+    Symmetric distance lookup between named classroom locations.
+
+    Attributes:
+        default (float): Distance used for pairs that are not in the table.
+    """
+
+    def __init__(self, distances: Optional[Dict[Tuple[str, str], float]] = None,
+                 default: float = 20.0):
+        self.default = default
+        self._table: Dict[Tuple[str, str], float] = {}
+        for (a, b), d in (distances or {}).items():
+            self.set_distance(a, b, d)
+
+    def set_distance(self, a: str, b: str, distance: float) -> None:
+        """Record the distance between two locations (in both directions)."""
+        self._table[(a, b)] = distance
+        self._table[(b, a)] = distance
+
+    def distance(self, a: str, b: str) -> float:
+        """Return the distance between two locations."""
+        if a == b:
+            return 0.0
+        return self._table.get((a, b), self.default)
+
+    def shortest_path(self, a: str, b: str) -> Tuple[float, List[str]]:
+        """Return (distance, path); a table only knows direct hops."""
+        return self.distance(a, b), [a] if a == b else [a, b]
+
+
+def route_length(start: str, stops: Iterable[str], distance: DistanceFn) -> float:
+    """
+    Total travel distance from ``start`` through each stop in order.
+
+    Args:
+        start (str): Starting location.
+        stops (Iterable[str]): Locations to visit, in order.
+        distance (DistanceFn): Function returning the distance between two locations.
+
+    Returns:
+        float: Length of the path.
+    """
+    total = 0.0
+    here = start
+    for stop in stops:
+        total += distance(here, stop)
+        here = stop
+    return total
+
+
+def nearest_neighbour_route(start: str, stops: Iterable[str], distance: DistanceFn) -> List[str]:
+    """
+    Order stops greedily, always travelling to the closest unvisited one.
+
+    Args:
+        start (str): Starting location.
+        stops (Iterable[str]): Locations to visit (duplicates are visited once).
+        distance (DistanceFn): Function returning the distance between two locations.
+
+    Returns:
+        List[str]: Stops in visiting order.
+    """
+    remaining = list(dict.fromkeys(stops))
+    route: List[str] = []
+    here = start
+    while remaining:
+        nxt = min(remaining, key=lambda s: distance(here, s))
+        remaining.remove(nxt)
+        route.append(nxt)
+        here = nxt
+    return route
+
+
+def two_opt(start: str, route: List[str], distance: DistanceFn, max_rounds: int = 10) -> List[str]:
+    """
+    Improve an open route from a fixed start by reversing segments while that
+    shortens it.
+
+    Args:
+        start (str): Fixed starting location (not part of ``route``).
+        route (List[str]): Initial visiting order.
+        distance (DistanceFn): Function returning the distance between two locations.
+        max_rounds (int): Upper bound on improvement passes.
+
+    Returns:
+        List[str]: The improved visiting order.
+    """
+    path = [start] + list(route)
+    n = len(path)
+    for _ in range(max_rounds):
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                a, b = path[i - 1], path[i]
+                c = path[j]
+                d = path[j + 1] if j + 1 < n else None
+                before = distance(a, b) + (distance(c, d) if d is not None else 0.0)
+                after = distance(a, c) + (distance(b, d) if d is not None else 0.0)
+                if after < before - 1e-9:
+                    path[i:j + 1] = reversed(path[i:j + 1])
+                    improved = True
+        if not improved:
+            break
+    return path[1:]
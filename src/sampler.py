@@ -0,0 +1,166 @@
+# src/sampler.py
+"""
+Background Sensor Sampler for Humanoid Classroom Robot
+-------------------------------------------------------
+Polls sensors on a background thread so readings and alerts exist even
+when nobody asks for them.
+
+Classes:
+    - Reading: One published sample (seq, timestamp, sensor, value, anomaly).
+    - SensorSampler: Sampling thread that publishes the latest reading of
+      every sensor through a double buffer and calls back when an anomaly
+      starts.
+
+Key Features:
+    - Readers never take a lock: the sampler fills the back buffer and then
+      flips the front index, and every slot holds an immutable Reading
+    - ``latest`` is O(1); ``snapshot`` retries if a flip happened mid-copy
+    - A sampler that falls behind skips missed ticks instead of bursting
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from .sensors import Sensor
+
+
+class Reading(NamedTuple):
+    """A published sensor sample."""
+    seq: int
+    timestamp: float
+    sensor_id: str
+    value: object
+    anomaly: bool
+
+
+AnomalyCallback = Callable[[Reading], None]
+
+
+class SensorSampler:
+    """
+    Samples sensors at a fixed rate on a daemon thread.
+
+    Attributes:
+        sensors (Sequence[Sensor]): Sensors read on every tick, in order.
+        interval (float): Seconds between ticks.
+        samples (int): Ticks completed so far.
+        errors (int): Callback or sensor exceptions swallowed so the thread keeps running.
+    """
+
+    def __init__(self, sensors: Iterable[Sensor], interval: float = 1.0,
+                 on_anomaly: Iterable[AnomalyCallback] = (), clock: Callable[[], float] = time.time):
+        """
+        Args:
+            sensors (Iterable[Sensor]): Sensors to poll.
+            interval (float): Seconds between ticks (the sampling period).
+            on_anomaly (Iterable[AnomalyCallback]): Called from the sampler
+                thread with the first anomalous reading of each episode.
+            clock (Callable[[], float]): Timestamp source for readings.
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.sensors: Sequence[Sensor] = list(sensors)
+        self.interval = interval
+        self.clock = clock
+        self.samples = 0
+        self.errors = 0
+        self._callbacks: List[AnomalyCallback] = list(on_anomaly)
+        self._slot = {s.id: i for i, s in enumerate(self.sensors)}
+        self._buffers: List[List[Optional[Reading]]] = [[None] * len(self.sensors) for _ in range(2)]
+        self._front = 0
+        self._generation = 0
+        self._in_anomaly = [False] * len(self.sensors)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_callback(self, callback: AnomalyCallback) -> None:
+        """Register a function to call when an anomaly starts."""
+        self._callbacks.append(callback)
+
+    def sample_once(self) -> None:
+        """Read every sensor once and publish the results (the thread's tick)."""
+        now = self.clock()
+        seq = self.samples + 1
+        back_index = 1 - self._front
+        back = self._buffers[back_index]
+        started = []
+        for i, sensor in enumerate(self.sensors):
+            try:
+                value = sensor.read_data()
+                anomaly = bool(sensor.detect_anomaly())
+            except Exception:
+                self.errors += 1
+                back[i] = self._buffers[self._front][i]
+                continue
+            reading = Reading(seq, now, sensor.id, value, anomaly)
+            back[i] = reading
+            if anomaly and not self._in_anomaly[i]:
+                started.append(reading)
+            self._in_anomaly[i] = anomaly
+        self._generation += 1
+        self._front = back_index
+        self.samples = seq
+        for reading in started:
+            for callback in self._callbacks:
+                try:
+                    callback(reading)
+                except Exception:
+                    self.errors += 1
+
+    def latest(self, sensor_id: Optional[str] = None) -> Optional[Reading]:
+        """
+        Latest published reading of a sensor, without locking.
+
+        Args:
+            sensor_id (Optional[str]): Sensor to look up; the first one if omitted.
+
+        Returns:
+            Optional[Reading]: The reading, or None before the first sample.
+        """
+        slot = 0 if sensor_id is None else self._slot[sensor_id]
+        return self._buffers[self._front][slot]
+
+    def snapshot(self) -> Dict[str, Reading]:
+        """Latest readings of all sensors, all from the same tick."""
+        while True:
+            generation = self._generation
+            readings = tuple(self._buffers[self._front])
+            if generation == self._generation:
+                return {r.sensor_id: r for r in readings if r is not None}
+
+    def _run(self) -> None:
+        next_tick = time.monotonic() + self.interval
+        while not self._stop.wait(max(0.0, next_tick - time.monotonic())):
+            self.sample_once()
+            next_tick += self.interval
+            now = time.monotonic()
+            if next_tick < now:
+                next_tick = now  # fell behind: skip the missed ticks
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "SensorSampler":
+        """Take a first sample, then keep sampling on a daemon thread."""
+        if not self.running:
+            if not self.samples:
+                self.sample_once()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sensor-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the sampling thread and wait for it to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def __enter__(self) -> "SensorSampler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
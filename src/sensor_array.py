@@ -0,0 +1,192 @@
+# src/sensor_array.py
+"""
+Sensor Array for Humanoid Classroom Robot
+------------------------------------------
+Monitors many rooms and channels at once using a struct-of-arrays layout.
+
+Classes:
+    - ChannelSpec: Simulation parameters and safe range of one channel.
+    - SensorArray: All rooms x channels, stored as one ``array('d')`` column
+      per channel, read and checked in bulk.
+    - ArraySensorView: A single (room, channel) cell exposed through the
+      ``Sensor`` interface.
+
+Key Features:
+    - ``read_batch(n)`` advances every sensor ``n`` steps in one call and
+      returns copies of the latest columns
+    - Anomaly detection is a single pass per channel; columns whose min/max
+      lie inside the safe range are skipped without touching Python-level
+      elements
+    - Fixed-capacity history per channel (rows of readings, oldest overwritten)
+"""
+
+import random
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .sensors import Sensor
+
+
+@dataclass(frozen=True)
+class ChannelSpec:
+    """
+    Describes one measured quantity.
+
+    Readings follow a random walk of at most ``step`` per reading, or, if
+    ``event_rate`` is set, are 1.0 with that probability and 0.0 otherwise.
+    """
+    name: str
+    baseline: float
+    step: float
+    low: float
+    high: float
+    event_rate: Optional[float] = None
+
+
+DEFAULT_CHANNELS: Tuple[ChannelSpec, ...] = (
+    ChannelSpec("temperature", 22.0, 1.0, 18.0, 28.0),
+    ChannelSpec("co2", 600.0, 25.0, 0.0, 1500.0),
+    ChannelSpec("noise", 45.0, 2.0, 0.0, 85.0),
+    ChannelSpec("obstacle", 0.0, 0.0, 0.0, 0.5, event_rate=0.01),
+)
+
+
+class SensorArray(Sensor):
+    """
+    Readings for ``rooms`` x ``channels`` sensors held column-wise.
+
+    Attributes:
+        rooms (List[str]): Room names, one row position per room.
+        channels (Dict[str, ChannelSpec]): Channel specifications by name.
+        capacity (int): Number of historical readings kept per sensor.
+    """
+
+    def __init__(self, id_: str, rooms: Sequence[str],
+                 channels: Iterable[ChannelSpec] = DEFAULT_CHANNELS,
+                 capacity: int = 1024, seed: Optional[int] = None):
+        super().__init__(id_)
+        self.rooms = list(rooms)
+        self.channels: Dict[str, ChannelSpec] = {c.name: c for c in channels}
+        self.capacity = capacity
+        self._room_index = {r: i for i, r in enumerate(self.rooms)}
+        self._rng = random.Random(seed)
+        n = len(self.rooms)
+        self._latest: Dict[str, array] = {
+            name: array("d", [spec.baseline]) * n for name, spec in self.channels.items()
+        }
+        self._history: Dict[str, array] = {
+            name: array("d", bytes(8 * n * capacity)) for name in self.channels
+        }
+        self._total = 0
+        self._store_row()
+
+    def _store_row(self) -> None:
+        n = len(self.rooms)
+        row = self._total % self.capacity
+        for name, col in self._latest.items():
+            self._history[name][row * n:(row + 1) * n] = col
+        self._total += 1
+
+    def read_batch(self, n: int = 1) -> Dict[str, array]:
+        """
+        Advance every sensor ``n`` readings. Readings are rounded to two
+        decimals, as TemperatureSensor rounds its own.
+
+        Returns:
+            Dict[str, array]: A copy of the latest reading of every room, per
+            channel; changing it does not affect the array.
+        """
+        rnd = self._rng.random
+        for _ in range(n):
+            for name, spec in self.channels.items():
+                col = self._latest[name]
+                if spec.event_rate is not None:
+                    rate = spec.event_rate
+                    col[:] = array("d", [1.0 if rnd() < rate else 0.0 for _ in col])
+                else:
+                    span = 2.0 * spec.step
+                    base = spec.step
+                    col[:] = array("d", [round(v + rnd() * span - base, 2) for v in col])
+            self._store_row()
+        return {name: array("d", col) for name, col in self._latest.items()}
+
+    def read_data(self) -> Dict[str, array]:
+        """Take one reading from every sensor."""
+        return self.read_batch(1)
+
+    def latest(self, room: str, channel: str = "temperature") -> float:
+        """Latest reading of one sensor."""
+        return self._latest[channel][self._room_index[room]]
+
+    def anomalies(self, thresholds: Optional[Dict[str, Tuple[float, float]]] = None
+                  ) -> List[Tuple[str, str, float]]:
+        """
+        Find every sensor whose latest reading is outside its safe range.
+
+        Args:
+            thresholds: Optional ``{channel: (low, high)}`` overrides.
+
+        Returns:
+            List[Tuple[str, str, float]]: (room, channel, value) per anomaly.
+        """
+        found: List[Tuple[str, str, float]] = []
+        for name, spec in self.channels.items():
+            low, high = (thresholds or {}).get(name, (spec.low, spec.high))
+            col = self._latest[name]
+            if min(col) >= low and max(col) <= high:
+                continue
+            rooms = self.rooms
+            found.extend((rooms[i], name, v) for i, v in enumerate(col) if v < low or v > high)
+        return found
+
+    def detect_anomaly(self, low: Optional[float] = None, high: Optional[float] = None,
+                       channel: str = "temperature") -> bool:
+        """
+        Check if any sensor's latest reading is anomalous. ``low``/``high``
+        override the safe range of ``channel``, mirroring TemperatureSensor.
+        """
+        spec = self.channels[channel]
+        override = {channel: (spec.low if low is None else low, spec.high if high is None else high)}
+        return bool(self.anomalies(override))
+
+    def get_history(self, room: str, channel: str = "temperature", window: int = 0) -> List[float]:
+        """Readings of one sensor, oldest first (last ``window`` readings if given)."""
+        n = len(self.rooms)
+        i = self._room_index[room]
+        kept = min(self._total, self.capacity)
+        if 0 < window < kept:
+            kept = window
+        hist = self._history[channel]
+        first = self._total - kept
+        return [hist[(t % self.capacity) * n + i] for t in range(first, self._total)]
+
+    def sensor(self, room: str, channel: str = "temperature") -> "ArraySensorView":
+        """Expose one cell of the array through the ``Sensor`` interface."""
+        return ArraySensorView(f"{self.id}:{room}:{channel}", self, room, channel)
+
+
+class ArraySensorView(Sensor):
+    """
+    One (room, channel) sensor of a SensorArray. The array is sampled in
+    bulk with ``read_batch``; ``read_data`` returns the latest value.
+    """
+
+    def __init__(self, id_: str, array_: SensorArray, room: str, channel: str):
+        super().__init__(id_)
+        self._array = array_
+        self.room = room
+        self.channel = channel
+
+    def read_data(self) -> float:
+        return self._array.latest(self.room, self.channel)
+
+    def detect_anomaly(self, low: Optional[float] = None, high: Optional[float] = None) -> bool:
+        spec = self._array.channels[self.channel]
+        low = spec.low if low is None else low
+        high = spec.high if high is None else high
+        value = self.read_data()
+        return value < low or value > high
+
+    def get_history(self, window: int = 0) -> List[float]:
+        return self._array.get_history(self.room, self.channel, window)
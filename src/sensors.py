@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
+import math
 import random
-from typing import List
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from .ring_buffer import RingBuffer
 
 
 class Sensor(ABC):
@@ -19,21 +22,105 @@ class Sensor(ABC):
 
 
 class TemperatureSensor(Sensor):
-    """Temperature sensor that tracks temperature readings and detects anomalies."""
+    """
+    Temperature sensor that tracks temperature readings and detects anomalies.
 
-    def __init__(self, id_: str, baseline: float = 22.0):
+    Readings are kept in a fixed-capacity ring buffer with rolling statistics
+    over ``windows`` and an exponentially weighted moving average (EWMA).
+    Simulated readings are drawn from ``rng`` (the global ``random`` module
+    if omitted). Reads and writes of the buffer hold a lock, so a background
+    sampler can record readings while other threads query the history.
+    """
+
+    def __init__(self, id_: str, baseline: float = 22.0, capacity: int = 4096,
+                 windows: Iterable[int] = (60,), ewma_alpha: float = 0.1,
+                 rng: Optional[random.Random] = None):
         super().__init__(id_)
-        self.history: List[float] = [baseline]
+        self.rng = rng if rng is not None else random
+        self.history = RingBuffer(capacity, windows)
+        self.ewma_alpha = ewma_alpha
+        self.ewma_mean = baseline
+        self.ewma_var = 0.0
+        self._ewma_z = 0.0
+        self._lock = threading.Lock()
+        self.history.append(baseline)
 
     def read_data(self) -> float:
-        next_val = round(self.history[-1] + random.uniform(-1.0, 1.0), 2)
-        self.history.append(next_val)
+        with self._lock:
+            next_val = round(self.history.latest() + self.rng.uniform(-1.0, 1.0), 2)
+            self._record(next_val)
         return next_val
 
-    def detect_anomaly(self, low: float = 18.0, high: float = 28.0) -> bool:
-        """Check if the latest temperature reading is outside the given range."""
-        latest = self.history[-1]
-        return latest < low or latest > high
+    def _record(self, value: float) -> None:
+        # Caller holds the lock.
+        # z-score against the EWMA *before* this reading, then update it.
+        std = math.sqrt(self.ewma_var)
+        self._ewma_z = (value - self.ewma_mean) / std if std else 0.0
+        diff = value - self.ewma_mean
+        incr = self.ewma_alpha * diff
+        self.ewma_mean += incr
+        self.ewma_var = (1 - self.ewma_alpha) * (self.ewma_var + diff * incr)
+        self.history.append(value)
+
+    def detect_anomaly(self, low: float = 18.0, high: float = 28.0, mode: str = "band",
+                       threshold: float = 3.0, window: int = 0) -> bool:
+        """
+        Check whether the latest temperature reading is anomalous.
+
+        Modes:
+            band: outside the fixed ``low``..``high`` range (default).
+            zscore: more than ``threshold`` standard deviations from the rolling
+                mean over ``window`` readings (the first registered window if 0).
+            ewma: more than ``threshold`` standard deviations from the EWMA.
+        """
+        with self._lock:
+            latest = self.history.latest()
+            if mode == "band":
+                return latest < low or latest > high
+            if mode == "zscore":
+                stats = self.history.stats(window or self.history.windows[0])
+                std = stats.std
+                return bool(std) and abs(latest - stats.mean) / std > threshold
+            if mode == "ewma":
+                return abs(self._ewma_z) > threshold
+        raise ValueError(f"Unknown anomaly mode: {mode}")
+
+    def rolling_stats(self, window: int = 0) -> Dict[str, float]:
+        """Rolling mean, variance, std, min and max (first registered window if 0)."""
+        with self._lock:
+            return self.history.stats(window or self.history.windows[0]).as_dict()
+
+    def history_view(self, window: int = 0) -> Tuple[memoryview, ...]:
+        """
+        Zero-copy view of the last ``window`` readings (all buffered if 0).
+        The view is not protected by the lock: while a sampler is running,
+        use ``get_history`` instead.
+        """
+        return self.history.view(window)
+
+    def get_history(self, window: int = 0) -> List[float]:
+        with self._lock:
+            return self.history.to_list(window)
+
+
+class ObstacleSensor(Sensor):
+    """Obstacle sensor that tracks corridors currently reported as blocked."""
 
-    def get_history(self) -> List[float]:
-        return list(self.history)
+    def __init__(self, id_: str):
+        super().__init__(id_)
+        self.blocked: Set[Tuple[str, str]] = set()
+
+    def report(self, a: str, b: str) -> None:
+        """Record an obstacle on the corridor between two locations."""
+        self.blocked.add((a, b) if a <= b else (b, a))
+
+    def clear(self, a: str, b: str) -> None:
+        """Record that the corridor between two locations is clear again."""
+        self.blocked.discard((a, b) if a <= b else (b, a))
+
+    def read_data(self) -> List[Tuple[str, str]]:
+        return sorted(self.blocked)
+
+    def detect_anomaly(self) -> bool:
+        """Check if any corridor is currently blocked."""
+        return bool(self.blocked)
@@ -0,0 +1,398 @@
+# src/server.py
+"""
+Network Service for Humanoid Classroom Robot
+---------------------------------------------
+Lets classroom tablets and the timetable system drive a RobotController
+over TCP on the local network.
+
+Protocol: one JSON object per line (UTF-8) in each direction.
+    request:  {"id": 7, "verb": "enqueue", "args": {"item": "book", "source": "library",
+               "destination": "teacher", "priority": 1}}
+              {"id": 8, "line": "greet Alice"}
+    response: {"id": 7, "ok": true, "result": {"task_id": 42, "pending": 3}}
+              {"id": 9, "ok": false, "error": "Task queue is full (5000 pending)", "retry": true}
+
+Connections are persistent and requests may be pipelined: responses come
+back in request order, and every request already received is answered
+with a single write.
+
+Verbs:
+    deliver, greet, monitor   as in ``commands.py`` (``deliver`` runs its own
+                    task at once, ahead of the queue, and returns its "task_id";
+                    its optional "requester" is who the delivery is logged for)
+    undo            {"count": n?, "who": name?}
+    status          {"since_version": {...}?, "summary": bool?}
+    enqueue         one task; the robot works through the queue in the background
+    enqueue_many    {"tasks": [...]}; queued with one TaskManager operation
+                    (both take an optional "requester", whose "undo" cancels
+                    requests still queued)
+    ping
+
+Arguments are checked against each verb's schema before anything runs;
+unknown arguments and values of the wrong type are refused.
+
+Classes:
+    - QueueFullError: Raised when a request would overfill the task queue.
+    - RobotServer: asyncio TCP server wrapping one RobotController.
+    - RobotClient: Pipelining asyncio client.
+
+Functions:
+    - validate: Check a command's arguments against its verb's schema.
+    - main: Run the server from the command line.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .commands import Command, CommandDispatcher, CommandError, parse_command
+from .robot_controller import RobotController
+from .task_manager import TaskManager
+from .tasks import DeliveryTask
+
+_NO_TASKS = "No tasks to execute."
+_MAX_LINE = 1 << 20
+
+# Argument name -> (accepted types, required) for every verb with arguments.
+_Schema = Dict[str, Tuple[tuple, bool]]
+_TASK: _Schema = {"item": ((str,), True), "source": ((str,), True), "destination": ((str,), True),
+                  "priority": ((int,), False), "deadline": ((int, float), False)}
+_SCHEMAS: Dict[str, _Schema] = {
+    "deliver": {**_TASK, "requester": ((str,), False)},
+    "enqueue": {**_TASK, "requester": ((str,), False)},
+    "enqueue_many": {"tasks": ((list,), True), "requester": ((str,), False)},
+    "greet": {"name": ((str,), True)},
+    "undo": {"count": ((int,), False), "who": ((str,), False)},
+    "status": {"since_version": ((dict,), False), "summary": ((bool,), False)},
+    "monitor": {},
+    "ping": {},
+}
+
+
+def _check(args: Dict, schema: _Schema, what: str) -> None:
+    """Raise CommandError unless ``args`` has exactly the shape ``schema`` describes."""
+    for name in args:
+        if name not in schema:
+            raise CommandError(f"Unknown argument '{name}' for {what}")
+    for name, (types, required) in schema.items():
+        value = args.get(name)
+        if value is None:
+            if required:
+                raise CommandError(f"Missing argument '{name}' for {what}")
+        elif not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            expected = " or ".join(t.__name__ for t in types)
+            raise CommandError(f"'{name}' must be {expected} for {what}")
+
+
+def validate(command: Command) -> None:
+    """
+    Check a command's arguments before it is dispatched.
+
+    Raises:
+        CommandError: If an argument is unknown, missing or of the wrong type.
+    """
+    schema = _SCHEMAS.get(command.verb)
+    if schema is None:
+        return  # unknown verbs are refused by dispatch
+    args = command.args
+    _check(args, schema, command.verb)
+    if command.verb == "enqueue_many":
+        for spec in args["tasks"]:
+            if not isinstance(spec, dict):
+                raise CommandError("Every entry of 'tasks' must be a JSON object")
+            _check(spec, _TASK, "a task")
+    since = args.get("since_version")
+    if since is not None and not all(isinstance(v, int) and not isinstance(v, bool) for v in since.values()):
+        raise CommandError("'since_version' must map component names to integers")
+
+
+class QueueFullError(RuntimeError):
+    """Raised when accepting a request would exceed the server's queue limit."""
+
+
+class RobotServer:
+    """
+    JSON-lines TCP service for a robot.
+
+    Attributes:
+        robot (RobotController): The robot being driven.
+        host (str): Interface to listen on.
+        port (int): Port to listen on; 0 picks a free one (updated by ``start``).
+        max_pending (int): Queue length above which new work is refused with
+            ``"retry": true`` so clients back off.
+        drain_batch (int): Queued tasks executed between yields to the event loop.
+        requests (int): Requests handled so far.
+        rejected (int): Requests refused because the queue was full.
+    """
+
+    def __init__(self, robot: Optional[RobotController] = None, host: str = "127.0.0.1", port: int = 0,
+                 max_pending: int = 10000, drain_batch: int = 64):
+        self.robot = robot if robot is not None else RobotController("R-001", verbose=False)
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.drain_batch = drain_batch
+        self.requests = 0
+        self.rejected = 0
+        self._dispatcher = CommandDispatcher(self.robot)
+        self._server: Optional[asyncio.Server] = None
+        self._drainer: Optional[asyncio.Task] = None
+        self._handlers: Dict[str, Callable[[Dict], Dict]] = {
+            "deliver": self._deliver,
+            "enqueue": self._enqueue,
+            "enqueue_many": self._enqueue_many,
+            "status": self._status,
+            "ping": lambda args: {"pong": True},
+        }
+
+    async def start(self) -> None:
+        """Start listening; ``port`` is updated with the actual port."""
+        self._server = await asyncio.start_server(self._serve, self.host, self.port, limit=_MAX_LINE)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop accepting connections and finish the queued work."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.wait_idle()
+
+    async def wait_idle(self) -> None:
+        """Wait until the background worker has emptied the queue."""
+        if self._drainer is not None:
+            await asyncio.shield(self._drainer)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        buffered = b""
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                lines = (buffered + data).split(b"\n")
+                buffered = lines.pop()
+                if len(buffered) > _MAX_LINE:
+                    writer.write(b'{"id": null, "ok": false, "error": "Request line too long"}\n')
+                    break
+                responses = [self.handle_line(line) for line in lines if line.strip()]
+                if responses:
+                    writer.write(("\n".join(responses) + "\n").encode("utf-8"))
+                    # Stops reading (and so applies TCP backpressure) while the client is not reading.
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                # Cancelled when the server shuts down mid-close; the
+                # transport is already closing, so there is nothing to wait for.
+                pass
+
+    def handle_line(self, line: bytes) -> str:
+        """
+        Handle one request line.
+
+        Returns:
+            str: The JSON response (without the trailing newline).
+        """
+        self.requests += 1
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise CommandError("A request must be a JSON object")
+            request_id = request.get("id")
+            if "line" in request:
+                command = parse_command(str(request["line"]))
+                if command is None:
+                    raise CommandError("Empty command")
+            else:
+                args = request.get("args") or {}
+                if not isinstance(args, dict):
+                    raise CommandError("'args' must be a JSON object")
+                command = Command(str(request.get("verb", "")).lower(), args)
+            validate(command)
+            response = {"id": request_id, "ok": True, "result": self.dispatch(command)}
+            return json.dumps(response)
+        except QueueFullError as exc:
+            self.rejected += 1
+            response = {"id": request_id, "ok": False, "error": str(exc), "retry": True}
+        except KeyError as exc:
+            response = {"id": request_id, "ok": False, "error": f"Missing argument {exc}"}
+        except (ValueError, TypeError) as exc:
+            response = {"id": request_id, "ok": False, "error": str(exc)}
+        except Exception as exc:
+            # A failing command must not take the connection, or its other
+            # pipelined requests, down with it.
+            response = {"id": request_id, "ok": False, "error": f"Internal error: {type(exc).__name__}: {exc}"}
+        return json.dumps(response)
+
+    def dispatch(self, command: Command) -> Dict:
+        """Execute a command and return its result."""
+        handler = self._handlers.get(command.verb)
+        if handler is not None:
+            return handler(command.args)
+        if command.verb in ("help", "exit"):
+            raise CommandError(f"'{command.verb}' is not available over the network")
+        return self._dispatcher.dispatch(command)
+
+    def _admit(self, count: int) -> None:
+        pending = len(self.robot.task_manager)
+        if pending + count > self.max_pending:
+            raise QueueFullError(f"Task queue is full ({pending} pending)")
+
+    @staticmethod
+    def _task(args: Dict) -> DeliveryTask:
+        deadline = args.get("deadline")
+        return DeliveryTask.create(str(args["item"]), str(args["source"]), str(args["destination"]),
+                                   int(args.get("priority", 0)), None if deadline is None else float(deadline),
+                                   args.get("requester"))
+
+    def _deliver(self, args: Dict) -> Dict:
+        self._admit(1)
+        task = self._task(args)
+        self.robot.task_manager.enqueue_task(task)
+        result = self.robot.execute_task(task.id)
+        return {"delivered": result.startswith("Delivered"), "message": result, "task_id": task.id}
+
+    def _enqueue(self, args: Dict) -> Dict:
+        self._admit(1)
+        task = self._task(args)
+        self.robot.enqueue_requests([task], args.get("requester"))
+        self._kick()
+        return {"task_id": task.id, "pending": len(self.robot.task_manager)}
+
+    def _enqueue_many(self, args: Dict) -> Dict:
+        specs = args["tasks"]
+        if not isinstance(specs, list):
+            raise CommandError("'tasks' must be a list")
+        self._admit(len(specs))
+        tasks = [self._task(spec) for spec in specs]
+        self.robot.enqueue_requests(tasks, args.get("requester"))
+        self._kick()
+        return {"task_ids": [t.id for t in tasks], "pending": len(self.robot.task_manager)}
+
+    def _status(self, args: Dict) -> Dict:
+        since = args.get("since_version")
+        return self.robot.get_status(since, bool(args.get("summary", since is None)))
+
+    def _kick(self) -> None:
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.get_running_loop().create_task(self._drain())
+
+    async def _drain(self) -> None:
+        """Execute queued tasks in small batches, yielding to the network in between."""
+        execute = self.robot.execute_task
+        while True:
+            for _ in range(self.drain_batch):
+                if execute() == _NO_TASKS:
+                    return
+            await asyncio.sleep(0)
+
+
+class RobotClient:
+    """
+    Client for RobotServer that can keep many requests in flight.
+
+    ``send`` writes a request and returns a future for its response without
+    waiting; responses are matched to requests by order.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._waiting: Deque[asyncio.Future] = deque()
+        self._receiver = asyncio.get_running_loop().create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = 8765) -> "RobotClient":
+        reader, writer = await asyncio.open_connection(host, port, limit=_MAX_LINE)
+        return cls(reader, writer)
+
+    def send(self, verb: str, **args) -> asyncio.Future:
+        """Pipeline a request; the future resolves to the response dict."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append(future)
+        request = {"id": next(self._ids), "verb": verb, "args": args}
+        self._writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        return future
+
+    async def request(self, verb: str, **args) -> Dict:
+        """Send a request and wait for its response."""
+        future = self.send(verb, **args)
+        await self._writer.drain()
+        return await future
+
+    async def drain(self) -> None:
+        """Wait until the transport's send buffer has room again."""
+        await self._writer.drain()
+
+    async def _receive(self) -> None:
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._waiting.popleft()
+                if not future.done():
+                    future.set_result(response)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            while self._waiting:
+                future = self._waiting.popleft()
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection closed"))
+
+    async def close(self) -> None:
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self._receiver
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve a classroom robot over TCP (JSON lines).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-pending", type=int, default=10000,
+                        help="queue length above which new work is refused")
+    parser.add_argument("--sample-interval", type=float, default=None, metavar="SECONDS",
+                        help="sample the temperature sensor in the background and print alerts")
+    parser.add_argument("--coalesce", choices=("duplicates", "route"), default=None,
+                        help="merge queued deliveries of the same item, or along the same route")
+    options = parser.parse_args(argv)
+
+    async def serve() -> None:
+        robot = RobotController("R-001", verbose=False,
+                                task_manager=TaskManager("TM1", coalesce=options.coalesce))
+        server = RobotServer(robot, options.host, options.port, max_pending=options.max_pending)
+        if options.sample_interval:
+            server.robot.start_sampler(options.sample_interval, [
+                lambda r: print(f"Temperature alert from {r.sensor_id}: {r.value}°C", flush=True)])
+        await server.start()
+        print(f"Robot service listening on {server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# src/task_journal.py
+"""
+Task Journal for Humanoid Classroom Robot
+------------------------------------------
+Optional durable backend for TaskManager: a write-ahead log (WAL) of queue
+operations with group commit, periodic snapshots and replay on startup.
+
+Classes:
+    - TaskJournal: Append-only WAL files plus a compacted snapshot.
+
+Key Features:
+    - One JSON line per enqueue / dequeue / complete / fail / cancel /
+      reprioritise record
+    - Group commit: records are buffered and written with a single fsync
+      once ``group_size`` records are pending or ``commit_interval``
+      seconds have passed
+    - Snapshots every ``snapshot_every`` records; older WAL files are then
+      deleted, so recovery reads the snapshot plus the WAL tail only
+    - Tasks that were dequeued but never completed or failed are
+      re-queued on recovery
+"""
+
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+from .tasks import DeliveryTask
+
+ENQUEUE, DEQUEUE, COMPLETE, FAIL, CANCEL, REPRIORITISE = "E", "D", "C", "F", "X", "P"
+
+_SNAPSHOT = "snapshot.json"
+_WAL_PREFIX = "wal-"
+
+
+def _task_record(task: DeliveryTask) -> list:
+    return [task.id, task.item, task.from_location, task.to_location, task.priority, task.deadline]
+
+
+def _task_from_record(fields: list) -> DeliveryTask:
+    id_, item, from_location, to_location, priority, deadline = fields
+    intern = sys.intern
+    return DeliveryTask(id=id_, item=intern(item), from_location=intern(from_location),
+                        to_location=intern(to_location), priority=priority, deadline=deadline)
+
+
+class TaskJournal:
+    """
+    Write-ahead log and snapshot store for a TaskManager.
+
+    Attributes:
+        directory (str): Where WAL files and the snapshot live.
+        group_size (int): Pending records that trigger a commit.
+        commit_interval (float): Maximum seconds a record may stay buffered
+            (checked whenever a record is added).
+        snapshot_every (int): Records between snapshots.
+        fsync (bool): Whether commits are fsynced to disk.
+        last_id (int): Highest integer task ID seen in the journal.
+    """
+
+    def __init__(self, directory: str, group_size: int = 256, commit_interval: float = 0.05,
+                 snapshot_every: int = 50000, fsync: bool = True):
+        self.directory = directory
+        self.group_size = group_size
+        self.commit_interval = commit_interval
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self._buffer: List[str] = []
+        self._since_snapshot = 0
+        self._last_commit = time.monotonic()
+        self._wal_number = 0
+        self._file = None
+        self.last_id = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _wal_files(self) -> List[Tuple[int, str]]:
+        found = []
+        for name in os.listdir(self.directory):
+            if name.startswith(_WAL_PREFIX) and name.endswith(".log"):
+                found.append((int(name[len(_WAL_PREFIX):-4]), name))
+        return sorted(found)
+
+    def _open_wal(self, number: int) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._wal_number = number
+        self._file = open(self._path(f"{_WAL_PREFIX}{number:08d}.log"), "ab")
+
+    def recover(self) -> Tuple[List[DeliveryTask], List[int]]:
+        """
+        Rebuild the queue from the snapshot and the WAL tail, then start a new WAL file.
+
+        Returns:
+            Tuple[List[DeliveryTask], List[int]]: Pending tasks in dispatch
+            order (in-flight tasks last) and completed task IDs, oldest first.
+        """
+        pending: "OrderedDict[int, DeliveryTask]" = OrderedDict()
+        in_flight: "OrderedDict[int, DeliveryTask]" = OrderedDict()
+        completed: List[int] = []
+        first_wal = 0
+        snap_path = self._path(_SNAPSHOT)
+        if os.path.exists(snap_path):
+            with open(snap_path, encoding="utf-8") as fh:
+                snap = json.load(fh)
+            for fields in snap["pending"]:
+                task = _task_from_record(fields)
+                pending[task.id] = task
+            completed.extend(snap["completed"])
+            first_wal = snap["wal"]
+            self.last_id = snap.get("last_id", 0)
+
+        last = first_wal - 1
+        for number, name in self._wal_files():
+            last = max(last, number)
+            if number < first_wal:
+                continue
+            with open(self._path(name), "rb") as fh:
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # torn write at the end of the log
+                    self._apply(record, pending, in_flight, completed)
+                    if record[0] == ENQUEUE and isinstance(record[1], int) and record[1] > self.last_id:
+                        self.last_id = record[1]
+
+        for task in in_flight.values():
+            pending[task.id] = task
+        self._open_wal(last + 1)
+        return list(pending.values()), completed
+
+    @staticmethod
+    def _apply(record: list, pending: Dict[int, DeliveryTask], in_flight: Dict[int, DeliveryTask],
+               completed: List[int]) -> None:
+        kind = record[0]
+        if kind == ENQUEUE:
+            task = _task_from_record(record[1:])
+            in_flight.pop(task.id, None)
+            pending[task.id] = task
+        elif kind == DEQUEUE:
+            task = pending.pop(record[1], None)
+            if task is not None:
+                in_flight[task.id] = task
+        elif kind == COMPLETE:
+            in_flight.pop(record[1], None) or pending.pop(record[1], None)
+            completed.append(record[1])
+        elif kind == FAIL:
+            in_flight.pop(record[1], None) or pending.pop(record[1], None)
+        elif kind == CANCEL:
+            pending.pop(record[1], None)
+        elif kind == REPRIORITISE:
+            task = pending.pop(record[1], None)
+            if task is not None:
+                task.priority, task.deadline = record[2], record[3]
+                pending[task.id] = task
+
+    def record_enqueue(self, task: DeliveryTask) -> bool:
+        if isinstance(task.id, int) and task.id > self.last_id:
+            self.last_id = task.id
+        return self._record([ENQUEUE] + _task_record(task))
+
+    def record(self, kind: str, *fields) -> bool:
+        """
+        Append a record; see the module constants for the kinds.
+
+        Returns:
+            bool: True when a snapshot is due.
+        """
+        return self._record([kind, *fields])
+
+    def _record(self, record: list) -> bool:
+        self._buffer.append(json.dumps(record, separators=(",", ":")))
+        self._since_snapshot += 1
+        if (len(self._buffer) >= self.group_size
+                or time.monotonic() - self._last_commit >= self.commit_interval):
+            self.commit()
+        return self._since_snapshot >= self.snapshot_every
+
+    def commit(self) -> None:
+        """Write every buffered record with one write and one fsync."""
+        if self._buffer:
+            self._file.write(("\n".join(self._buffer) + "\n").encode("utf-8"))
+            self._buffer.clear()
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        self._last_commit = time.monotonic()
+
+    def snapshot(self, pending: Iterable[DeliveryTask], completed: Iterable[int]) -> None:
+        """
+        Write a compacted snapshot of the queue and drop the WAL files it covers.
+
+        Args:
+            pending (Iterable[DeliveryTask]): Queued and in-flight tasks, in dispatch order.
+            completed (Iterable[int]): Completed task IDs to remember, oldest first.
+        """
+        self.commit()
+        covered = self._wal_number
+        data = {"wal": covered + 1, "last_id": self.last_id,
+                "pending": [_task_record(t) for t in pending], "completed": list(completed)}
+        tmp = self._path(_SNAPSHOT + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, separators=(",", ":"))
+            fh.flush()
+            if self.fsync:
+                os.fsync(fh.fileno())
+        os.replace(tmp, self._path(_SNAPSHOT))
+        self._open_wal(covered + 1)
+        for number, name in self._wal_files():
+            if number <= covered:
+                os.remove(self._path(name))
+        self._since_snapshot = 0
+
+    def close(self) -> None:
+        """Commit buffered records and close the WAL file."""
+        if self._file is not None:
+            self.commit()
+            self._file.close()
+            self._file = None
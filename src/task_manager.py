@@ -1,25 +1,255 @@
 # src/task_manager.py
+import dataclasses
+import heapq
+import itertools
+import threading
 from collections import deque
-from typing import Deque, List, Optional
-from .tasks import DeliveryTask
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from .tasks import DeliveryTask, TaskStatus, TaskStore, advance_ids
+from .task_journal import CANCEL, COMPLETE, DEQUEUE, FAIL, REPRIORITISE, TaskJournal
+from .metrics import MetricsRegistry
+from .retry import RetryPolicy, TimerWheel
+
+# Sentinel stored in a heap entry once its task has been cancelled or
+# rescheduled; the stale entry is discarded when it reaches the top.
+_REMOVED = None
+_NO_DEADLINE = float("inf")
 
 
 class TaskManager:
     """
     Manager class for handling delivery tasks for the humanoid robot.
-    Uses a queue for task scheduling and tracks completed tasks.
+    Uses a priority heap for task scheduling and tracks completed tasks.
+
+    Tasks are served by highest priority first, then earliest deadline,
+    then arrival order. An id -> heap entry index gives O(1) lookup and
+    O(log n) cancel and reprioritise. All public methods are thread-safe so
+    several robots can share one manager. With a ``journal`` every change is
+    written ahead to disk and the queue is recovered from it on start-up.
+    With ``metrics`` the enqueue -> dequeue -> complete lifecycle is timed.
+    With an ``archive`` every finished task is kept in a columnar TaskStore.
+    With a ``retry_policy`` failed tasks wait on a timer wheel and rejoin the
+    queue behind work that arrived before they became due; tasks out of
+    attempts go to ``dead_letters``, which keeps the newest ``history_size``
+    and counts the requests it forgets in ``dead_letters_dropped``. Retry times are simulated minutes, fed
+    in through ``advance`` and ``mark_failed``.
+
+    With ``coalesce`` a new task is merged into a queued task going the
+    same way instead of taking a trip of its own: ``"duplicates"`` merges
+    requests for the same item between the same locations, ``"route"`` any
+    requests between the same locations. A hash index finds the queued task
+    in O(1); it keeps the highest priority and earliest deadline of its
+    requests and carries at most ``max_merge`` of them. Completing or failing
+    it completes or fails every merged task, and cancelling one request
+    leaves the others queued. The journal records every request on its own
+    with its own priority; recovery merges them again.
+
+    Every change bumps ``version`` and is recorded in a bounded change log,
+    so ``changes_since`` can report what happened after an earlier version.
     """
 
-    def __init__(self, id_: str):
+    def __init__(self, id_: str, history_size: int = 1000, journal: Optional[TaskJournal] = None,
+                 metrics: Optional[MetricsRegistry] = None, archive: Optional[TaskStore] = None,
+                 retry_policy: Optional[RetryPolicy] = None, coalesce: Optional[str] = None,
+                 max_merge: int = 8):
         """
         Initialize the task manager with a unique identifier.
 
         Args:
             id_ (str): Unique identifier for the task manager.
+            history_size (int): Number of completed task IDs to remember.
+            journal (Optional[TaskJournal]): Durable log to recover from and write to.
+            metrics (Optional[MetricsRegistry]): Registry for queue metrics.
+            archive (Optional[TaskStore]): Store that completed and failed tasks are appended to.
+            retry_policy (Optional[RetryPolicy]): Retry failed tasks instead of dropping them.
+            coalesce (Optional[str]): "duplicates" or "route" to merge pending
+                deliveries on enqueue; None queues every task separately.
+            max_merge (int): Most requests one queued task may carry.
         """
+        if coalesce not in (None, "duplicates", "route"):
+            raise ValueError(f"Unknown coalesce mode: {coalesce}")
         self.id = id_
-        self.task_queue: Deque[DeliveryTask] = deque()
-        self.completed: List[str] = []
+        self.task_queue: List[list] = []
+        self.completed: Deque[int] = deque(maxlen=history_size)
+        self._index: Dict[int, list] = {}
+        self._counter = itertools.count()
+        # Tasks put back with ``requeue_tasks`` sort ahead of everything queued.
+        self._front = itertools.count(-1, -1)
+        self._lock = threading.RLock()
+        # Bumped on every change to the queue or the completed history; the
+        # newest changes are kept as (version, op, task ID).
+        self.version = 0
+        self._changes: Deque[Tuple[int, str, int]] = deque(maxlen=history_size)
+        # Dequeued but not yet completed/failed; only tracked with a journal.
+        self._in_flight: Dict[int, DeliveryTask] = {}
+        self.journal: Optional[TaskJournal] = None
+        self.metrics = metrics
+        self.archive = archive
+        self.retry_policy = retry_policy
+        self.dead_letters: Deque[DeliveryTask] = deque(maxlen=history_size)
+        self.dead_letters_dropped = 0
+        self._retry_wheel = TimerWheel()
+        self._now = 0.0
+        self._attempts = self._succeeded = self._failed = self._retries = self._dead_lettered = 0
+        self.coalesce = coalesce
+        self.max_merge = max_merge
+        self.coalesced = 0
+        # Coalescing key -> ID of the queued task new requests merge into.
+        self._carriers: Dict[Tuple[str, ...], int] = {}
+        # ID of a merged task -> ID of the queued task carrying it.
+        self._carrier_of: Dict[int, int] = {}
+        # Carrier ID -> its own priority and deadline, before merges raised them.
+        self._own: Dict[int, Tuple[int, Optional[float]]] = {}
+        if metrics is not None:
+            self._enqueued_at: Dict[int, float] = {}
+            self._dequeued_at: Dict[int, float] = {}
+            self._m_enqueued = metrics.counter("tasks_enqueued_total", "Tasks added to the queue")
+            self._m_completed = metrics.counter("tasks_completed_total", "Tasks completed")
+            self._m_failed = metrics.counter("tasks_failed_total", "Tasks failed")
+            self._m_wait = metrics.histogram("task_queue_wait_seconds", "Time from enqueue to dequeue")
+            self._m_service = metrics.histogram("task_service_seconds", "Time from dequeue to completion")
+            self._m_total = metrics.histogram("task_total_seconds", "Time from enqueue to completion")
+            self._m_pending = metrics.gauge("tasks_pending", "Tasks waiting in the queue")
+            self._m_retries = metrics.counter("task_retries_total", "Failed attempts scheduled for retry")
+            self._m_dead = metrics.counter("tasks_dead_lettered_total", "Tasks that ran out of attempts")
+            self._m_coalesced = metrics.counter("tasks_coalesced_total", "Tasks merged into a queued task")
+        if journal is not None:
+            pending, completed = journal.recover()
+            for task in pending:
+                if self.coalesce is None or not self._coalesce_into(task):
+                    self._push(task)
+            self.completed.extend(completed)
+            advance_ids(journal.last_id)
+            self.journal = journal
+
+    def _log(self, kind: str, *fields) -> None:
+        """Write a record to the journal, if any (caller holds the lock)."""
+        if self.journal is not None and self.journal.record(kind, *fields):
+            self._snapshot()
+
+    def _own_form(self, task: DeliveryTask) -> DeliveryTask:
+        """
+        ``task`` as the journal records it: a carrier with its own priority
+        and deadline, since recovery merges its requests again.
+        """
+        own = self._own.get(task.id)
+        return task if own is None else dataclasses.replace(task, priority=own[0], deadline=own[1])
+
+    def _snapshot(self) -> None:
+        tasks = [e[-1] for e in sorted(self._index.values())] + list(self._in_flight.values())
+        self.journal.snapshot([self._own_form(t) for task in tasks for t in task.deliveries()],
+                              self.completed)
+
+    def sync(self) -> None:
+        """Force buffered journal records to disk."""
+        if self.journal is not None:
+            with self._lock:
+                self.journal.commit()
+
+    def close(self) -> None:
+        """Flush and close the journal, if any."""
+        if self.journal is not None:
+            with self._lock:
+                self.journal.close()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _entry(self, task: DeliveryTask, front: bool = False) -> list:
+        deadline = _NO_DEADLINE if task.deadline is None else task.deadline
+        entry = [-task.priority, deadline, next(self._front if front else self._counter), task]
+        self._index[task.id] = entry
+        return entry
+
+    def _changed(self, op: str, task_id: int) -> None:
+        self.version += 1
+        self._changes.append((self.version, op, task_id))
+
+    def _push(self, task: DeliveryTask, front: bool = False) -> None:
+        heapq.heappush(self.task_queue, self._entry(task, front))
+        self._changed("queued", task.id)
+
+    def _key(self, task: DeliveryTask) -> Tuple[str, ...]:
+        if self.coalesce == "route":
+            return task.from_location, task.to_location
+        return task.item, task.from_location, task.to_location
+
+    def _coalesce_into(self, task: DeliveryTask) -> bool:
+        """
+        Merge ``task`` into the queued task with the same key (caller holds the lock).
+
+        Returns:
+            bool: False if ``task`` has to be queued itself; it then becomes
+            the task later requests with its key merge into.
+        """
+        key = self._key(task)
+        entry = self._index.get(self._carriers.get(key, -1))
+        if entry is None or task.merged or entry[-1].quantity >= self.max_merge:
+            self._carriers[key] = task.id
+            self._adopt(task)
+            return False
+        carrier = entry[-1]
+        if carrier.merged is None:
+            carrier.merged = []
+            self._own[carrier.id] = (carrier.priority, carrier.deadline)
+        carrier.merged.append(task)
+        self._carrier_of[task.id] = carrier.id
+        self.coalesced += 1
+        if self.metrics is not None:
+            self._m_coalesced.inc()
+        earlier = task.deadline is not None and (carrier.deadline is None or task.deadline < carrier.deadline)
+        if task.priority > carrier.priority or earlier:
+            self._remove(carrier.id)
+            carrier.priority = max(carrier.priority, task.priority)
+            if earlier:
+                carrier.deadline = task.deadline
+            self._push(carrier)
+        else:
+            self._changed("merged", task.id)
+        return True
+
+    def _adopt(self, task: DeliveryTask) -> None:
+        """Index the requests already merged into a queued task under it (caller holds the lock)."""
+        for member in task.merged or ():
+            self._carrier_of[member.id] = task.id
+
+    def _requeue(self, task: DeliveryTask, front: bool = False) -> None:
+        """
+        Queue a task that was taken off the queue earlier, with its merged
+        requests, e.g. for a retry (caller holds the lock). It becomes the
+        task its key merges into unless another queued task already is.
+        With ``front`` it goes ahead of queued tasks of equal rank.
+        """
+        self._push(task, front)
+        if self.coalesce is not None:
+            key = self._key(task)
+            if self._carriers.get(key) not in self._index:
+                self._carriers[key] = task.id
+            self._adopt(task)
+
+    def _journal_requeue(self, task: DeliveryTask) -> None:
+        """Journal every request of a re-queued task as enqueued again (caller holds the lock)."""
+        if self.journal is None:
+            return
+        self._in_flight.pop(task.id, None)
+        snapshot_due = False
+        for t in task.deliveries():
+            snapshot_due = self.journal.record_enqueue(self._own_form(t)) or snapshot_due
+        if snapshot_due:
+            self._snapshot()
+
+    def _release(self, task: DeliveryTask) -> None:
+        """Drop a task that left the queue from the coalescing index (caller holds the lock)."""
+        key = self._key(task)
+        if self._carriers.get(key) == task.id:
+            del self._carriers[key]
+        if task.merged:
+            for member in task.merged:
+                self._carrier_of.pop(member.id, None)
+
+    def _discard_stale(self) -> None:
+        while self.task_queue and self.task_queue[0][-1] is _REMOVED:
+            heapq.heappop(self.task_queue)
 
     def enqueue_task(self, task: DeliveryTask) -> None:
         """
@@ -28,38 +258,530 @@ class TaskManager:
         Args:
             task (DeliveryTask): Task to enqueue.
         """
-        self.task_queue.append(task)
-        # print(f"[TaskManager] enqueued {task.id}")
+        with self._lock:
+            if task.id in self._index or task.id in self._carrier_of:
+                raise ValueError(f"Task {task.id} is already queued")
+            snapshot_due = self._journal_enqueue([task])
+            if self.coalesce is None or not self._coalesce_into(task):
+                self._push(task)
+            if self.metrics is not None:
+                self._enqueued_at.setdefault(task.id, self.metrics.clock())
+                self._m_enqueued.inc()
+                self._m_pending.set(len(self._index))
+            if snapshot_due:
+                self._snapshot()
+
+    def _journal_enqueue(self, tasks: List[DeliveryTask]) -> bool:
+        """
+        Journal new requests before they are queued, so each is written with
+        its own priority before a merge can raise it (caller holds the lock).
+
+        Returns:
+            bool: True when a snapshot is due; take it once the tasks are queued.
+        """
+        if self.journal is None:
+            return False
+        snapshot_due = False
+        for task in tasks:
+            self._in_flight.pop(task.id, None)
+            for t in task.deliveries():
+                snapshot_due = self.journal.record_enqueue(self._own_form(t)) or snapshot_due
+        return snapshot_due
+
+    def enqueue_many(self, tasks: Iterable[DeliveryTask]) -> int:
+        """
+        Add several delivery tasks in one operation.
+
+        The lock is taken once and a large batch is merged with a single
+        heapify instead of one push per task (one push or merge per task when
+        coalescing). Either every task is queued or, if any is a duplicate,
+        none is.
+
+        Args:
+            tasks (Iterable[DeliveryTask]): Tasks to enqueue.
+
+        Returns:
+            int: Number of tasks queued.
+        """
+        tasks = list(tasks)
+        with self._lock:
+            seen = set()
+            for task in tasks:
+                if task.id in self._index or task.id in self._carrier_of or task.id in seen:
+                    raise ValueError(f"Task {task.id} is already queued")
+                seen.add(task.id)
+            snapshot_due = self._journal_enqueue(tasks)
+            if self.coalesce is not None:
+                for task in tasks:
+                    if not self._coalesce_into(task):
+                        self._push(task)
+            elif len(tasks) > len(self.task_queue):
+                self.task_queue.extend(self._entry(task) for task in tasks)
+                heapq.heapify(self.task_queue)
+                for task in tasks:
+                    self._changed("queued", task.id)
+            else:
+                for task in tasks:
+                    self._push(task)
+            if self.metrics is not None:
+                now = self.metrics.clock()
+                for task in tasks:
+                    self._enqueued_at.setdefault(task.id, now)
+                self._m_enqueued.inc(len(tasks))
+                self._m_pending.set(len(self._index))
+            if snapshot_due:
+                self._snapshot()
+            return len(tasks)
 
-    def dequeue_task(self) -> Optional[DeliveryTask]:
+    def dequeue_task(self, task_id: Optional[int] = None) -> Optional[DeliveryTask]:
         """
         Remove and return the next task from the queue.
 
+        Args:
+            task_id (Optional[int]): Take this pending task instead of the
+                next one; if it was merged into another, that carrier is taken.
+
         Returns:
-            Optional[DeliveryTask]: The next task if available, otherwise None.
+            Optional[DeliveryTask]: The task if available, otherwise None.
         """
-        if self.task_queue:
-            t = self.task_queue.popleft()
-            # print(f"[TaskManager] dequeued {t.id}")
+        with self._lock:
+            if task_id is None:
+                self._discard_stale()
+                if not self.task_queue:
+                    return None
+                t = heapq.heappop(self.task_queue)[-1]
+                del self._index[t.id]
+            else:
+                entry = self._index.pop(self._carrier_of.get(task_id, task_id), None)
+                if entry is None:
+                    return None
+                t, entry[-1] = entry[-1], _REMOVED
+                self._compact()
+            self._changed("dequeued", t.id)
+            if self.coalesce is not None:
+                self._release(t)
+            if self.metrics is not None:
+                now = self.metrics.clock()
+                for d in t.deliveries():
+                    self._dequeued_at[d.id] = now
+                    self._m_wait.observe(now - self._enqueued_at.get(d.id, now))
+                self._m_pending.set(len(self._index))
+            if self.journal is not None:
+                self._in_flight[t.id] = t
+                for d in t.deliveries():
+                    self._log(DEQUEUE, d.id)
             return t
-        return None
+
+    def requeue_tasks(self, tasks: Iterable[DeliveryTask]) -> int:
+        """
+        Put tasks that were dequeued but never started back where they were:
+        ahead of queued tasks of the same priority and deadline, in the given
+        order. They are not counted as enqueued again and keep their
+        original enqueue time.
+
+        Args:
+            tasks (Iterable[DeliveryTask]): Tasks in the order they were dequeued.
+
+        Returns:
+            int: Number of tasks re-queued.
+
+        Raises:
+            ValueError: If one of the tasks is still queued.
+        """
+        tasks = list(tasks)
+        with self._lock:
+            for task in tasks:
+                if task.id in self._index or task.id in self._carrier_of:
+                    raise ValueError(f"Task {task.id} is already queued")
+            for task in reversed(tasks):
+                self._requeue(task, front=True)
+                self._journal_requeue(task)
+            if tasks and self.metrics is not None:
+                self._m_pending.set(len(self._index))
+            return len(tasks)
+
+    def peek_task(self) -> Optional[DeliveryTask]:
+        """
+        Return the next task without removing it from the queue.
+
+        Returns:
+            Optional[DeliveryTask]: The next task if available, otherwise None.
+        """
+        with self._lock:
+            self._discard_stale()
+            return self.task_queue[0][-1] if self.task_queue else None
+
+    def get_task(self, task_id: int) -> Optional[DeliveryTask]:
+        """
+        Look up a pending task by ID, including tasks merged into another.
+
+        Args:
+            task_id (int): ID of the task.
+
+        Returns:
+            Optional[DeliveryTask]: The pending task, or None if not queued.
+        """
+        with self._lock:
+            entry = self._index.get(task_id)
+            if entry is not None:
+                return entry[-1]
+            carrier = self._index.get(self._carrier_of.get(task_id, -1))
+            if carrier is None:
+                return None
+            return next(t for t in carrier[-1].merged if t.id == task_id)
+
+    def cancel_task(self, task_id: int) -> Optional[DeliveryTask]:
+        """
+        Remove a pending task from the queue. Tasks merged into it stay
+        queued, and a merged task is simply taken out of its carrier.
+
+        Args:
+            task_id (int): ID of the task to cancel.
+
+        Returns:
+            Optional[DeliveryTask]: The cancelled task, or None if not queued.
+        """
+        with self._lock:
+            if task_id in self._carrier_of:
+                task = self._detach(task_id)
+            else:
+                task = self._remove(task_id)
+                if task is not None and self.coalesce is not None:
+                    self._release(task)
+                    if task.merged:
+                        self._requeue_members(task)
+            if task is not None:
+                self._own.pop(task_id, None)
+                if self.metrics is not None:
+                    self._enqueued_at.pop(task_id, None)
+                self._log(CANCEL, task_id)
+            return task
+
+    def _remove(self, task_id: int) -> Optional[DeliveryTask]:
+        entry = self._index.pop(task_id, None)
+        if entry is None:
+            return None
+        task = entry[-1]
+        entry[-1] = _REMOVED
+        self._changed("removed", task_id)
+        if self.metrics is not None:
+            self._m_pending.set(len(self._index))
+        self._compact()
+        return task
+
+    def _compact(self) -> None:
+        if len(self.task_queue) > 2 * len(self._index) + 64:
+            # Too many stale entries: rebuild the heap from live ones.
+            self.task_queue = list(self._index.values())
+            heapq.heapify(self.task_queue)
+
+    def _detach(self, task_id: int) -> DeliveryTask:
+        """
+        Take a merged task out of its carrier (caller holds the lock). The
+        carrier's priority and deadline are worked out again from its own
+        and those of the requests it still carries.
+        """
+        carrier = self._index[self._carrier_of.pop(task_id)][-1]
+        task = next(t for t in carrier.merged if t.id == task_id)
+        carrier.merged.remove(task)
+        self._changed("detached", task_id)
+        priority, deadline = self._own.get(carrier.id, (carrier.priority, carrier.deadline))
+        if carrier.merged:
+            priority = max(priority, *(t.priority for t in carrier.merged))
+            deadlines = [t.deadline for t in carrier.merged if t.deadline is not None]
+            if deadline is not None:
+                deadlines.append(deadline)
+            deadline = min(deadlines, default=None)
+        else:
+            carrier.merged = None
+            self._own.pop(carrier.id, None)
+        if (priority, deadline) != (carrier.priority, carrier.deadline):
+            self._remove(carrier.id)
+            carrier.priority, carrier.deadline = priority, deadline
+            self._push(carrier)
+        return task
+
+    def _requeue_members(self, carrier: DeliveryTask) -> None:
+        """
+        Queue the requests merged into a cancelled carrier under the first of
+        them. Like every merge, this is not journaled: recovery redoes it.
+        """
+        first, *rest = carrier.merged
+        carrier.merged = None
+        if rest:
+            self._own[first.id] = (first.priority, first.deadline)
+        for task in rest:
+            self._carrier_of[task.id] = first.id
+            first.priority = max(first.priority, task.priority)
+            if task.deadline is not None and (first.deadline is None or task.deadline < first.deadline):
+                first.deadline = task.deadline
+        self._carrier_of.pop(first.id, None)
+        first.merged = rest or None
+        self._carriers[self._key(first)] = first.id
+        self._push(first)
+        if self.metrics is not None:
+            self._m_pending.set(len(self._index))
+
+    def reprioritise_task(self, task_id: int, priority: int,
+                          deadline: Optional[float] = None) -> bool:
+        """
+        Change the priority (and optionally the deadline) of a pending task.
+
+        Args:
+            task_id (int): ID of the task.
+            priority (int): New priority, higher values are served first.
+            deadline (Optional[float]): New deadline, or None to keep the current one.
+
+        Returns:
+            bool: True if the task was found and rescheduled.
+        """
+        with self._lock:
+            task = self._remove(task_id)
+            if task is None:
+                return False
+            task.priority = priority
+            if deadline is not None:
+                task.deadline = deadline
+            if task_id in self._own:
+                self._own[task_id] = (task.priority, task.deadline)
+            self._push(task)
+            self._log(REPRIORITISE, task_id, task.priority, task.deadline)
+            return True
 
     def mark_completed(self, task: DeliveryTask) -> None:
         """
-        Mark a task as completed and add it to the completed list.
+        Mark a task (and every task merged into it) as completed and add it
+        to the completed list.
 
         Args:
             task (DeliveryTask): Task to mark as completed.
         """
         task.mark_completed()
-        self.completed.append(task.id)
+        deliveries = task.deliveries()
+        with self._lock:
+            for t in deliveries:
+                t.attempts += 1
+                self.completed.append(t.id)
+            self._attempts += len(deliveries)
+            self._succeeded += len(deliveries)
+            self._changed("completed", task.id)
+            self._own.pop(task.id, None)
+            if self.archive is not None:
+                self.archive.extend(deliveries)
+            if self.metrics is not None:
+                for t in deliveries:
+                    self._finish(t.id)
+                self._m_completed.inc(len(deliveries))
+            if self.journal is not None:
+                self._in_flight.pop(task.id, None)
+                for t in deliveries:
+                    self._log(COMPLETE, t.id)
         # print(f"[TaskManager] marked completed {task.id}")
 
-    def list_tasks(self) -> List[str]:
+    def mark_failed(self, task: DeliveryTask, now: Optional[float] = None) -> Optional[float]:
+        """
+        Mark a task (and every task merged into it) as failed, or schedule a
+        retry if the retry policy allows one.
+
+        Args:
+            task (DeliveryTask): Task to mark as failed.
+            now (Optional[float]): Simulated minute of the failure; defaults
+                to the time of the last ``advance``.
+
+        Returns:
+            Optional[float]: When the task will be retried, or None if it failed for good.
+        """
+        deliveries = task.deliveries()
+        n = len(deliveries)
+        with self._lock:
+            for t in deliveries:
+                t.attempts += 1
+            self._attempts += n
+            policy = self.retry_policy
+            if policy is not None and policy.should_retry(task.attempts):
+                self._changed("retrying", task.id)
+                for t in deliveries:
+                    t.status = TaskStatus.RETRYING
+                when = (self._now if now is None else now) + policy.delay(task.attempts)
+                self._retry_wheel.schedule(when, task)
+                self._retries += n
+                if self.metrics is not None:
+                    self._m_retries.inc(n)
+                # With a journal the task stays in flight, so a crash re-queues it.
+                return when
+            task.mark_failed()
+            self._changed("failed", task.id)
+            self._own.pop(task.id, None)
+            self._failed += n
+            if policy is not None:
+                if len(self.dead_letters) == self.dead_letters.maxlen:
+                    self.dead_letters_dropped += self.dead_letters[0].quantity
+                self.dead_letters.append(task)
+                self._dead_lettered += n
+                if self.metrics is not None:
+                    self._m_dead.inc(n)
+            if self.archive is not None:
+                self.archive.extend(deliveries)
+            if self.metrics is not None:
+                for t in deliveries:
+                    self._finish(t.id)
+                self._m_failed.inc(n)
+            if self.journal is not None:
+                self._in_flight.pop(task.id, None)
+                for t in deliveries:
+                    self._log(FAIL, t.id)
+            return None
+
+    def advance(self, now: float) -> int:
+        """
+        Move the retry clock to ``now`` and queue every retry that is due.
+
+        Args:
+            now (float): Current simulated minute; earlier values are ignored.
+
+        Returns:
+            int: Number of tasks returned to the queue.
+        """
+        with self._lock:
+            if now > self._now:
+                self._now = now
+            if not self._retry_wheel:
+                return 0
+            due = self._retry_wheel.advance(self._now)
+            for task in due:
+                for t in task.deliveries():
+                    t.status = TaskStatus.PENDING
+                self._requeue(task)
+                self._journal_requeue(task)
+            if due and self.metrics is not None:
+                self._m_pending.set(len(self._index))
+            return len(due)
+
+    def next_retry_at(self) -> Optional[float]:
+        """Simulated minute of the earliest pending retry, or None if there is none."""
+        with self._lock:
+            return self._retry_wheel.next_due()
+
+    @property
+    def pending_retries(self) -> int:
+        """Number of failed tasks waiting for their retry."""
+        with self._lock:
+            return len(self._retry_wheel)
+
+    def replay_dead_letters(self) -> int:
+        """
+        Queue every dead-lettered task again with a fresh set of attempts.
+
+        Returns:
+            int: Number of tasks re-queued.
+        """
+        with self._lock:
+            tasks = list(self.dead_letters)
+            for task in tasks:
+                if task.id in self._index or task.id in self._carrier_of:
+                    raise ValueError(f"Task {task.id} is already queued")
+            self.dead_letters.clear()
+            for task in tasks:
+                for t in task.deliveries():
+                    t.attempts = 0
+                    t.status = TaskStatus.PENDING
+                self._requeue(task)
+                self._journal_requeue(task)
+                if self.metrics is not None:
+                    now = self.metrics.clock()
+                    for t in task.deliveries():
+                        self._enqueued_at[t.id] = now
+                    self._m_enqueued.inc(task.quantity)
+            if tasks and self.metrics is not None:
+                self._m_pending.set(len(self._index))
+            return len(tasks)
+
+    def retry_stats(self) -> Dict[str, float]:
         """
-        List the IDs of all tasks currently in the queue.
+        Attempt counts for tuning the retry policy.
+
+        ``goodput`` is the share of attempts that delivered something and
+        ``retry_amplification`` the attempts made per finished task.
 
         Returns:
-            List[str]: List of task IDs in the queue.
+            Dict[str, float]: Attempts, outcomes, retries and the two ratios.
         """
-        return [t.id for t in list(self.task_queue)]
+        with self._lock:
+            finished = self._succeeded + self._failed
+            return {
+                "attempts": self._attempts,
+                "succeeded": self._succeeded,
+                "failed": self._failed,
+                "retries": self._retries,
+                "dead_lettered": self._dead_lettered,
+                "dead_letters_dropped": self.dead_letters_dropped,
+                "pending_retries": len(self._retry_wheel),
+                "goodput": round(self._succeeded / self._attempts, 4) if self._attempts else 0.0,
+                "retry_amplification": round(self._attempts / finished, 4) if finished else 0.0,
+            }
+
+    def _finish(self, task_id: int) -> None:
+        now = self.metrics.clock()
+        enqueued = self._enqueued_at.pop(task_id, None)
+        dequeued = self._dequeued_at.pop(task_id, None)
+        if dequeued is not None:
+            self._m_service.observe(now - dequeued)
+        if enqueued is not None:
+            self._m_total.observe(now - enqueued)
+
+    def changes_since(self, version: int) -> Optional[List[Tuple[int, str, int]]]:
+        """
+        The changes made after ``version``, oldest first, in O(changes).
+
+        Each change is ``(version, op, task_id)`` with ``op`` one of
+        "queued", "dequeued", "removed" (cancelled, or about to be queued
+        again with a new priority), "merged", "detached", "completed",
+        "failed" or "retrying".
+
+        Returns:
+            Optional[List[Tuple[int, str, int]]]: The changes, or None if some
+            of them are no longer kept.
+        """
+        with self._lock:
+            new = self.version - version
+            if new <= 0:
+                return []
+            if new > len(self._changes):
+                return None
+            return list(itertools.islice(reversed(self._changes), new))[::-1]
+
+    def list_tasks(self, limit: Optional[int] = None, ordered: bool = True) -> List[int]:
+        """
+        List the IDs of tasks currently in the queue, in dispatch order.
+
+        Args:
+            limit (Optional[int]): Only return the first ``limit`` tasks
+                (O(limit log limit) instead of a full sort).
+            ordered (bool): If False, skip sorting and return the IDs in the
+                order they were queued; O(n).
+
+        Returns:
+            List[int]: List of task IDs in the queue.
+        """
+        with self._lock:
+            if not ordered:
+                return list(self._index)
+            # Entries are read under the lock: a concurrent cancel or dequeue
+            # would otherwise clear ``entry[-1]`` between the sort and the read.
+            if limit is not None:
+                return self._first(limit)
+            return [e[-1].id for e in sorted(self._index.values())]
+
+    def _first(self, limit: int) -> List[int]:
+        """IDs of the first ``limit`` live tasks, by a best-first walk of the heap (caller holds the lock)."""
+        heap = self.task_queue
+        out: List[int] = []
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier and len(out) < limit:
+            entry, i = heapq.heappop(frontier)
+            if entry[-1] is not _REMOVED:
+                out.append(entry[-1].id)
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return out
@@ -1,23 +1,67 @@
 # src/tasks.py
-from dataclasses import dataclass
+import itertools
+import sys
 import uuid
-from typing import Optional
+from array import array
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Task IDs are small monotonic integers; a process-wide random prefix turns
+# them into UUIDs when a globally unique form is needed.
+_ids = itertools.count(1)
+_UUID_PREFIX = uuid.uuid4().int >> 64 << 64
+
+
+def advance_ids(last_id: int) -> None:
+    """
+    Make sure newly created task IDs are greater than ``last_id``.
 
+    Used after recovering tasks from a journal so fresh IDs cannot collide
+    with recovered ones.
 
-@dataclass
+    Args:
+        last_id (int): Highest task ID already in use.
+    """
+    global _ids
+    current = next(_ids)
+    _ids = itertools.count(max(current, last_id + 1))
+
+
+class TaskStatus(str, Enum):
+    """Lifecycle state of a delivery task; compares equal to its old string value."""
+    PENDING = "Pending"
+    COMPLETED = "Completed"
+    FAILED = "Failed"
+    RETRYING = "Retrying"
+
+
+@dataclass(slots=True)
 class DeliveryTask:
     """
     Represents a delivery task for the humanoid robot, including item,
     source and destination locations, and status tracking.
+
+    Instances use ``__slots__`` and integer IDs; item and location strings
+    are interned so the many tasks naming the same rooms share one string.
+    A task the TaskManager coalesced other requests into carries them in
+    ``merged`` and they share its trip and outcome. ``requester`` is who
+    asked for the delivery, if known; undo entries are logged for them.
     """
-    id: str
+    id: int
     item: str
     from_location: str
     to_location: str
-    status: str = "Pending"
+    status: TaskStatus = TaskStatus.PENDING
+    priority: int = 0
+    deadline: Optional[float] = None
+    attempts: int = 0
+    merged: Optional[List["DeliveryTask"]] = None
+    requester: Optional[str] = None
 
     @classmethod
-    def create(cls, item: str, from_location: str, to_location: str) -> "DeliveryTask":
+    def create(cls, item: str, from_location: str, to_location: str, priority: int = 0,
+               deadline: Optional[float] = None, requester: Optional[str] = None) -> "DeliveryTask":
         """
         Factory method to create a new DeliveryTask with a unique ID.
 
@@ -25,20 +69,159 @@ class DeliveryTask:
             item (str): The item to be delivered.
             from_location (str): The starting location.
             to_location (str): The destination location.
+            priority (int): Scheduling priority, higher values are served first.
+            deadline (Optional[float]): Optional deadline; earlier deadlines are
+                served first among tasks of equal priority.
+            requester (Optional[str]): Who asked for the delivery.
 
         Returns:
             DeliveryTask: A new DeliveryTask instance with a unique ID.
         """
-        return cls(id=str(uuid.uuid4()), item=item, from_location=from_location, to_location=to_location)
+        intern = sys.intern
+        return cls(next(_ids), intern(item), intern(from_location), intern(to_location),
+                   TaskStatus.PENDING, priority, deadline, requester=requester)
+
+    @property
+    def uuid(self) -> uuid.UUID:
+        """UUID form of the ID, unique across processes."""
+        return uuid.UUID(int=_UUID_PREFIX | self.id)
+
+    def deliveries(self) -> List["DeliveryTask"]:
+        """This task followed by the tasks merged into it."""
+        return [self, *self.merged] if self.merged else [self]
+
+    @property
+    def quantity(self) -> int:
+        """Number of requests this task delivers."""
+        return 1 + len(self.merged) if self.merged else 1
+
+    def manifest(self) -> Dict[str, int]:
+        """
+        Items carried on this trip.
+
+        Returns:
+            Dict[str, int]: Quantity of each item, in order of first request.
+        """
+        counts: Dict[str, int] = {}
+        for task in self.deliveries():
+            counts[task.item] = counts.get(task.item, 0) + 1
+        return counts
+
+    def describe(self) -> str:
+        """The item, or the manifest when several requests were merged, e.g. ``"3 items (book x2, pen)"``."""
+        if not self.merged:
+            return self.item
+        parts = [item if n == 1 else f"{item} x{n}" for item, n in self.manifest().items()]
+        return f"{self.quantity} items ({', '.join(parts)})"
 
     def mark_completed(self) -> None:
         """
-        Mark the delivery task as completed by updating its status.
+        Mark the delivery task (and any merged tasks) as completed by updating its status.
         """
-        self.status = "Completed"
+        for task in self.deliveries():
+            task.status = TaskStatus.COMPLETED
 
     def mark_failed(self) -> None:
         """
-        Mark the delivery task as failed by updating its status.
+        Mark the delivery task (and any merged tasks) as failed by updating its status.
+        """
+        for task in self.deliveries():
+            task.status = TaskStatus.FAILED
+
+
+_STATUSES = list(TaskStatus)
+_STATUS_CODES = {status: code for code, status in enumerate(_STATUSES)}
+_NO_DEADLINE = float("nan")
+
+
+class TaskStore:
+    """
+    Column-oriented store for large numbers of historical tasks.
+
+    Each field lives in a typed ``array``; item and location strings are
+    stored once in a shared table and referenced by index. A task costs
+    about 30 bytes instead of the ~300 of a DeliveryTask object, and rows
+    are turned back into DeliveryTask objects only when read.
+
+    Attributes:
+        ids (array): Task IDs.
+        status (array): Status codes, see ``TaskStatus``.
+        priority (array): Task priorities.
+        deadline (array): Deadlines, NaN when there is none.
+    """
+
+    def __init__(self, tasks: Iterable[DeliveryTask] = ()):
+        self.ids = array("q")
+        self.status = array("b")
+        self.priority = array("i")
+        self.deadline = array("d")
+        self._item = array("i")
+        self._from = array("i")
+        self._to = array("i")
+        self._strings: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self.extend(tasks)
+
+    def _code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._strings)
+            self._strings.append(value)
+        return code
+
+    def append(self, task: DeliveryTask) -> None:
+        """Add a task (its current field values are copied)."""
+        code = self._code
+        self.ids.append(task.id)
+        self.status.append(_STATUS_CODES[task.status])
+        self.priority.append(task.priority)
+        self.deadline.append(_NO_DEADLINE if task.deadline is None else task.deadline)
+        self._item.append(code(task.item))
+        self._from.append(code(task.from_location))
+        self._to.append(code(task.to_location))
+
+    def extend(self, tasks: Iterable[DeliveryTask]) -> None:
+        for task in tasks:
+            self.append(task)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> DeliveryTask:
+        deadline = self.deadline[index]
+        strings = self._strings
+        return DeliveryTask(self.ids[index], strings[self._item[index]], strings[self._from[index]],
+                            strings[self._to[index]], _STATUSES[self.status[index]],
+                            self.priority[index], None if deadline != deadline else deadline)
+
+    def __iter__(self) -> Iterator[DeliveryTask]:
+        for i in range(len(self.ids)):
+            yield self[i]
+
+    def count_by_status(self) -> Dict[TaskStatus, int]:
+        """
+        Count tasks per status without materialising them.
+
+        Returns:
+            Dict[TaskStatus, int]: Number of tasks in each status.
+        """
+        counts = [0] * len(_STATUSES)
+        for code in self.status:
+            counts[code] += 1
+        return dict(zip(_STATUSES, counts))
+
+    def count_by_location(self, field: str = "to_location") -> Dict[str, int]:
+        """
+        Count tasks per location.
+
+        Args:
+            field (str): "from_location", "to_location" or "item".
+
+        Returns:
+            Dict[str, int]: Number of tasks for each distinct value.
         """
-        self.status = "Failed"
+        column = {"from_location": self._from, "to_location": self._to, "item": self._item}[field]
+        counts = [0] * len(self._strings)
+        for code in column:
+            counts[code] += 1
+        return {s: n for s, n in zip(self._strings, counts) if n}
@@ -0,0 +1,127 @@
+# src/undo.py
+"""
+Undo History for Humanoid Classroom Robot
+------------------------------------------
+Bounded history of reversible actions, each with the compensating action
+that reverses it.
+
+Classes:
+    - UndoEntry: One undoable action and its compensation.
+    - UndoHistory: Capacity-bounded history with an index by actor.
+
+Key Features:
+    - Holds at most ``capacity`` entries; the oldest are forgotten first, so
+      memory stays constant however long the robot runs
+    - Undoing the latest action overall or the latest of one actor is O(1)
+    - ``pop_many`` takes several entries at once for batch undo
+"""
+
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional
+
+Compensation = Callable[[], object]
+
+
+@dataclass(slots=True)
+class UndoEntry:
+    """
+    An undoable action.
+
+    Attributes:
+        seq (int): Sequence number of the action in the interaction log.
+        action (str): What was done.
+        who (Optional[str]): Who did it or who it was for.
+        compensate (Optional[Compensation]): Reverses the action's effect,
+            e.g. cancels the queued task; None if only the log entry is retracted.
+    """
+    seq: int
+    action: str
+    who: Optional[str]
+    compensate: Optional[Compensation] = None
+
+
+class UndoHistory:
+    """
+    The most recent ``capacity`` undoable actions, newest last.
+
+    Entries live in an ordered dict keyed by ``seq``; each actor has a deque
+    of its own seqs in the same order, so the newest entry overall and the
+    newest entry of an actor can both be removed in O(1).
+
+    Attributes:
+        capacity (int): Maximum number of entries kept.
+        evicted (int): Entries forgotten because the history was full.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.evicted = 0
+        self._entries: "OrderedDict[int, UndoEntry]" = OrderedDict()
+        self._by_who: Dict[Optional[str], Deque[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def push(self, entry: UndoEntry) -> None:
+        """Add an entry, forgetting the oldest one if the history is full."""
+        if len(self._entries) >= self.capacity:
+            _, oldest = self._entries.popitem(last=False)
+            self._unindex(oldest, newest=False)
+            self.evicted += 1
+        self._entries[entry.seq] = entry
+        self._by_who.setdefault(entry.who, deque()).append(entry.seq)
+
+    def _unindex(self, entry: UndoEntry, newest: bool) -> None:
+        seqs = self._by_who[entry.who]
+        if newest:
+            seqs.pop()
+        else:
+            seqs.popleft()
+        if not seqs:
+            del self._by_who[entry.who]
+
+    def pop(self, who: Optional[str] = None) -> Optional[UndoEntry]:
+        """
+        Remove and return the newest entry.
+
+        Args:
+            who (Optional[str]): Only consider this actor's entries; anyone's if None.
+
+        Returns:
+            Optional[UndoEntry]: The entry, or None if there is nothing to undo.
+        """
+        if who is None:
+            if not self._entries:
+                return None
+            _, entry = self._entries.popitem()
+        else:
+            seqs = self._by_who.get(who)
+            if not seqs:
+                return None
+            entry = self._entries.pop(seqs[-1])
+        self._unindex(entry, newest=True)
+        return entry
+
+    def pop_many(self, count: int, who: Optional[str] = None) -> List[UndoEntry]:
+        """Remove and return up to ``count`` newest entries (of ``who`` if given), newest first."""
+        out = []
+        for _ in range(count):
+            entry = self.pop(who)
+            if entry is None:
+                break
+            out.append(entry)
+        return out
+
+    def peek(self, who: Optional[str] = None) -> Optional[UndoEntry]:
+        """The entry ``pop`` would return, without removing it."""
+        if who is None:
+            return self._entries[next(reversed(self._entries))] if self._entries else None
+        seqs = self._by_who.get(who)
+        return self._entries[seqs[-1]] if seqs else None
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_who.clear()
@@ -0,0 +1,925 @@
+"""
+Tests for the Humanoid Classroom Robot System.
+
+Run from the repository root with either:
+    python -m pytest tests/run_tests.py
+    python -m tests.run_tests
+"""
+
+import asyncio
+import io
+import itertools
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+
+from src.async_controller import AsyncRobotController
+from src.classroom_map import ClassroomMap, default_classroom_map
+from src.commands import Command, CommandDispatcher, CommandError, parse_command, run_script
+from src.district import DistrictRunner
+from src import events, tasks as task_ids
+from src.events import EventBus, Level, console_bus
+from src.fleet import FleetDispatcher
+from src.interaction_log import InteractionLog
+from src.metrics import Histogram, MetricsRegistry
+from src.retry import RetryPolicy, TimerWheel
+from src.ring_buffer import RingBuffer
+from src.robot_controller import RobotController
+from src.sampler import SensorSampler
+from src.routing import DistanceTable, nearest_neighbour_route, route_length, two_opt
+from src.sensor_array import SensorArray
+from src.sensors import Sensor, TemperatureSensor
+from src.server import RobotClient, RobotServer
+from src.simulation import MINUTES_PER_DAY, SchoolSimulation, Workload, default_workloads
+from src.task_journal import TaskJournal
+from src.task_manager import TaskManager
+from src.tasks import DeliveryTask, TaskStatus, TaskStore
+from src.undo import UndoEntry, UndoHistory
+
+LOCATIONS = ["teacher", "student", "cupboard", "library", "office"]
+
+
+def _fleet_throughput(robot_count: int, tasks: int = 400) -> float:
+    random.seed(7)
+    fleet = FleetDispatcher(robot_count)
+    submitted = set()
+    for i in range(tasks):
+        src, dst = random.sample(LOCATIONS, 2)
+        submitted.add(fleet.submit(f"item{i}", src, dst).id)
+    report = fleet.run()
+    # Every task ran exactly once, on some robot, and nothing is left queued.
+    assert report["tasks"] == tasks == report["delivered"] + report["failed"]
+    assert sum(report["per_robot"].values()) == tasks
+    assert len(fleet.task_manager) == 0
+    ran = [entry[1] for robot in fleet.robots for entry in robot.history]
+    assert len(ran) == tasks and set(ran) == submitted
+    assert sorted(fleet.task_manager.completed) == sorted(
+        entry[1] for robot in fleet.robots for entry in robot.history if entry[0] == "deliver")
+    return report["throughput"]
+
+
+def test_fleet_completes_every_task_once_and_scales():
+    base = _fleet_throughput(1)
+    for robots in (2, 4):
+        speedup = _fleet_throughput(robots) / base
+        assert speedup >= 0.9 * robots, (robots, speedup)
+
+
+def test_fleet_requeues_and_reraises_worker_errors():
+    class Broken(RobotController):
+        def run_task(self, task):
+            if task.item == "glass":
+                raise RuntimeError("dropped the glass")
+            return super().run_task(task)
+
+    fleet = FleetDispatcher(3, robot_factory=lambda id_, tm: Broken(id_, task_manager=tm, verbose=False))
+    glass = fleet.submit("glass", "cupboard", "teacher", priority=5)
+    for i in range(30):
+        fleet.submit(f"book{i}", "library", "student")
+    try:
+        fleet.run()
+    except RuntimeError as exc:
+        assert "glass" in str(exc)
+    else:
+        raise AssertionError("worker error was swallowed")
+    # The broken task is back on the queue and every other task ran.
+    assert fleet.task_manager.list_tasks() == [glass.id]
+    assert sum(len(r.history) for r in fleet.robots) == 30
+
+
+def test_fleet_waits_run_from_submission_and_a_dying_worker_does_not_block_the_rest():
+    fleet = FleetDispatcher(1, robot_factory=lambda id_, tm: _Reliable(id_, task_manager=tm, verbose=False))
+    fleet.submit("pen", "cupboard", "student")
+    fleet.robots[0].sim_minutes = 50.0
+    fleet.submit("book", "library", "teacher")
+    report = fleet.run()
+    assert report["max_wait_minutes"] == 50.0 and report["mean_wait_minutes"] < 50.0
+
+    class Halt(BaseException):
+        pass
+
+    class Fainting(_Reliable):
+        def run_task(self, task):
+            if self.id == "R-001":
+                raise Halt()
+            return super().run_task(task)
+
+    fleet = FleetDispatcher(3, robot_factory=lambda id_, tm: Fainting(id_, task_manager=tm, verbose=False))
+    for i in range(12):
+        fleet.submit(f"book{i}", "library", "student")
+    hook, threading.excepthook = threading.excepthook, lambda args: None
+    try:
+        runner = threading.Thread(target=fleet.run, daemon=True)
+        runner.start()
+        runner.join(5)
+    finally:
+        threading.excepthook = hook
+    assert not runner.is_alive() and len(fleet.task_manager) == 0
+
+
+def test_server_pipelining_bulk_enqueue_and_backpressure():
+    async def scenario():
+        server = RobotServer(max_pending=50)
+        await server.start()
+        client = await RobotClient.connect(server.host, server.port)
+        try:
+            # Pipelined requests are answered in order.
+            futures = [client.send("greet", name=f"s{i}") for i in range(20)]
+            await client.drain()
+            responses = await asyncio.gather(*futures)
+            assert [r["id"] for r in responses] == list(range(1, 21))
+            assert all(r["ok"] and r["result"]["greeting"] == f"Hello, s{i}!" for i, r in enumerate(responses))
+
+            tasks = [{"item": f"book{i}", "source": "library", "destination": "teacher"} for i in range(40)]
+            bulk = await client.request("enqueue_many", tasks=tasks)
+            assert bulk["ok"] and len(bulk["result"]["task_ids"]) == 40
+
+            # More tasks than the queue limit are refused as a whole.
+            full = await client.request("enqueue_many", tasks=tasks + tasks)
+            assert not full["ok"] and full["retry"]
+
+            bad = await client.request("deliver", item="book")
+            assert not bad["ok"] and "source" in bad["error"]
+
+            await server.wait_idle()
+            status = await client.request("status")
+            assert status["result"]["pending_tasks"] == 0
+        finally:
+            await client.close()
+            await server.close()
+        assert server.rejected == 1
+
+    asyncio.run(scenario())
+
+
+def test_server_validates_args_runs_its_own_delivery_and_survives_errors():
+    async def scenario():
+        server = RobotServer()
+        urgent = json.loads(server.handle_line(json.dumps({"id": 1, "verb": "enqueue", "args": {
+            "item": "inhaler", "source": "office", "destination": "teacher", "priority": 9}}).encode()))
+        # deliver runs the task it created, not the higher-priority one queued before it.
+        own = json.loads(server.handle_line(
+            b'{"id": 2, "verb": "deliver", "args": {"item": "pen", "source": "cupboard", "destination": "student"}}'))
+        assert own["ok"] and "pen" in own["result"]["message"]
+        assert server.robot.task_manager.list_tasks() == [urgent["result"]["task_id"]] != [own["result"]["task_id"]]
+        for args, error in (({"since_version": [1]}, "since_version"), ({"since_version": {"state": "x"}}, "integers"),
+                            ({"summary": "yes"}, "summary"), ({"bogus": 1}, "Unknown argument")):
+            response = json.loads(server.handle_line(json.dumps({"id": 3, "verb": "status", "args": args}).encode()))
+            assert not response["ok"] and error in response["error"], response
+        for args in ({"tasks": [{"item": "a", "source": "b", "destination": "c", "priority": "high"}]},
+                     {"tasks": ["book"]}):
+            assert not json.loads(server.handle_line(json.dumps({"verb": "enqueue_many", "args": args}).encode()))["ok"]
+        assert len(server.robot.task_manager) == 1
+
+        def broken(name):
+            raise RuntimeError("speaker unplugged")
+        server.robot.greet_student = broken
+        await server.start()
+        client = await RobotClient.connect(server.host, server.port)
+        try:
+            failed = client.send("greet", name="Ana")
+            alive = client.send("ping")
+            await client.drain()
+            failed, alive = await failed, await alive
+            assert not failed["ok"] and "speaker unplugged" in failed["error"]
+            assert alive["ok"] and alive["result"] == {"pong": True}
+        finally:
+            await client.close()
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_async_deliveries_wait_for_retries_and_merged_requests():
+    class Clumsy(RobotController):
+        # Every first attempt at a trip fails.
+        def _attempt(self):
+            self.tries = getattr(self, "tries", 0) + 1
+            return self.tries % 2 == 0
+
+    async def scenario():
+        tm = TaskManager("T", coalesce="route", retry_policy=RetryPolicy(max_attempts=3, jitter=0.0))
+        robot = AsyncRobotController(Clumsy("R", task_manager=tm, verbose=False), time_scale=0.001)
+        results = await asyncio.wait_for(asyncio.gather(
+            robot.deliver_material("worksheet", "cupboard", "desk 3"),
+            robot.deliver_material("worksheet", "cupboard", "desk 3"),
+            robot.deliver_material("pen", "cupboard", "desk 3"),
+        ), timeout=5)
+        assert results[1:] == ["Delivered worksheet to desk 3", "Delivered pen to desk 3"], results
+        assert results[0].startswith("Delivered")
+        assert tm.retry_stats()["retries"] >= 1 and len(tm) == 0
+
+    asyncio.run(scenario())
+
+
+def test_async_driver_fails_unreachable_tasks_at_once_and_releases_waiters_on_error():
+    async def scenario():
+        robot = AsyncRobotController(_Reliable("R", verbose=False), time_scale=1000.0)
+        for a, b in [("base", "library"), ("library", "office"), ("student", "library")]:
+            robot.robot.report_obstacle(a, b)
+        result = await asyncio.wait_for(robot.deliver_material("book", "library", "teacher"), timeout=5)
+        assert result == "Delivery book to teacher failed"
+
+        class Broken(_Reliable):
+            def run_task(self, task):
+                raise RuntimeError("motor fault")
+
+        robot = AsyncRobotController(Broken("B", verbose=False), time_scale=0.0)
+        results = await asyncio.wait_for(asyncio.gather(
+            robot.deliver_material("pen", "cupboard", "student", priority=2),
+            robot.deliver_material("book", "library", "teacher"),
+            return_exceptions=True), timeout=5)
+        assert all(isinstance(r, RuntimeError) for r in results), results
+        assert not robot._waiters
+
+    asyncio.run(scenario())
+
+
+def test_ring_buffer_wraps_and_rolling_stats_match_brute_force():
+    rng = random.Random(11)
+    buffer = RingBuffer(50, windows=(7, 50))
+    values = []
+    for i in range(237):
+        value = round(rng.uniform(-10, 10), 2)
+        values.append(value)
+        buffer.append(value)
+        if i == 100:
+            late = buffer.add_window(13)  # registered after the buffer has wrapped
+        for window in buffer.windows:
+            recent = values[-window:]
+            stats = buffer.stats(window)
+            mean = sum(recent) / len(recent)
+            assert stats.count == len(recent)
+            assert math.isclose(stats.mean, mean, abs_tol=1e-9)
+            assert math.isclose(stats.variance, sum((v - mean) ** 2 for v in recent) / len(recent), abs_tol=1e-6)
+            assert (stats.min, stats.max) == (min(recent), max(recent))
+    assert late is buffer.stats(13)
+    assert len(buffer) == 50 and buffer.total == 237
+    assert buffer.to_list() == values[-50:] and buffer.to_list(5) == values[-5:]
+    assert [buffer[i] for i in (0, -1)] == [values[-50], values[-1]]
+    assert len(buffer.view()) == 2  # the window straddles the wrap point
+    assert [v for segment in buffer.view() for v in segment] == values[-50:]
+    try:
+        buffer[50]
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("index past the end was accepted")
+
+
+def test_sensor_array_returns_copies_of_rounded_readings():
+    sensors = SensorArray("S", ["room1", "room2"], seed=3)
+    latest = sensors.read_data()
+    assert all(v == round(v, 2) for v in latest["temperature"])
+    latest["temperature"][0] = 99.0
+    assert sensors.latest("room1") != 99.0
+    assert not sensors.detect_anomaly()
+
+
+def test_in_memory_interaction_log_is_bounded_and_status_pages_it():
+    log = InteractionLog(segment_size=10, max_entries=25)
+    for i in range(100):
+        log.append("greet", f"s{i % 3}")
+    kept = log.get_log()
+    assert len(log) == 100 and 25 <= len(kept) < 35 and log.trimmed == 100 - len(kept)
+    assert [e.seq for e in kept] == list(range(100 - len(kept), 100))
+    assert [e.seq for e in log.query(who="s1", since=90)] == [91, 94, 97]
+    assert [e.seq for e in log.recent(3)] == [97, 98, 99]
+
+    robot = RobotController("R", verbose=False)
+    for i in range(250):
+        robot.greet_student(f"s{i}")
+    status = robot.get_status(page=20)
+    assert status["interaction_count"] == 250
+    assert [e.seq for e in status["interaction_log"]] == list(range(230, 250))
+    assert robot.interaction.get_log(since=247) == [("greet", "s248"), ("greet", "s249")]
+    assert robot.interaction.get_entries(since=248)[0].seq == 249
+
+    with tempfile.TemporaryDirectory() as directory:
+        log = InteractionLog(directory, segment_size=10)
+        for i in range(35):
+            log.append("greet", f"s{i}")
+        log.close()
+        assert not [n for n in os.listdir(directory) if n.endswith(".tmp")]
+        assert sum(n.endswith(".idx") for n in os.listdir(directory)) == 3
+        reopened = InteractionLog(directory, segment_size=10)
+        assert len(reopened) == 35 and [e.who for e in reopened.query(action="greet", since=32)] == ["s33", "s34"]
+        reopened.close()
+
+
+def test_status_delta_reports_only_queue_changes_since_version():
+    robot = RobotController("R", verbose=False)
+    tm = robot.task_manager
+    tm.enqueue_many(DeliveryTask.create(item, "cupboard", "teacher") for item in ("pen", "book", "map"))
+    version = robot.get_status()["version"]
+    pen, book, _ = tm.list_tasks()
+    tm.cancel_task(book)
+    robot.greet_student("ana")
+    delta = robot.get_status(since_version=version)
+    assert [(op, id_) for _, op, id_ in delta["task_queue_changes"]] == [("removed", book)]
+    assert delta["pending_tasks"] == 2 and "task_queue" not in delta
+    assert delta["history"] == [("greet", "ana")]
+    assert "temperature_history" not in delta
+    assert robot.get_status(since_version=delta["version"]).keys() == {"id", "state", "version"}
+    # Changes older than the change log fall back to the first page of the queue.
+    for i in range(tm._changes.maxlen):
+        tm.reprioritise_task(pen, i)
+    delta = robot.get_status(since_version=version, page=1)
+    assert delta["task_queue"] == [pen] and "task_queue_changes" not in delta
+
+
+def _crash(tm: TaskManager) -> None:
+    """Drop a journaled manager as a crash would: buffered records are lost."""
+    tm.journal._file.close()
+
+
+def test_journal_recovers_queue_after_crash_and_torn_tail():
+    with tempfile.TemporaryDirectory() as directory:
+        tm = TaskManager("J", journal=TaskJournal(directory, fsync=False))
+        a, b, c, d = (DeliveryTask.create(item, "cupboard", "teacher") for item in "abcd")
+        tm.enqueue_many([a, b, c, d])
+        done, running = tm.dequeue_task(), tm.dequeue_task()
+        tm.mark_completed(done)
+        tm.cancel_task(c.id)
+        tm.reprioritise_task(d.id, 5)
+        tm.sync()
+        _crash(tm)
+        wal = sorted(n for n in os.listdir(directory) if n.startswith("wal-"))[-1]
+        with open(os.path.join(directory, wal), "ab") as fh:
+            fh.write(b'["E",999999,"gl')  # torn final write
+
+        tm = TaskManager("J", journal=TaskJournal(directory, fsync=False))
+        # The dequeued but unfinished task is queued again, behind the others.
+        assert tm.list_tasks() == [d.id, running.id]
+        assert tm.get_task(d.id).priority == 5
+        assert list(tm.completed) == [done.id]
+        assert DeliveryTask.create("e", "cupboard", "teacher").id > d.id
+        tm.close()
+
+
+def test_journal_recovers_merged_requests_merged_with_fresh_ids():
+    for snapshot_every in (50000, 1):
+        with tempfile.TemporaryDirectory() as directory:
+            tm = TaskManager("J", journal=TaskJournal(directory, fsync=False, snapshot_every=snapshot_every),
+                             coalesce="duplicates")
+            carrier = DeliveryTask.create("pen", "cupboard", "teacher", priority=1)
+            urgent = DeliveryTask.create("pen", "cupboard", "teacher", priority=7)
+            plain = DeliveryTask.create("pen", "cupboard", "teacher")
+            other = DeliveryTask.create("map", "cupboard", "teacher", priority=3)
+            tm.enqueue_many([carrier, urgent, plain, other])
+            tm.sync()
+            _crash(tm)
+
+            # A fresh process would count IDs from 1 again.
+            task_ids._ids = itertools.count(1)
+            tm = TaskManager("J", journal=TaskJournal(directory, fsync=False), coalesce="duplicates")
+            assert tm.list_tasks() == [carrier.id, other.id]
+            recovered = tm.get_task(carrier.id)
+            assert [t.id for t in recovered.deliveries()] == [carrier.id, urgent.id, plain.id]
+            assert recovered.priority == 7 and tm.get_task(urgent.id).priority == 7
+            # The carrier falls back to its own priority once the urgent request is withdrawn.
+            tm.cancel_task(urgent.id)
+            assert tm.get_task(carrier.id).priority == 1 and tm.list_tasks() == [other.id, carrier.id]
+            assert DeliveryTask.create("e", "cupboard", "teacher").id > other.id
+            tm.close()
+
+
+def test_task_store_round_trips_tasks_and_counts_them():
+    originals = [DeliveryTask.create("pen", "cupboard", "teacher", priority=2, deadline=9.5),
+                 DeliveryTask.create("book", "library", "teacher"),
+                 DeliveryTask.create("pen", "cupboard", "student", priority=-1)]
+    originals[0].mark_completed()
+    originals[2].mark_failed()
+    store = TaskStore(originals)
+    fields = ("id", "item", "from_location", "to_location", "status", "priority", "deadline")
+    assert len(store) == 3
+    assert [[getattr(t, f) for f in fields] for t in store] == [[getattr(t, f) for f in fields] for t in originals]
+    assert store[1].deadline is None and store[1].status is TaskStatus.PENDING
+    assert store.count_by_status()[TaskStatus.COMPLETED] == 1
+    assert store.count_by_location() == {"teacher": 2, "student": 1}
+    assert store.count_by_location("item") == {"pen": 2, "book": 1}
+    # IDs are unique and increasing, and their UUID form is unique too.
+    ids = [DeliveryTask.create("x", "a", "b") for _ in range(1000)]
+    assert [t.id for t in ids] == sorted({t.id for t in ids}) and len({t.uuid for t in ids}) == 1000
+
+
+def test_journal_loses_only_the_uncommitted_batch_when_killed():
+    with tempfile.TemporaryDirectory() as directory:
+        journal = TaskJournal(directory, group_size=1000, commit_interval=1e9, fsync=False)
+        tm = TaskManager("J", journal=journal)
+        kept = [DeliveryTask.create(f"kept{i}", "library", "student") for i in range(3)]
+        tm.enqueue_many(kept)
+        tm.sync()
+        tm.enqueue_many(DeliveryTask.create(f"lost{i}", "library", "student") for i in range(3))
+        tm.cancel_task(kept[0].id)
+        _crash(tm)  # killed mid-batch, before the group commit
+
+        tm = TaskManager("J", journal=TaskJournal(directory, fsync=False))
+        assert tm.list_tasks() == [t.id for t in kept]
+        tm.close()
+
+
+def test_journal_snapshot_compacts_wal_and_replays_tail():
+    with tempfile.TemporaryDirectory() as directory:
+        tm = TaskManager("J", journal=TaskJournal(directory, group_size=1, snapshot_every=5, fsync=False))
+        tasks = [DeliveryTask.create(f"item{i}", "office", "library", priority=i % 2) for i in range(8)]
+        for task in tasks:
+            tm.enqueue_task(task)
+        finished = [tm.dequeue_task() for _ in range(3)]
+        for task in finished:
+            tm.mark_completed(task)
+        expected = tm.list_tasks()
+        tm.close()
+        names = os.listdir(directory)
+        assert "snapshot.json" in names
+        # WAL files covered by the snapshot are gone; only the tail is replayed.
+        assert len([n for n in names if n.startswith("wal-")]) == 1
+
+        tm = TaskManager("J", journal=TaskJournal(directory, fsync=False))
+        assert tm.list_tasks() == expected
+        assert list(tm.completed) == [t.id for t in finished]
+        tm.close()
+
+
+def test_command_parser_grammar():
+    assert parse_command("DELIVER chalk box From store room TO class 2 priority -3") == Command(
+        "deliver", {"item": "chalk box", "source": "store room", "destination": "class 2", "priority": -3})
+    assert parse_command("deliver book library student")[1] == {
+        "item": "book", "source": "library", "destination": "student", "priority": 0}
+    assert parse_command("  greet Ana Lima ") == Command("greet", {"name": "Ana Lima"})
+    assert parse_command("Undo") == Command("undo", {"count": 1, "who": None})
+    assert parse_command("undo 3 for student") == Command("undo", {"count": 3, "who": "student"})
+    assert parse_command("undo for Ana Lima")[1] == {"count": 1, "who": "Ana Lima"}
+    assert parse_command("status") == Command("status", {})
+    assert parse_command("   ") is None
+    for line in ("deliver book from library", "deliver book to x from y", "greet", "status now",
+                 "undo many", "dance"):
+        try:
+            parse_command(line)
+        except CommandError:
+            pass
+        else:
+            raise AssertionError(f"accepted {line!r}")
+
+    out = io.StringIO()
+    counts = run_script(["greet Ana", "", "fly", "undo for Ana", "exit", "greet Bo"],
+                        RobotController("R", verbose=False), out)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert counts == {"processed": 3, "errors": 1}
+    assert [(r["line"], r["ok"]) for r in records] == [(1, True), (3, False), (4, True)]
+    assert records[2]["result"]["undone"] == ["greet", "Ana"]
+
+    class Faulty(RobotController):
+        def monitor_environment(self):
+            raise OSError("sensor unplugged")
+
+    out = io.StringIO()
+    counts = run_script(["monitor", "greet Ana"], Faulty("R", verbose=False), out)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert counts == {"processed": 2, "errors": 1} and records[1]["ok"]
+    assert records[0] == {"line": 1, "ok": False, "error": "Internal error: sensor unplugged"}
+
+
+def test_timer_wheel_never_releases_early():
+    wheel = TimerWheel(tick=0.1, slots=8)
+    for when, item in ((1.05, "a"), (0.3, "b"), (5.0, "far"), (1.0, "c")):
+        wheel.schedule(when, item)
+    assert wheel.next_due() == 0.3
+    assert wheel.advance(0.29) == []
+    assert wheel.advance(1.0) == ["b", "c"]
+    assert wheel.advance(1.04) == [] and wheel.next_due() == 1.05  # same tick, not yet due
+    assert wheel.advance(1.05) == ["a"]
+    wheel.schedule(1.02, "late")  # already due when scheduled
+    assert wheel.advance(4.99) == ["late"] and len(wheel) == 1
+    assert wheel.advance(5.0) == ["far"] and wheel.next_due() is None
+
+
+def test_failed_tasks_retry_on_the_wheel_then_dead_letter_and_replay():
+    tm = TaskManager("T", retry_policy=RetryPolicy(max_attempts=3, base_delay=1.0, jitter=0.0))
+    task = DeliveryTask.create("glass", "cupboard", "teacher")
+    tm.enqueue_task(task)
+    now = 0.0
+    for delay in (1.0, 2.0):
+        assert tm.dequeue_task() is task
+        due = tm.mark_failed(task, now=now)
+        assert due == now + delay and tm.next_retry_at() == due and task.status.name == "RETRYING"
+        assert tm.advance(due - 0.01) == 0 and len(tm) == 0
+        assert tm.advance(due) == 1 and tm.list_tasks() == [task.id]
+        now = due
+    assert tm.dequeue_task() is task and tm.mark_failed(task, now=now) is None
+    assert list(tm.dead_letters) == [task] and task.status.name == "FAILED"
+    stats = tm.retry_stats()
+    assert (stats["attempts"], stats["retries"], stats["dead_lettered"], stats["pending_retries"]) == (3, 2, 1, 0)
+    assert tm.replay_dead_letters() == 1
+    assert tm.list_tasks() == [task.id] and task.attempts == 0 and not tm.dead_letters
+    # A full dead-letter queue forgets its oldest tasks but counts them.
+    tm = TaskManager("T", history_size=2, retry_policy=RetryPolicy(max_attempts=1))
+    for _ in range(5):
+        tm.enqueue_task(DeliveryTask.create("glass", "cupboard", "teacher"))
+        tm.mark_failed(tm.dequeue_task())
+    assert len(tm.dead_letters) == 2 and tm.retry_stats()["dead_letters_dropped"] == 3
+
+
+def test_district_counts_every_completed_task():
+    # Each classroom delivers more than the 1000 completed IDs a TaskManager remembers.
+    report = DistrictRunner(2, workers=1).run(days=2, rate_per_hour=200)
+    assert report["delivered"] > 2000
+    assert report["status"]["completed_tasks"] == report["delivered"]
+    assert "speedup" not in report and report["parallelism"] > 0
+
+
+def test_district_aggregates_unrounded_busy_time_and_queue_area():
+    runner = DistrictRunner(3, workers=1, batch_size=2)
+    report = runner.run(days=0.5, rate_per_hour=40, seed=7)
+    sims = []
+    for classroom in range(3):
+        sim = SchoolSimulation(1, default_workloads(40), seed=7 * 1_000_003 + classroom)
+        sims.append(sim.run(0.5))
+    until = 0.5 * MINUTES_PER_DAY
+    busy = sum(r["busy_minutes"] for r in sims)
+    area = sum(r["queue_area"] for r in sims)
+    assert report["utilisation"] == round(busy / (3 * until), 4)
+    assert report["queue_mean"] == round(area / (3 * until), 3)
+    assert all(r["utilisation"] == round(r["busy_minutes"] / until, 4) for r in sims)
+
+
+def test_coalescing_cancel_recomputes_the_carrier_and_keeps_the_rest_queued():
+    tm = TaskManager("C", coalesce="route", metrics=MetricsRegistry())
+    pen, book, chalk, pencil = (DeliveryTask.create(item, "cupboard", "teacher", priority)
+                                for item, priority in (("pen", 0), ("book", 5), ("chalk", 1), ("pencil", 0)))
+    book.deadline = 10.0
+    other = DeliveryTask.create("map", "library", "teacher", priority=3)
+    tm.enqueue_many([pen, book, chalk, other])
+    assert tm.list_tasks() == [pen.id, other.id] and pen.quantity == 3 and tm.coalesced == 2
+    assert (pen.priority, pen.deadline) == (5, 10.0)
+    # Cancelling the urgent request lowers the trip it was merged into again.
+    assert tm.cancel_task(book.id) is book and tm.get_task(book.id) is None
+    assert (pen.priority, pen.deadline) == (1, None) and tm.list_tasks() == [other.id, pen.id]
+    # Cancelling the carrier leaves its requests queued under the first of them.
+    assert tm.cancel_task(pen.id) is pen
+    assert tm.list_tasks() == [other.id, chalk.id] and tm.get_task(chalk.id) is chalk
+    assert tm.metrics.gauge("tasks_pending").value == len(tm) == 2
+    tm.enqueue_task(pencil)
+    assert chalk.merged == [pencil] and tm.get_task(pencil.id) is pencil
+
+
+def test_retried_and_replayed_carriers_keep_their_merged_requests():
+    tm = TaskManager("C", coalesce="duplicates", retry_policy=RetryPolicy(max_attempts=2, jitter=0.0))
+    first, second, third = (DeliveryTask.create("book", "library", "student") for _ in range(3))
+    for task in (first, second, third):
+        tm.enqueue_task(task)
+    carrier = tm.dequeue_task()
+    assert carrier is first and carrier.quantity == 3 and tm.get_task(second.id) is None
+    due = tm.mark_failed(carrier, now=0.0)
+    tm.advance(due)
+    # Back on the queue, its requests can be found, cancelled and joined again.
+    assert tm.list_tasks() == [first.id] and tm.get_task(second.id) is second
+    assert tm.cancel_task(second.id) is second and first.merged == [third]
+    again = DeliveryTask.create("book", "library", "student")
+    tm.enqueue_task(again)
+    assert first.merged == [third, again]
+
+    assert tm.mark_failed(tm.dequeue_task(), now=due) is None and list(tm.dead_letters) == [first]
+    assert tm.replay_dead_letters() == 1
+    assert tm.get_task(third.id) is third and tm.cancel_task(again.id) is again
+    tm.enqueue_task(second)
+    assert first.merged == [third, second] and tm.list_tasks() == [first.id]
+
+
+class _Reliable(RobotController):
+    def _attempt(self) -> bool:
+        return True
+
+
+def test_undo_runs_the_return_trip_then_deliver_runs_its_own_task():
+    robot = _Reliable("R", verbose=False)
+    dispatcher = CommandDispatcher(robot)
+    assert robot.deliver_material("pen", "cupboard", "student").startswith("Delivered pen")
+    queued = DeliveryTask.create("inhaler", "office", "teacher", priority=9)
+    robot.enqueue_requests([queued], requester="nurse")
+    # Undoing the delivery (not the newer request, which belongs to the nurse) brings the pen back at once.
+    result = dispatcher.dispatch(parse_command("undo for student"))
+    assert result["undone"] == ["deliver", "student"]
+    assert result["outcome"] == "Delivered pen to cupboard" and robot.location == "cupboard"
+    assert robot.task_manager.list_tasks() == [queued.id]
+    # A new delivery runs itself, not the higher-priority request still queued.
+    assert robot.deliver_material("book", "library", "student") == "Delivered book to student"
+    assert robot.task_manager.list_tasks() == [queued.id]
+    result = dispatcher.dispatch(parse_command("undo for nurse"))
+    assert result["outcome"] == "Cancelled inhaler to teacher" and len(robot.task_manager) == 0
+    json.dumps(result)
+
+
+def test_undo_history_is_bounded_and_indexed_by_actor():
+    history = UndoHistory(capacity=4)
+    for seq, who in enumerate(["ana", "bo", "ana", "cy", "bo", "ana"]):
+        history.push(UndoEntry(seq, "greet", who))
+    assert len(history) == 4 and history.evicted == 2
+    assert history.peek().seq == 5 and history.peek("bo").seq == 4
+    assert history.pop("ana").seq == 5 and history.pop("ana").seq == 2
+    assert history.pop("ana") is None  # ana's oldest entry was evicted
+    assert [e.seq for e in history.pop_many(5)] == [4, 3]
+    assert history.pop() is None and history.peek("cy") is None
+
+
+def test_event_bus_drop_policies_flush_and_close():
+    bus = EventBus()
+    oldest, newest = [], []
+    keep_newest = bus.subscribe(oldest.extend, capacity=3)
+    keep_oldest = bus.subscribe(newest.extend, capacity=3, policy="drop_newest")
+    bus.subscribe(lambda events: None, level=Level.ERROR)
+    for i in range(5):
+        bus.publish("message", f"m{i}")
+    bus.publish("message", "ignored", Level.DEBUG)
+    assert oldest == newest == []  # nothing is delivered until a flush
+    assert bus.flush() == 6
+    assert [e.message for e in oldest] == ["m2", "m3", "m4"] and keep_newest.dropped == 2
+    assert [e.message for e in newest] == ["m0", "m1", "m2"] and keep_oldest.dropped == 2
+    assert keep_newest.delivered == 3 and not bus.enabled(Level.DEBUG)
+
+    closed = []
+
+    class Sink:
+        def write_batch(self, events):
+            closed.extend(e.message for e in events)
+
+        def close(self):
+            closed.append("closed")
+    class Exits:
+        def __init__(self):
+            self.registered = []
+
+        def register(self, fn):
+            self.registered.append(fn)
+
+        def unregister(self, fn):
+            self.registered.remove(fn)
+    bus.subscribe(Sink())
+    exits, real = Exits(), events.atexit
+    events.atexit = exits
+    try:
+        bus.start()
+        assert exits.registered == [bus.close]
+        bus.publish("message", "last")
+        bus.close()
+    finally:
+        events.atexit = real
+    assert exits.registered == [] and closed == ["last", "closed"]
+
+
+def test_verbose_robots_share_one_console_bus():
+    console_bus()
+    before = threading.active_count()
+    robots = [RobotController(f"R{i}") for i in range(50)]
+    assert threading.active_count() == before
+    assert all(r.events is robots[0].events is console_bus() for r in robots)
+    with RobotController("R") as robot:
+        robot.start_sampler(0.01)
+    assert robot.sampler is None and threading.active_count() == before
+
+
+def test_undo_is_logged_for_the_requester_and_its_trip_cannot_be_undone():
+    robot = _Reliable("R", verbose=False)
+    dispatcher = CommandDispatcher(robot)
+    command = parse_command("deliver pen from cupboard to student")
+    dispatcher.dispatch(command._replace(args={**command.args, "requester": "Ms Lee"}))
+    assert dispatcher.dispatch(parse_command("undo for student"))["count"] == 0
+    result = dispatcher.dispatch(parse_command("undo for Ms Lee"))
+    assert result["undone"] == ["deliver", "Ms Lee"] and result["outcome"] == "Delivered pen to cupboard"
+    # The return trip is logged but a second undo finds nothing left to reverse.
+    assert [(e.action, e.who) for e in robot.interaction.recent_log(3)] == [
+        ("deliver", "Ms Lee"), ("deliver", "Ms Lee"), ("undo", "Ms Lee")]
+    assert dispatcher.dispatch(parse_command("undo"))["count"] == 0
+    assert robot.location == "cupboard"
+
+
+def test_batch_puts_cut_tasks_back_in_place_and_runs_due_retries():
+    registry = MetricsRegistry()
+    tm = TaskManager("T", metrics=registry, retry_policy=RetryPolicy(max_attempts=2, jitter=0.0))
+    robot = _Reliable("R", task_manager=tm, verbose=False)
+    tasks = [DeliveryTask.create("pen", "cupboard", "student"), DeliveryTask.create("pen", "cupboard", "teacher"),
+             DeliveryTask.create("book", "library", "office"), DeliveryTask.create("book", "library", "student"),
+             DeliveryTask.create("chalk", "office", "teacher")]
+    tm.enqueue_many(tasks)
+    report = robot.execute_batch(max_tasks=4, window=0.001)
+    assert report["delivered"] == 2 and report["route"][0] == "cupboard"
+    # The library trip was cut and is back ahead of the task it was queued before.
+    assert tm.list_tasks() == [t.id for t in tasks[2:]]
+    assert registry.counter("tasks_enqueued_total").value == 5
+
+    class OnceClumsy(RobotController):
+        def _attempt(self):
+            self.tries = getattr(self, "tries", 0) + 1
+            return self.tries > 1
+
+    tm = TaskManager("T", retry_policy=RetryPolicy(max_attempts=2, base_delay=5.0, jitter=0.0))
+    robot = OnceClumsy("R", task_manager=tm, verbose=False)
+    tm.enqueue_task(DeliveryTask.create("pen", "cupboard", "student"))
+    assert robot.execute_batch()["failed"] == 1 and tm.pending_retries == 1
+    report = robot.execute_batch()
+    assert report["delivered"] == 1 and tm.pending_retries == 0 and len(tm) == 0
+
+
+def test_nearest_neighbour_and_two_opt_routes():
+    # Stops on a line: the greedy order from 0 is 1, 2, 4, 8.
+    line = DistanceTable({(a, b): abs(int(a) - int(b)) for a in "01248" for b in "01248" if a != b})
+    assert nearest_neighbour_route("0", ["8", "2", "4", "1", "2"], line.distance) == ["1", "2", "4", "8"]
+    # Corners of a square visited crosswise; 2-opt uncrosses the route.
+    corners = {"a": (0, 0), "b": (0, 1), "c": (1, 1), "d": (1, 0)}
+    square = DistanceTable({(p, q): math.dist(corners[p], corners[q]) for p in corners for q in corners if p != q})
+    crossed = ["c", "b", "d"]
+    improved = two_opt("a", crossed, square.distance)
+    assert sorted(improved) == sorted(crossed)
+    assert route_length("a", improved, square.distance) == 3.0 < route_length("a", crossed, square.distance)
+    assert two_opt("a", improved, square.distance) == improved
+
+
+def test_map_routes_are_shortest_even_with_short_corridors_and_missing_coordinates():
+    # A lift joins "stairs" and "roof" with a corridor far shorter than their straight-line distance.
+    cmap = ClassroomMap()
+    for name, x, y in [("hall", 0, 0), ("roof", 10, 0), ("stairs", 0, 10)]:
+        cmap.add_location(name, x, y)
+    cmap.add_corridor("hall", "roof")
+    cmap.add_corridor("hall", "stairs", 1.0)
+    cmap.add_corridor("stairs", "roof", 1.0)
+    assert cmap.shortest_path("hall", "roof") == (2.0, ["hall", "stairs", "roof"])
+
+    rng = random.Random(3)
+    for _ in range(20):
+        cmap = ClassroomMap()
+        names = [f"r{i}" for i in range(12)]
+        for name in names:
+            if rng.random() < 0.7:
+                cmap.add_location(name, rng.uniform(0, 50), rng.uniform(0, 50))
+            else:
+                cmap.add_location(name)
+        edges = {}
+        for _ in range(30):
+            a, b = rng.sample(names, 2)
+            explicit = rng.random() < 0.5 or not (a in cmap._coords and b in cmap._coords)
+            cmap.add_corridor(a, b, rng.uniform(1, 40) if explicit else None)
+            edges[(a, b)] = edges[(b, a)] = cmap._adj[a][b]
+        # Floyd-Warshall as the reference.
+        dist = {(a, b): 0.0 if a == b else edges.get((a, b), math.inf) for a in names for b in names}
+        for k in names:
+            for a in names:
+                for b in names:
+                    if dist[(a, k)] + dist[(k, b)] < dist[(a, b)]:
+                        dist[(a, b)] = dist[(a, k)] + dist[(k, b)]
+        for a in names:
+            for b in names:
+                assert math.isclose(cmap.distance(a, b), dist[(a, b)])
+
+
+def test_blocking_evicts_only_routes_through_the_corridor_and_unblocking_restores_them():
+    cmap = default_classroom_map()
+    before = cmap.shortest_path("base", "student")
+    assert before[1] == ["base", "teacher", "student"]
+    assert cmap.shortest_path("library", "office")[1] == ["library", "office"]
+    cmap.block_corridor("teacher", "student")
+    assert ("base", "student") not in cmap._cache and ("library", "office") in cmap._cache
+    detour = cmap.shortest_path("base", "student")
+    assert detour[0] > before[0] and ("teacher", "student") not in zip(detour[1], detour[1][1:])
+    cmap.unblock_corridor("student", "teacher")
+    assert cmap.shortest_path("base", "student") == before
+
+
+def test_histogram_buckets_tile_the_range_and_quantiles_stay_within_precision():
+    index, upper = Histogram._index, Histogram._upper
+    for units in list(range(5000)) + [random.Random(5).randrange(1 << 40) for _ in range(2000)]:
+        i = index(units)
+        # Every value falls in the bucket whose upper edge is the first one at or above it.
+        assert upper(i) >= units and (i == 0 or upper(i - 1) < units), units
+        assert upper(i) - units <= max(0, units) / 32 + 1
+    hist = Histogram()
+    for ms in range(1, 1001):
+        hist.observe(ms / 1000)
+    assert hist.count == 1000 and math.isclose(hist.sum, 500.5) and hist.max == 1.0
+    for q in (0.5, 0.9, 0.99):
+        assert q <= hist.quantile(q) <= q * 1.035, q
+    assert hist.quantile(1.0) == 1.0 and Histogram().quantile(0.5) == 0.0
+    other = Histogram()
+    other.observe(2.0)
+    hist.merge(other)
+    assert hist.count == 1001 and hist.max == 2.0
+
+
+def test_metrics_render_the_prometheus_text_format():
+    registry = MetricsRegistry(quantiles=(0.5,))
+    registry.counter("deliveries_total", "Deliveries made", robot="R-1").inc(3)
+    registry.gauge("queue_length").set(7)
+    registry.histogram("wait_seconds", "Queue wait", robot="R-1").observe(0.25)
+    text = registry.render()
+    assert text == (
+        "# HELP deliveries_total Deliveries made\n"
+        "# TYPE deliveries_total counter\n"
+        'deliveries_total{robot="R-1"} 3\n'
+        "# TYPE queue_length gauge\n"
+        "queue_length 7\n"
+        "# HELP wait_seconds Queue wait\n"
+        "# TYPE wait_seconds summary\n"
+        'wait_seconds{robot="R-1",quantile="0.5"} 0.25\n'
+        'wait_seconds_sum{robot="R-1"} 0.25\n'
+        'wait_seconds_count{robot="R-1"} 1\n')
+    try:
+        registry.gauge("deliveries_total")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("a metric name was registered with two types")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "robot.prom")
+        registry.write_textfile(path)
+        with open(path, encoding="utf-8") as fh:
+            assert fh.read() == text
+        assert os.listdir(directory) == ["robot.prom"]
+
+
+def test_simulation_is_deterministic_and_its_report_adds_up():
+    def report(seed):
+        result = SchoolSimulation(robot_count=2, seed=seed).run(days=1)
+        del result["cpu_seconds"]
+        return result
+
+    first = report(11)
+    assert first == report(11) and first != report(12)
+    finished = first["delivered"] + first["failed"]
+    assert 0 < finished <= first["arrived"] and first["arrived"] - finished - first["pending"] <= 2
+    assert first["throughput_per_hour"] == round(finished / 24, 3)
+    assert 0 < first["utilisation"] <= 1 and 0 <= first["queue_mean"] <= first["queue_max"]
+    for key in ("wait_minutes", "latency_minutes"):
+        p = first[key]
+        assert 0 <= p["p50"] <= p["p90"] <= p["p99"]
+    assert first["wait_minutes"]["p99"] <= first["latency_minutes"]["p99"]
+
+
+def test_simulation_fails_deliveries_to_unreachable_rooms():
+    cmap = default_classroom_map()
+    cmap.add_location("annex", 50, 50)  # no corridor leads there
+    workloads = [Workload("annex", 20.0, ["cupboard"], ["annex"])]
+    result = SchoolSimulation(robot_count=1, workloads=workloads, distances=cmap, seed=1).run(days=1)
+    assert result["arrived"] > 0 and result["failed"] == result["arrived"]
+    assert result["delivered"] == result["pending"] == 0
+
+
+class _Scripted(Sensor):
+    """Returns the given values in turn; None raises."""
+
+    def __init__(self, id_, values):
+        super().__init__(id_)
+        self.values = iter(values)
+        self.value = None
+
+    def read_data(self):
+        self.value = next(self.values)
+        if self.value is None:
+            raise OSError("sensor glitch")
+        return self.value
+
+    def detect_anomaly(self):
+        return self.value > 28
+
+
+def test_sampler_calls_back_once_per_anomaly_and_flips_whole_ticks():
+    hot = _Scripted("hot", [20, 30, 31, 20, 35, None, 21])
+    steady = _Scripted("steady", [22, 22, 22, 22, 22, 22, 22])
+    alerts = []
+    sampler = SensorSampler([hot, steady], clock=iter(range(100)).__next__, on_anomaly=[alerts.append])
+    sampler.add_callback(lambda reading: 1 / 0)  # a failing callback must not stop the others
+    assert sampler.latest() is None and sampler.snapshot() == {}
+    for _ in range(5):
+        sampler.sample_once()
+    # One alert when each anomaly episode starts, not one per anomalous reading.
+    assert [(r.seq, r.value) for r in alerts] == [(2, 30), (5, 35)] and sampler.errors == 2
+    back = sampler._buffers[1 - sampler._front]
+    assert back[0].seq == 4 and sampler.latest("hot").seq == 5
+    snapshot = sampler.snapshot()
+    assert {r.seq for r in snapshot.values()} == {5} and snapshot["steady"].timestamp == 4
+    # A failed read republishes the sensor's previous reading in the new tick.
+    sampler.sample_once()
+    assert sampler.latest("hot") == snapshot["hot"] and sampler.latest("steady").seq == 6
+    assert sampler.errors == 3
+
+
+def test_sensor_history_can_be_read_while_the_sampler_writes_it():
+    sensor = TemperatureSensor("S", capacity=64, rng=random.Random(2))
+    sampler = SensorSampler([sensor], interval=0.0005).start()
+    try:
+        for _ in range(2000):
+            history = sensor.get_history(32)
+            # Consecutive readings of the random walk never differ by more than one step.
+            assert 0 < len(history) <= 32 and all(abs(a - b) <= 1.01 for a, b in zip(history, history[1:]))
+            sensor.rolling_stats()
+    finally:
+        sampler.stop()
+    assert sampler.samples > 1 and sampler.errors == 0
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"{name}: ok")